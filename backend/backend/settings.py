@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -56,6 +57,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.QueryProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -88,6 +90,49 @@ DATABASES = {
     }
 }
 
+DATABASE_ROUTERS = ['core.db_routers.ReplicaRouter']
+
+# Read replicas: reads of MODELS outside a primary transaction go to one
+# of ALIASES (entries of DATABASES). After a checkout the customer's order
+# reads stay on the primary for PIN_SECONDS (kept in the PIN_CACHE alias,
+# which must be shared between processes). No ALIASES, no routing.
+# Two local SQLite files, e.g. with `manage.py bench_read_replicas`:
+#   DATABASES['replica'] = {
+#       'ENGINE': 'django.db.backends.sqlite3',
+#       'NAME': BASE_DIR / 'db-replica.sqlite3',
+#       'TEST': {'MIRROR': 'default'},
+#   }
+#   DATABASE_REPLICAS['ALIASES'] = ['replica']
+DATABASE_REPLICAS = {
+    'ALIASES': [],
+    'MODELS': [
+        'products.product',
+        'products.category',
+        'orders.order',
+        'orders.orderitem',
+        'orders.archivedorder',
+        'orders.archivedorderitem',
+    ],
+    'PIN_SECONDS': 5,
+    'PIN_CACHE': 'default',
+}
+
+
+# Cache
+
+# Per-process until a shared backend is configured, e.g.
+#   CACHES['default'] = {
+#       'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#       'LOCATION': 'redis://127.0.0.1:6379',
+#   }
+# The catalog response and product snapshot caches only serve cached
+# entries across workers when their alias is shared.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -125,6 +170,122 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+
+# Inventory
+# "locking" takes row locks at checkout; "conditional" reserves stock with a
+# guarded atomic UPDATE instead (better for hot SKUs under heavy traffic).
+INVENTORY_RESERVATION_MODE = "locking"
+
+# Seconds that stock stays reserved for a cart line after it was last
+# changed. None turns cart-time reservations off.
+CART_RESERVATION_TTL = 15 * 60
+
+
+# Checkout
+
+# Queue checkouts and commit them in small batches (one transaction, one
+# savepoint per cart) instead of one commit per request.
+CHECKOUT_GROUP_COMMIT = False
+CHECKOUT_GROUP_COMMIT_BATCH_SIZE = 16
+CHECKOUT_GROUP_COMMIT_MAX_WAIT = 0.005
+# Seconds a request waits for its batch before answering 503; a request
+# still queued by then is dropped rather than checked out late.
+CHECKOUT_GROUP_COMMIT_TIMEOUT = 10
+
+# Under ASGI the async checkout view runs OrderService.checkout in a pool
+# of this many threads per worker process (each may hold a DB connection).
+ASYNC_CHECKOUT_THREADS = 8
+
+# Checkout requests carrying an Idempotency-Key store their response per
+# (customer, key) for TTL seconds; retries get it replayed. A retry that
+# arrives while the first request runs polls for up to WAIT seconds.
+# Keys whose request died are reusable after IN_FLIGHT_TIMEOUT seconds.
+CHECKOUT_IDEMPOTENCY = {
+    "TTL": 24 * 60 * 60,
+    "IN_FLIGHT_TIMEOUT": 60,
+    "WAIT": 10,
+    "POLL_INTERVAL": 0.05,
+}
+
+# Finished (COMPLETED/CANCELLED) orders older than AFTER_DAYS are moved to
+# the archive tables by `manage.py archive_orders`, BATCH_SIZE orders per
+# transaction, keeping Order/OrderItem and their indexes small. History
+# and detail reads merge both.
+ORDER_ARCHIVE = {
+    "AFTER_DAYS": 180,
+    "BATCH_SIZE": 500,
+}
+
+
+# Catalog
+
+# Rendered product/category responses: an in-process LRU tier in front of
+# a shared tier (any configured cache alias). Entries are invalidated by
+# product/category save signals. With REQUIRE_SHARED and a per-process
+# ALIAS (LocMemCache) nothing is cached, since other workers would never
+# see the invalidation; set it to False only for a single process.
+CATALOG_CACHE = {
+    "ALIAS": "default",
+    "LOCAL_MAX_ENTRIES": 1024,
+    "TIMEOUT": 300,
+    "REQUIRE_SHARED": True,
+}
+
+# Normalized product name/SKU/price used by checkout. Entries live in an
+# in-process LRU; per-product version counters live in the ALIAS cache,
+# which must be shared (memcached/redis) when running several processes.
+# With REQUIRE_SHARED and a per-process ALIAS (the LocMemCache default
+# above) the LRU is bypassed and checkout reads prices from the database.
+# Set REQUIRE_SHARED to False only for a single-process deployment.
+PRODUCT_SNAPSHOT_CACHE = {
+    "ALIAS": "default",
+    "MAX_ENTRIES": 10000,
+    "REQUIRE_SHARED": True,
+}
+
+
+# Payment webhooks
+
+# Deliveries to webhooks/payment/inbox/ are stored and acknowledged; the
+# process_payment_webhooks command works the inbox off. Requests must carry
+# a hex HMAC-SHA256 of the body, keyed with SECRET, in X-Webhook-Signature;
+# with no SECRET the endpoint answers 503 to everything.
+# Events still PROCESSING after LEASE_SECONDS are claimed again.
+PAYMENT_WEBHOOK_INBOX = {
+    "SECRET": os.environ.get("PAYMENT_WEBHOOK_SECRET"),
+    "PAID_EVENTS": ["payment.succeeded"],
+    "LEASE_SECONDS": 60,
+}
+
+
+# Query profiling
+
+# Per-request SQL profile: Server-Timing header, a JSON log record for a
+# LOG_SAMPLE_RATE fraction of requests ("core.profiling" logger) and
+# per-view totals at /_profiling/queries/ (loopback/INTERNAL_IPS only).
+# Query shapes run REPEAT_THRESHOLD or more times in one request are reported as
+# likely N+1 loops. Disabled, the middleware removes itself at startup.
+QUERY_PROFILING = {
+    "ENABLED": False,
+    "LOG_SAMPLE_RATE": 0.01,
+    "REPEAT_THRESHOLD": 3,
+}
+
+
+# Metrics
+
+# /metrics/ serves this process's counters and histograms (e.g. checkout
+# phase timings) in Prometheus text format. Besides loopback and
+# INTERNAL_IPS, only these addresses may scrape it. With several worker
+# processes each one keeps, and exposes, its own values.
+METRICS_ALLOWED_IPS = []
+
+
 REST_FRAMEWORK = {
     "EXCEPTION_HANDLER": "core.exception_handlers.custom_exeption_handler"
 }
+
+# Order history and catalog responses are built from .values() rows and
+# encoded with core.serialization.render_json (orjson when installed)
+# instead of DRF serializers + JSONRenderer. The bytes are the same.
+FAST_SERIALIZATION = True
@@ -17,8 +17,19 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from payments.views import PaymentWebhookView
+from orders.views import PaymentWebhookInboxAPIView
+from core.views import metrics_view, query_profile_view
 
 urlpatterns = [
     path("api/orders/", include("orders.urls")),
-    path("webhooks/payment/", PaymentWebhookView.as_view())
+    path("api/products/", include("products.urls")),
+    path("api/cart/", include("cart.urls")),
+    path("webhooks/payment/", PaymentWebhookView.as_view()),
+    path(
+        "webhooks/payment/inbox/",
+        PaymentWebhookInboxAPIView.as_view(),
+        name="payment-webhook-inbox"
+    ),
+    path("_profiling/queries/", query_profile_view, name="query-profile"),
+    path("metrics/", metrics_view, name="metrics"),
 ]
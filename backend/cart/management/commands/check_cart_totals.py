@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+
+from cart.models import Cart
+from cart.services import CartService
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the stored subtotal/item_count of active carts with their "
+        "lines and report (or, with --repair, fix) any that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            help="Write the recomputed totals back.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        checked = 0
+        drifted = 0
+        last_id = 0
+
+        while True:
+            carts = list(
+                Cart.objects.filter(status=Cart.ACTIVE, id__gt=last_id)
+                .order_by("id")
+                .only("id", "subtotal", "item_count", "totals_stale")[:batch_size]
+            )
+            if not carts:
+                break
+
+            totals = CartService.compute_totals([cart.id for cart in carts])
+            broken = []
+            for cart in carts:
+                subtotal, item_count = totals[cart.id]
+                if (
+                    cart.totals_stale
+                    or cart.subtotal != subtotal
+                    or cart.item_count != item_count
+                ):
+                    self.stdout.write(
+                        f"Cart {cart.id}: stored {cart.subtotal}/{cart.item_count}, "
+                        f"actual {subtotal}/{item_count}"
+                    )
+                    cart.subtotal = subtotal
+                    cart.item_count = item_count
+                    cart.totals_stale = False
+                    broken.append(cart)
+
+            if broken and options["repair"]:
+                Cart.objects.bulk_update(
+                    broken, ["subtotal", "item_count", "totals_stale"]
+                )
+
+            checked += len(carts)
+            drifted += len(broken)
+            last_id = carts[-1].id
+
+        action = "repaired" if options["repair"] else "found"
+        self.stdout.write(f"Checked {checked} cart(s), {action} {drifted} out of date")
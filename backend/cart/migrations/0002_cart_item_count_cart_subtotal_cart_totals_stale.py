@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:02
+
+from django.db import migrations, models
+
+
+def mark_existing_carts_stale(apps, schema_editor):
+    # existing carts start at zero; let the next read recompute them
+    Cart = apps.get_model("cart", "Cart")
+    Cart.objects.update(totals_stale=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='totals_stale',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_existing_carts_stale, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+def close_duplicate_active_carts(apps, schema_editor):
+    # keep each customer's newest active cart; older ones could never be
+    # reached by the "active cart" lookups anyway
+    Cart = apps.get_model("cart", "Cart")
+    seen = set()
+    duplicates = []
+    active = Cart.objects.filter(status="ACTIVE").order_by("customer_id", "-id")
+    for cart_id, customer_id in active.values_list("id", "customer_id"):
+        if customer_id in seen:
+            duplicates.append(cart_id)
+        seen.add(customer_id)
+    Cart.objects.filter(id__in=duplicates).update(status="CHECKED_OUT")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0002_cart_item_count_cart_subtotal_cart_totals_stale'),
+        ('customers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            close_duplicate_active_carts, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'ACTIVE')), fields=('customer',), name='cart_one_active_per_customer'),
+        ),
+    ]
@@ -18,6 +18,21 @@ class Cart(TimeStampedModel):
         choices=STATUS_CHOICES,
         default=ACTIVE
     )
+    # running totals kept by CartService; totals_stale is set when lines
+    # or prices change behind its back (see cart/signals.py)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    totals_stale = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            # also the index behind the "active cart of customer" lookup
+            models.UniqueConstraint(
+                fields=["customer"],
+                condition=models.Q(status="ACTIVE"),
+                name="cart_one_active_per_customer"
+            ),
+        ]
 
     def __str__(self):
         return f"Cart {self.id} - {self.customer.email}"
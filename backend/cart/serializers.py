@@ -0,0 +1,14 @@
+from rest_framework import serializers
+
+class CartItemChangeSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0)
+
+class CartItemsBulkSerializer(serializers.Serializer):
+    items = CartItemChangeSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, items):
+        product_ids = [item["product"] for item in items]
+        if len(product_ids) != len(set(product_ids)):
+            raise serializers.ValidationError("Each product may appear only once")
+        return items
@@ -0,0 +1,125 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from cart.models import Cart, CartItem
+from inventory.services import ReservationService
+from products.models import Product
+from core.exceptions import CartNotActiveError, ProductNotFoundError
+
+
+class CartService:
+
+    @staticmethod
+    def set_item(cart, product, quantity):
+        """
+        Set the quantity of `product` in `cart` (0 removes the line) and
+        keep the matching stock reservation in step.
+        """
+        CartService.set_items(cart, {product.id: quantity})
+
+    @staticmethod
+    def set_items(cart, changes):
+        """
+        Apply many line changes at once. `changes` maps product id -> new
+        quantity (0 removes the line). Products are validated with one
+        query, lines are upserted with one INSERT .. ON CONFLICT and
+        removed with one DELETE. Cart totals are moved by the difference.
+        """
+        with transaction.atomic():
+            # row lock, as in checkout: a concurrent checkout either
+            # commits first (and the status check fails) or waits for us
+            locked_cart = Cart.objects.select_for_update().get(id=cart.id)
+            if locked_cart.status != Cart.ACTIVE:
+                raise CartNotActiveError("Cart is not active")
+
+            products = {
+                product_id: (price, is_active)
+                for product_id, price, is_active in
+                Product.objects.filter(id__in=changes)
+                .values_list("id", "price", "is_active")
+            }
+            # removing a line is always allowed, even for a product that
+            # was deactivated after it was added
+            unknown = {
+                product_id for product_id, qty in changes.items()
+                if qty and not products.get(product_id, (None, False))[1]
+            }
+            if unknown:
+                raise ProductNotFoundError(unknown)
+
+            if ReservationService.ttl() is not None:
+                ReservationService.reserve_many(cart, changes)
+
+            current = dict(
+                CartItem.objects.filter(cart=cart, product_id__in=changes)
+                .values_list("product_id", "quantity")
+            )
+
+            CartItem.objects.bulk_create(
+                [
+                    CartItem(cart=cart, product_id=product_id, quantity=qty)
+                    for product_id, qty in changes.items() if qty
+                ],
+                update_conflicts=True,
+                unique_fields=["cart", "product"],
+                update_fields=["quantity"],
+            )
+
+            removed = [product_id for product_id, qty in changes.items() if not qty]
+            if removed:
+                CartItem.objects.filter(cart=cart, product_id__in=removed).delete()
+
+            subtotal_delta = Decimal("0")
+            count_delta = 0
+            for product_id, qty in changes.items():
+                delta = qty - current.get(product_id, 0)
+                if delta:
+                    subtotal_delta += products[product_id][0] * delta
+                count_delta += delta
+
+            CartService.apply_totals_delta(cart, subtotal_delta, count_delta)
+
+    @staticmethod
+    def apply_totals_delta(cart, subtotal_delta, count_delta):
+        """
+        Move the stored totals by a delta. A stale cart is recomputed
+        instead, since its stored subtotal is already off.
+        """
+        updated = Cart.objects.filter(id=cart.id, totals_stale=False).update(
+            subtotal=F("subtotal") + subtotal_delta,
+            item_count=F("item_count") + count_delta
+        )
+        if not updated:
+            CartService.refresh_totals(cart)
+
+    @staticmethod
+    def compute_totals(cart_ids):
+        """
+        Return {cart id: (subtotal, item count)} from the cart lines.
+        """
+        totals = {cart_id: (Decimal("0"), 0) for cart_id in cart_ids}
+        rows = (
+            CartItem.objects.filter(cart_id__in=cart_ids)
+            .values("cart_id")
+            .annotate(
+                subtotal=Sum(F("quantity") * F("product__price")),
+                item_count=Sum("quantity")
+            )
+        )
+        for row in rows:
+            totals[row["cart_id"]] = (row["subtotal"], row["item_count"])
+        return totals
+
+    @staticmethod
+    def refresh_totals(cart):
+        subtotal, item_count = CartService.compute_totals([cart.id])[cart.id]
+        Cart.objects.filter(id=cart.id).update(
+            subtotal=subtotal,
+            item_count=item_count,
+            totals_stale=False
+        )
+        cart.subtotal = subtotal
+        cart.item_count = item_count
+        cart.totals_stale = False
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from cart.models import Cart, CartItem
+from products.models import Product
+
+# CartService keeps cart totals up to date with bulk statements, which do
+# not send signals. Any other save of a cart line, or a product change
+# that may alter its price, flags the affected carts for recomputation.
+# Deleting a product flags the carts whose lines the cascade removes.
+# There is deliberately no CartItem delete receiver: it would turn
+# CartService's single DELETE into a select-then-delete and flag every
+# cart it just kept exact, so remove lines through CartService. Checkout
+# prices orders from the product snapshots, never from the stored subtotal.
+
+
+@receiver(post_save, sender=CartItem)
+def mark_cart_totals_stale(sender, instance, **kwargs):
+    Cart.objects.filter(id=instance.cart_id).update(totals_stale=True)
+
+
+@receiver(post_save, sender=Product)
+@receiver(pre_delete, sender=Product)
+def mark_carts_with_product_stale(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    Cart.objects.filter(
+        status=Cart.ACTIVE,
+        items__product_id=instance.id
+    ).update(totals_stale=True)
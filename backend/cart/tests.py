@@ -1,3 +1,324 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from customers.models import Customer
+from products.models import Category, Product
+from products.snapshots import product_snapshots
+from cart.models import Cart, CartItem
+from cart.services import CartService
+from cart.views import CartItemsBulkAPIView
+from inventory.models import Inventory, StockReservation
+from inventory.services import ReservationService
+from orders.services import OrderService
+from core.exceptions import (
+    CartNotActiveError,
+    InsufficientStockError,
+    ProductNotFoundError,
+)
+
+
+class CartReservationTest(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            email="hen@test.com",
+            name="Hen"
+        )
+        self.category = Category.objects.create(
+            name="Sepatu",
+            slug="sepatu"
+        )
+        self.product = Product.objects.create(
+            name="Sepatu Lari X",
+            sku="SKU-001",
+            price=Decimal("500000"),
+            category=self.category
+        )
+        Inventory.objects.create(
+            product=self.product,
+            quantity_available=10
+        )
+        self.cart = Cart.objects.create(customer=self.customer)
+
+    def available(self):
+        return Inventory.objects.get(product=self.product).quantity_available
+
+    def test_set_item_reserves_stock(self):
+        CartService.set_item(self.cart, self.product, 3)
+        self.assertEqual(self.available(), 7)
+
+        CartService.set_item(self.cart, self.product, 1)
+        self.assertEqual(self.available(), 9)
+
+        reservation = StockReservation.objects.get(cart=self.cart)
+        self.assertEqual(reservation.quantity, 1)
+
+        CartService.set_item(self.cart, self.product, 0)
+        self.assertEqual(self.available(), 10)
+        self.assertFalse(CartItem.objects.filter(cart=self.cart).exists())
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_set_item_over_stock_raises_error(self):
+        with self.assertRaises(InsufficientStockError):
+            CartService.set_item(self.cart, self.product, 11)
+
+        self.assertEqual(self.available(), 10)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_checkout_converts_reservations(self):
+        CartService.set_item(self.cart, self.product, 2)
+
+        order = OrderService.checkout(self.cart)
+
+        self.assertEqual(order.items.get().quantity, 2)
+        self.assertEqual(self.available(), 8)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_checkout_with_stale_reservation_takes_stock_itself(self):
+        CartService.set_item(self.cart, self.product, 2)
+        CartItem.objects.filter(cart=self.cart).update(quantity=4)
+
+        OrderService.checkout(self.cart)
+
+        self.assertEqual(self.available(), 6)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_release_expired_returns_stock(self):
+        CartService.set_item(self.cart, self.product, 3)
+        other_cart = Cart.objects.create(
+            customer=Customer.objects.create(email="b@test.com", name="B")
+        )
+        CartService.set_item(other_cart, self.product, 2)
+        StockReservation.objects.filter(cart=self.cart).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        released = ReservationService.release_expired(batch_size=1)
+
+        self.assertEqual(released, 1)
+        self.assertEqual(self.available(), 8)
+        self.assertEqual(StockReservation.objects.get().cart, other_cart)
+
+    @override_settings(CART_RESERVATION_TTL=None)
+    def test_reservations_can_be_turned_off(self):
+        CartService.set_item(self.cart, self.product, 3)
+
+        self.assertEqual(self.available(), 10)
+        self.assertFalse(StockReservation.objects.exists())
+
+
+class CartItemsBulkAPITest(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            email="hen@test.com",
+            name="Hen"
+        )
+        category = Category.objects.create(name="Sepatu", slug="sepatu")
+        self.products = []
+        for i in range(3):
+            product = Product.objects.create(
+                name=f"Produk {i}",
+                sku=f"SKU-{i}",
+                price=Decimal("1000"),
+                category=category
+            )
+            Inventory.objects.create(product=product, quantity_available=10)
+            self.products.append(product)
+
+    def post(self, items):
+        request = APIRequestFactory().post(
+            "/api/cart/items/", {"items": items}, format="json"
+        )
+        force_authenticate(
+            request, user=SimpleNamespace(customer=self.customer, is_authenticated=True)
+        )
+        return CartItemsBulkAPIView.as_view()(request)
+
+    def lines(self):
+        return dict(
+            CartItem.objects.filter(cart__customer=self.customer)
+            .values_list("product_id", "quantity")
+        )
+
+    def test_bulk_upsert_and_delete(self):
+        a, b, c = self.products
+        response = self.post([
+            {"product": a.id, "quantity": 2},
+            {"product": b.id, "quantity": 1},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.lines(), {a.id: 2, b.id: 1})
+
+        cart = Cart.objects.get(customer=self.customer)
+        with CaptureQueriesContext(connection) as ctx:
+            CartService.set_items(cart, {a.id: 5, b.id: 0, c.id: 3})
+        statements = [
+            query["sql"] for query in ctx.captured_queries
+            if "SAVEPOINT" not in query["sql"]
+        ]
+
+        self.assertEqual(self.lines(), {a.id: 5, c.id: 3})
+        self.assertEqual(Inventory.objects.get(product=a).quantity_available, 5)
+        self.assertEqual(Inventory.objects.get(product=b).quantity_available, 10)
+        # cart lock, product check, reservation lock/take/give back/
+        # upsert/delete, current lines, line upsert/delete and the totals
+        # update: independent of the number of lines
+        self.assertEqual(len(statements), 11)
+
+    def test_unknown_product_is_rejected(self):
+        inactive = self.products[0]
+        inactive.is_active = False
+        inactive.save()
+
+        with self.assertRaises(ProductNotFoundError) as ctx:
+            CartService.set_items(
+                Cart.objects.create(customer=self.customer),
+                {inactive.id: 1, 999: 1}
+            )
+
+        self.assertEqual(ctx.exception.product_ids, [inactive.id, 999])
+        self.assertEqual(self.lines(), {})
+
+    def test_deactivated_product_can_be_removed(self):
+        a, b, _ = self.products
+        cart = Cart.objects.create(customer=self.customer)
+        CartService.set_items(cart, {a.id: 2, b.id: 1})
+        a.is_active = False
+        a.save()
+
+        CartService.set_items(cart, {a.id: 0})
+
+        self.assertEqual(self.lines(), {b.id: 1})
+        self.assertEqual(Inventory.objects.get(product=a).quantity_available, 10)
+        cart.refresh_from_db()
+        self.assertEqual((cart.subtotal, cart.item_count), (Decimal("1000"), 1))
+
+    def test_checked_out_cart_is_rejected_even_if_instance_is_stale(self):
+        a, b, _ = self.products
+        cart = Cart.objects.create(customer=self.customer)
+        CartService.set_items(cart, {a.id: 1})
+        # a concurrent checkout committed; this instance still says ACTIVE
+        OrderService.checkout(Cart.objects.get(id=cart.id))
+        self.assertEqual(cart.status, Cart.ACTIVE)
+
+        with self.assertRaises(CartNotActiveError):
+            CartService.set_items(cart, {b.id: 1})
+
+        self.assertFalse(CartItem.objects.filter(cart=cart, product=b).exists())
+        self.assertFalse(StockReservation.objects.filter(cart=cart, product=b).exists())
+
+    def test_duplicate_products_are_rejected(self):
+        product = self.products[0]
+        response = self.post([
+            {"product": product.id, "quantity": 1},
+            {"product": product.id, "quantity": 2},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+
+
+class CartTotalsTest(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            email="hen@test.com",
+            name="Hen"
+        )
+        category = Category.objects.create(name="Sepatu", slug="sepatu")
+        self.shoe = Product.objects.create(
+            name="Sepatu Lari X",
+            sku="SKU-001",
+            price=Decimal("500000"),
+            category=category
+        )
+        self.socks = Product.objects.create(
+            name="Kaos Kaki",
+            sku="SKU-002",
+            price=Decimal("20000"),
+            category=category
+        )
+        Inventory.objects.create(product=self.shoe, quantity_available=10)
+        Inventory.objects.create(product=self.socks, quantity_available=10)
+        self.cart = Cart.objects.create(customer=self.customer)
+
+    def totals(self):
+        cart = Cart.objects.get(id=self.cart.id)
+        return cart.subtotal, cart.item_count, cart.totals_stale
+
+    def test_totals_follow_line_changes(self):
+        CartService.set_items(self.cart, {self.shoe.id: 2, self.socks.id: 3})
+        self.assertEqual(self.totals(), (Decimal("1060000"), 5, False))
+
+        CartService.set_item(self.cart, self.shoe, 1)
+        CartService.set_item(self.cart, self.socks, 0)
+        self.assertEqual(self.totals(), (Decimal("500000"), 1, False))
+
+    def test_price_change_marks_cart_stale(self):
+        CartService.set_item(self.cart, self.shoe, 2)
+
+        self.shoe.price = Decimal("450000")
+        self.shoe.save()
+        self.assertTrue(self.totals()[2])
+
+        CartService.set_item(self.cart, self.socks, 1)
+        self.assertEqual(self.totals(), (Decimal("920000"), 3, False))
+
+    def test_deleting_a_product_marks_cart_stale(self):
+        CartService.set_items(self.cart, {self.shoe.id: 1, self.socks.id: 2})
+
+        self.socks.delete()
+
+        self.assertEqual(self.totals(), (Decimal("540000"), 3, True))
+        CartService.refresh_totals(self.cart)
+        self.assertEqual(self.totals(), (Decimal("500000"), 1, False))
+
+    def test_checkout_prices_from_snapshots_when_totals_fresh(self):
+        CartService.set_items(self.cart, {self.shoe.id: 1, self.socks.id: 2})
+
+        order = OrderService.checkout(self.cart)
+
+        self.assertEqual(order.total_amount, Decimal("540000"))
+
+    def test_checkout_total_matches_items_after_unsignalled_price_change(self):
+        CartService.set_items(self.cart, {self.shoe.id: 2})
+        # bulk writes send no post_save: the cart still looks fresh
+        Product.objects.filter(id=self.shoe.id).update(price=Decimal("450000"))
+        product_snapshots.bump(self.shoe.id)
+        self.assertFalse(self.totals()[2])
+
+        with self.assertLogs("orders.services", "WARNING"):
+            order = OrderService.checkout(self.cart)
+
+        self.assertEqual(order.total_amount, Decimal("900000"))
+        self.assertEqual(
+            order.total_amount,
+            sum(item.product_price * item.quantity for item in order.items.all())
+        )
+
+    def test_checkout_recomputes_stale_total(self):
+        CartService.set_item(self.cart, self.shoe, 1)
+        Cart.objects.filter(id=self.cart.id).update(subtotal=Decimal("1"))
+        CartItem.objects.get(cart=self.cart).save()
+
+        order = OrderService.checkout(self.cart)
+
+        self.assertEqual(order.total_amount, Decimal("500000"))
+
+    def test_check_cart_totals_command_repairs_drift(self):
+        CartService.set_item(self.cart, self.shoe, 2)
+        Cart.objects.filter(id=self.cart.id).update(subtotal=Decimal("1"))
+
+        out = StringIO()
+        call_command("check_cart_totals", stdout=out)
+        self.assertIn("found 1 out of date", out.getvalue())
+        self.assertEqual(self.totals()[0], Decimal("1"))
+
+        call_command("check_cart_totals", "--repair", stdout=StringIO())
+        self.assertEqual(self.totals(), (Decimal("1000000"), 2, False))
@@ -0,0 +1,7 @@
+from django.urls import path
+from cart.views import CartAPIView, CartItemsBulkAPIView
+
+urlpatterns = [
+    path("", CartAPIView.as_view(), name="cart"),
+    path("items/", CartItemsBulkAPIView.as_view(), name="cart-items-bulk"),
+]
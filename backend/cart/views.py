@@ -1,3 +1,69 @@
-from django.shortcuts import render
+from django.db import IntegrityError, transaction
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
 
-# Create your views here.
+from cart.models import Cart
+from cart.serializers import CartItemsBulkSerializer
+from cart.services import CartService
+from orders.snapshots import format_price
+
+
+class CartItemsBulkAPIView(APIView):
+    def post(self, request):
+        """
+        set quantities of many lines in current customer's active cart
+        """
+        serializer = CartItemsBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        customer = request.user.customer
+        cart = Cart.objects.filter(
+            customer=customer,
+            status=Cart.ACTIVE
+        ).first()
+        if not cart:
+            try:
+                with transaction.atomic():
+                    cart = Cart.objects.create(customer=customer)
+            except IntegrityError:
+                # a concurrent request created it (one active cart per customer)
+                cart = Cart.objects.get(customer=customer, status=Cart.ACTIVE)
+
+        CartService.set_items(cart, {
+            item["product"]: item["quantity"]
+            for item in serializer.validated_data["items"]
+        })
+
+        items = cart.items.order_by("product_id").values("product", "quantity")
+        return Response(
+            {"cart": cart.id, "items": list(items)},
+            status=status.HTTP_200_OK
+        )
+
+
+
+class CartAPIView(APIView):
+    def get(self, request):
+        """
+        totals of current customer's active cart (single-row read)
+        """
+        cart = Cart.objects.filter(
+            customer=request.user.customer,
+            status=Cart.ACTIVE
+        ).only("id", "subtotal", "item_count", "totals_stale").first()
+
+        if not cart:
+            return Response(
+                {"error": "Active cart not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        if cart.totals_stale:
+            CartService.refresh_totals(cart)
+
+        return Response({
+            "cart": cart.id,
+            "subtotal": format_price(cart.subtotal),
+            "item_count": cart.item_count,
+        })
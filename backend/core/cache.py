@@ -0,0 +1,52 @@
+import threading
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class LRUCache:
+    """
+    Small thread-safe, size-bounded in-process cache. The least recently
+    used entry is evicted once `maxsize` is exceeded.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def is_shared_cache(alias):
+    """
+    True when the cache alias is visible to every worker process (redis,
+    memcached, database, ...); LocMemCache and DummyCache are not.
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
@@ -0,0 +1,81 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_force_primary = ContextVar("force_primary", default=False)
+
+
+def replica_settings():
+    return {
+        "ALIASES": [],
+        "MODELS": [],
+        "PIN_SECONDS": 5,
+        "PIN_CACHE": "default",
+        **getattr(settings, "DATABASE_REPLICAS", {}),
+    }
+
+
+@contextmanager
+def use_primary():
+    """
+    Send every read inside the block to the primary.
+    """
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+
+def _pin_key(key):
+    return f"db:pin-primary:{key}"
+
+
+def pin_to_primary(key):
+    """
+    Start a read-your-writes window for `key` (e.g. "customer:42"): for
+    PIN_SECONDS, read_your_writes(key) blocks read from the primary, giving
+    replicas time to catch up with the write that was just made.
+    """
+    config = replica_settings()
+    if config["ALIASES"]:
+        caches[config["PIN_CACHE"]].set(_pin_key(key), True, config["PIN_SECONDS"])
+
+
+@contextmanager
+def read_your_writes(key):
+    config = replica_settings()
+    if config["ALIASES"] and caches[config["PIN_CACHE"]].get(_pin_key(key)):
+        with use_primary():
+            yield
+    else:
+        yield
+
+
+class ReplicaRouter:
+    """
+    Route reads of the models listed in DATABASE_REPLICAS["MODELS"] to a
+    random replica alias; everything else, every write and every read made
+    inside a transaction on the primary (select_for_update, OrderService)
+    stays on the primary. With no replicas configured it is a no-op.
+    """
+
+    def db_for_read(self, model, **hints):
+        config = replica_settings()
+        replicas = config["ALIASES"]
+        if not replicas or model._meta.label_lower not in config["MODELS"]:
+            return DEFAULT_DB_ALIAS
+        if _force_primary.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
@@ -3,10 +3,12 @@ from rest_framework.response import Response
 from rest_framework import status
 
 from core.exceptions import(
-    DomainError,
     CartNotActiveError,
+    CheckoutUnavailableError,
     EmptyCartError,
+    IdempotencyKeyInUseError,
     InsufficientStockError,
+    ProductNotFoundError,
 )
 
 def custom_exeption_handler(exc, context):
@@ -15,20 +17,38 @@ def custom_exeption_handler(exc, context):
     """
     if isinstance(exc, CartNotActiveError):
         return Response(
-            {"error": str(s)},
+            {"error": str(exc)},
             status=status.HTTP_400_BAD_REQUEST
         )
     
     if isinstance(exc, EmptyCartError):
         return Response(
-            {"error": str(e)},
+            {"error": str(exc)},
             status=status.HTTP_400_BAD_REQUEST
         )
     
     if isinstance(exc, InsufficientStockError):
         return Response(
-            {"error": str(e)},
+            {"error": str(exc)},
             status=status.HTTP_409_CONFLICT
         )
     
+    if isinstance(exc, ProductNotFoundError):
+        return Response(
+            {"error": str(exc), "product_ids": exc.product_ids},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if isinstance(exc, IdempotencyKeyInUseError):
+        return Response(
+            {"error": str(exc)},
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    if isinstance(exc, CheckoutUnavailableError):
+        return Response(
+            {"error": str(exc)},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    
     return exception_handler(exc, context)
\ No newline at end of file
@@ -11,4 +11,15 @@ class EmptyCartError(DomainError):
 class InsufficientStockError(DomainError):
     def __init__(self, product_name):
         self.product_name = product_name
-        super().__init__(f"Insufficient stock for product: {product_name}")
\ No newline at end of file
+        super().__init__(f"Insufficient stock for product: {product_name}")
+
+class ProductNotFoundError(DomainError):
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f"Unknown or inactive products: {self.product_ids}")
+
+class IdempotencyKeyInUseError(DomainError):
+    pass
+
+class CheckoutUnavailableError(DomainError):
+    pass
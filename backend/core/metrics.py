@@ -0,0 +1,208 @@
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _ShardedMetric:
+    """
+    Values are recorded into a dict owned by the calling thread, so the
+    hot path takes no lock; the lock is only held while a new thread
+    registers its shard. Collection sums the shards of all threads (and
+    keeps those of finished threads, so totals never go backwards).
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def _key(self, labels):
+        return tuple(labels[name] for name in self.labelnames)
+
+    def _snapshots(self):
+        with self._lock:
+            shards = list(self._shards)
+        # list(dict.items()) runs without releasing the GIL
+        return [list(shard.items()) for shard in shards]
+
+    def expose(self):
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        return lines + self._samples()
+
+
+class Counter(_ShardedMetric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def collect(self):
+        totals = {}
+        for items in self._snapshots():
+            for key, value in items:
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def _samples(self):
+        return [
+            f"{self.name}{_labels(self.labelnames, key)} {_format(value)}"
+            for key, value in sorted(self.collect().items())
+        ]
+
+
+class Histogram(_ShardedMetric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        entry = shard.get(key)
+        if entry is None:
+            # per-bucket (non cumulative) counts, +Inf last, then the sum
+            entry = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        entry[bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def collect(self):
+        """
+        {label values: (cumulative bucket counts incl. +Inf, sum, count)}
+        """
+        merged = {}
+        for items in self._snapshots():
+            for key, entry in items:
+                total = merged.setdefault(key, [0] * len(entry))
+                for index, value in enumerate(entry):
+                    total[index] += value
+
+        collected = {}
+        for key, entry in merged.items():
+            cumulative = []
+            running = 0
+            for count in entry[:-1]:
+                running += count
+                cumulative.append(running)
+            collected[key] = (cumulative, entry[-1], running)
+        return collected
+
+    def _samples(self):
+        lines = []
+        bounds = self.buckets + (float("inf"),)
+        for key, (cumulative, total, count) in sorted(self.collect().items()):
+            for bound, value in zip(bounds, cumulative):
+                labels = _labels(self.labelnames, key, [("le", _format(bound))])
+                lines.append(f"{self.name}_bucket{labels} {value}")
+            labels = _labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def expose(self):
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+class PhaseTimer:
+    """
+    Times consecutive phases of one operation: each `mark(phase)` records
+    the time since the previous mark (or since creation).
+    """
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.histogram.observe(now - self.last, phase=phase)
+        self.last = now
+
+
+def count_errors(counter, exception_class):
+    """
+    Decorator counting `exception_class` (and subclasses) raised by the
+    wrapped function, labelled by the concrete class name.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            except exception_class as exc:
+                counter.inc(error=type(exc).__name__)
+                raise
+        return wrapper
+    return decorator
+
+
+registry = MetricsRegistry()
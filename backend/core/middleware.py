@@ -0,0 +1,76 @@
+import json
+import logging
+import random
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.profiling import QueryProfile, query_profiles
+
+logger = logging.getLogger("core.profiling")
+
+
+def profiling_settings():
+    return {
+        "ENABLED": False,
+        "LOG_SAMPLE_RATE": 0.01,
+        "REPEAT_THRESHOLD": 3,
+        **getattr(settings, "QUERY_PROFILING", {}),
+    }
+
+
+def view_name(view_func):
+    view_class = getattr(view_func, "view_class", None)
+    if view_class is not None:
+        return view_class.__name__
+    return getattr(view_func, "__qualname__", repr(view_func))
+
+
+class QueryProfilingMiddleware:
+    """
+    Opt-in per-request SQL profile (QUERY_PROFILING["ENABLED"]).
+
+    Adds a Server-Timing header (query count, total and slowest query
+    time), logs a sampled JSON record to the "core.profiling" logger and
+    feeds the per-view totals served by core.views.query_profile_view.
+    When disabled Django drops the middleware at startup, so it costs
+    nothing per request.
+    """
+
+    def __init__(self, get_response):
+        config = profiling_settings()
+        if not config["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config["LOG_SAMPLE_RATE"]
+        self.repeat_threshold = config["REPEAT_THRESHOLD"]
+
+    def __call__(self, request):
+        with QueryProfile() as profile:
+            response = self.get_response(request)
+
+        view = getattr(request, "_profiled_view", None) or request.path
+        repeated = profile.repeated(self.repeat_threshold)
+        query_profiles.add(view, profile, repeated)
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={profile.duration * 1000:.2f};desc="{profile.count} queries"',
+            f"db-slowest;dur={profile.slowest_duration * 1000:.2f}",
+        ])
+
+        if random.random() < self.sample_rate:
+            logger.info(json.dumps({
+                "view": view,
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "queries": profile.count,
+                "db_ms": round(profile.duration * 1000, 3),
+                "slowest_sql": profile.slowest_sql,
+                "slowest_sql_ms": round(profile.slowest_duration * 1000, 3),
+                "repeated_shapes": repeated,
+            }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._profiled_view = view_name(view_func)
@@ -0,0 +1,129 @@
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+_IN_LIST = re.compile(r"\((?:\s*%s\s*,)*\s*%s\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def query_shape(sql):
+    """
+    Statement text with IN lists of any length folded into one, so the
+    same query issued in a loop (or with different list sizes) compares
+    equal. Parameters are already placeholders in wrapped SQL.
+    """
+    return _SPACES.sub(" ", _IN_LIST.sub("(%s, ...)", sql)).strip()
+
+
+class QueryProfile:
+    """
+    Statements run on every database connection of the current thread
+    while the profile is active (a connection.execute_wrapper, so it does
+    not depend on DEBUG).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_sql = None
+        self.slowest_duration = 0.0
+        self.shapes = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            if elapsed >= self.slowest_duration:
+                self.slowest_duration = elapsed
+                self.slowest_sql = sql
+            shape = query_shape(sql)
+            self.shapes[shape] = self.shapes.get(shape, 0) + 1
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def repeated(self, threshold=2):
+        """
+        {shape: times} for shapes run at least `threshold` times, most
+        repeated first: the usual sign of an N+1 loop.
+        """
+        repeated = [
+            (shape, times) for shape, times in self.shapes.items()
+            if times >= threshold
+        ]
+        repeated.sort(key=lambda item: -item[1])
+        return dict(repeated)
+
+
+class ProfileAggregate:
+    """
+    Per-view totals of the profiles seen by this process.
+    """
+
+    def __init__(self, top_shapes=5):
+        self.top_shapes = top_shapes
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def add(self, view, profile, repeated):
+        with self._lock:
+            stats = self._views.setdefault(view, {
+                "requests": 0,
+                "queries": 0,
+                "db_ms": 0.0,
+                "max_queries": 0,
+                "max_db_ms": 0.0,
+                "slowest_sql": None,
+                "slowest_sql_ms": 0.0,
+                "requests_with_repeats": 0,
+                "repeated_shapes": {},
+            })
+            db_ms = profile.duration * 1000
+            stats["requests"] += 1
+            stats["queries"] += profile.count
+            stats["db_ms"] += db_ms
+            stats["max_queries"] = max(stats["max_queries"], profile.count)
+            stats["max_db_ms"] = max(stats["max_db_ms"], db_ms)
+            if profile.slowest_duration * 1000 >= stats["slowest_sql_ms"]:
+                stats["slowest_sql_ms"] = profile.slowest_duration * 1000
+                stats["slowest_sql"] = profile.slowest_sql
+            if repeated:
+                stats["requests_with_repeats"] += 1
+                shapes = stats["repeated_shapes"]
+                for shape, times in repeated.items():
+                    shapes[shape] = max(shapes.get(shape, 0), times)
+                if len(shapes) > self.top_shapes:
+                    kept = sorted(shapes.items(), key=lambda item: -item[1])
+                    stats["repeated_shapes"] = dict(kept[:self.top_shapes])
+
+    def snapshot(self):
+        with self._lock:
+            report = {}
+            for view, stats in self._views.items():
+                report[view] = dict(
+                    stats,
+                    repeated_shapes=dict(stats["repeated_shapes"]),
+                    avg_queries=stats["queries"] / stats["requests"],
+                    avg_db_ms=stats["db_ms"] / stats["requests"],
+                )
+            return report
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+query_profiles = ProfileAggregate()
@@ -0,0 +1,57 @@
+import json
+from decimal import ROUND_HALF_UP, Context, Decimal
+
+from django.utils import timezone
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder gives the same bytes
+    orjson = None
+
+
+def decimal_converter(field):
+    """
+    Return a function rendering values of the model DecimalField `field`
+    the way DRF's DecimalField does ("1000.00"), with the quantize
+    exponent and context built once.
+    """
+    exponent = Decimal(1).scaleb(-field.decimal_places)
+    context = Context(prec=field.max_digits, rounding=ROUND_HALF_UP)
+
+    def convert(value):
+        if value is None:
+            return None
+        return "{:f}".format(value.quantize(exponent, context=context))
+    return convert
+
+
+def datetime_converter():
+    """
+    Return a function rendering aware datetimes like DRF's DateTimeField:
+    ISO 8601 in the current time zone, "+00:00" written as "Z".
+    """
+    tz = timezone.get_current_timezone()
+
+    def convert(value):
+        if value is None:
+            return None
+        value = value.astimezone(tz).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+    return convert
+
+
+def render_json(data):
+    """
+    Encode plain dicts/lists/str/int/bool/None to the exact bytes DRF's
+    JSONRenderer produces with default settings (compact separators, raw
+    UTF-8, U+2028/U+2029 escaped), using orjson when it is installed.
+    """
+    if orjson is not None:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(
+            data, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode()
+    return body.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
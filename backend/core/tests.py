@@ -1,3 +1,267 @@
-from django.test import TestCase
+import re
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from core.cache import LRUCache
+from core.metrics import MetricsRegistry, count_errors
+from core.db_routers import (
+    ReplicaRouter,
+    pin_to_primary,
+    read_your_writes,
+    use_primary,
+)
+from core.profiling import QueryProfile, query_profiles, query_shape
+from cart.models import Cart, CartItem
+from customers.models import Customer
+from inventory.models import Inventory, StockReservation
+from orders.models import (
+    ArchivedOrder,
+    CheckoutIdempotencyKey,
+    Order,
+    PaymentWebhookEvent,
+)
+from products.models import Category, Product
+
+
+class LRUCacheTest(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        lru = LRUCache(maxsize=2)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")
+        lru.set("c", 3)
+
+        self.assertEqual(lru.get("a"), 1)
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual(lru.get("c"), 3)
+        self.assertEqual(len(lru), 2)
+
+
+class QueryPlanTest(TestCase):
+    """
+    EXPLAIN every hot lookup and fail when it reads its table with a full
+    scan, so a dropped or unusable index shows up here rather than as a
+    slow endpoint once the table has grown. Tables stay empty: planners
+    are told (postgres) or assumed (sqlite) to prefer indexes anyway.
+    """
+
+    HOT_QUERIES = {
+        "active cart of customer": lambda: Cart.objects.filter(
+            customer_id=1, status=Cart.ACTIVE
+        ),
+        "cart lines": lambda: CartItem.objects.filter(cart_id=1),
+        "inventory by product": lambda: Inventory.objects.filter(product_id=1),
+        "inventory of many products": lambda: Inventory.objects.filter(
+            product_id__in=[1, 2, 3]
+        ).order_by("product_id"),
+        "product by sku": lambda: Product.objects.filter(sku="SKU-001"),
+        "orders of customer by status": lambda: Order.objects.filter(
+            customer_id=1, status=Order.PENDING
+        ),
+        "order history page": lambda: Order.objects.filter(
+            customer_id=1
+        ).order_by("-created_at", "-id"),
+        "archived order history page": lambda: ArchivedOrder.objects.filter(
+            customer_id=1
+        ).order_by("-created_at", "-id"),
+        "expired reservations": lambda: StockReservation.objects.filter(
+            expires_at__lte=timezone.now()
+        ).order_by("expires_at"),
+        "open webhook events": lambda: PaymentWebhookEvent.objects.filter(
+            status=PaymentWebhookEvent.RECEIVED
+        ).order_by("id"),
+        "idempotency key": lambda: CheckoutIdempotencyKey.objects.filter(
+            customer_id=1, key="key-1"
+        ),
+    }
+
+    def full_scans(self, queryset):
+        table = queryset.model._meta.db_table
+        if connection.vendor == "sqlite":
+            # "SCAN t" (or "SCAN TABLE t") reads every row; "SEARCH t
+            # USING INDEX" does not
+            pattern = rf"\bSCAN (TABLE )?{table}\b"
+            plan = queryset.explain()
+        elif connection.vendor == "postgresql":
+            pattern = rf"Seq Scan on {table}\b"
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+                plan = queryset.explain()
+        else:
+            self.skipTest(f"no plan check for {connection.vendor}")
+        return [line for line in plan.splitlines() if re.search(pattern, line)], plan
+
+    def test_hot_queries_use_indexes(self):
+        for name, build in self.HOT_QUERIES.items():
+            with self.subTest(query=name):
+                scans, plan = self.full_scans(build())
+                self.assertEqual(scans, [], f"{name} scans its table:\n{plan}")
+
+    def test_one_active_cart_per_customer(self):
+        customer = Customer.objects.create(email="a@test.com", name="A")
+        Cart.objects.create(customer=customer)
+        Cart.objects.create(customer=customer, status=Cart.CHECKED_OUT)
+
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Cart.objects.create(customer=customer)
+
+
+@override_settings(QUERY_PROFILING={"ENABLED": True, "LOG_SAMPLE_RATE": 1.0})
+class QueryProfilingTest(TestCase):
+    def setUp(self):
+        query_profiles.reset()
+        category = Category.objects.create(name="Sepatu", slug="sepatu")
+        Product.objects.create(
+            name="Sepatu", sku="SKU-001", price=1000, category=category
+        )
+
+    def test_in_lists_share_a_shape(self):
+        self.assertEqual(
+            query_shape('SELECT 1 WHERE "id" IN (%s, %s,  %s)'),
+            query_shape('SELECT 1 WHERE "id" IN (%s)'),
+        )
+
+    def test_repeated_shapes_are_reported(self):
+        with QueryProfile() as profile:
+            for product_id in range(4):
+                list(Product.objects.filter(id=product_id))
+            list(Category.objects.all())
+
+        self.assertEqual(profile.count, 5)
+        self.assertEqual(list(profile.repeated(3).values()), [4])
+
+    def test_response_carries_server_timing_and_is_aggregated(self):
+        with self.assertLogs("core.profiling", level="INFO") as logs:
+            response = Client().get("/api/products/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^db;dur=[\d.]+;desc="\d+ queries", db-slowest;dur=[\d.]+$'
+        )
+        self.assertIn('"view": "ProductListAPIView"', logs.output[0])
+
+        report = Client().get("/_profiling/queries/").json()["views"]
+        self.assertEqual(report["ProductListAPIView"]["requests"], 1)
+
+    def test_report_is_local_only(self):
+        response = Client(REMOTE_ADDR="10.0.0.1").get("/_profiling/queries/")
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(QUERY_PROFILING={"ENABLED": False})
+    def test_disabled_middleware_is_not_loaded(self):
+        response = Client().get("/api/products/")
+
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(Client().get("/_profiling/queries/").status_code, 404)
+
+
+class MetricsTest(SimpleTestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_histogram_merges_thread_shards(self):
+        histogram = self.registry.histogram(
+            "phase_seconds", "Phase time.", ["phase"], buckets=(0.1, 1.0)
+        )
+
+        def record():
+            for _ in range(100):
+                histogram.observe(0.05, phase="a")
+            histogram.observe(0.5, phase="a")
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        histogram.observe(5, phase="b")
+
+        cumulative, total, count = histogram.collect()[("a",)]
+        self.assertEqual(cumulative, [400, 404, 404])
+        self.assertEqual(count, 404)
+        self.assertAlmostEqual(total, 22.0)
+        self.assertEqual(histogram.collect()[("b",)][0], [0, 0, 1])
+
+    def test_exposition_format(self):
+        histogram = self.registry.histogram(
+            "phase_seconds", "Phase time.", ["phase"], buckets=(0.1,)
+        )
+        counter = self.registry.counter("errors_total", "Errors.", ["error"])
+        histogram.observe(0.05, phase="a")
+        counter.inc(error='Bad"Thing')
+
+        self.assertEqual(self.registry.expose(), "\n".join([
+            "# HELP errors_total Errors.",
+            "# TYPE errors_total counter",
+            'errors_total{error="Bad\\"Thing"} 1',
+            "# HELP phase_seconds Phase time.",
+            "# TYPE phase_seconds histogram",
+            'phase_seconds_bucket{phase="a",le="0.1"} 1',
+            'phase_seconds_bucket{phase="a",le="+Inf"} 1',
+            'phase_seconds_sum{phase="a"} 0.05',
+            'phase_seconds_count{phase="a"} 1',
+        ]) + "\n")
+
+    def test_count_errors_labels_by_class(self):
+        counter = self.registry.counter("errors_total", "Errors.", ["error"])
+
+        @count_errors(counter, LookupError)
+        def fail(exc):
+            raise exc
+
+        for exc in (KeyError(), KeyError(), IndexError()):
+            with self.assertRaises(LookupError):
+                fail(exc)
+        with self.assertRaises(ValueError):
+            fail(ValueError())
+
+        self.assertEqual(counter.collect(), {("KeyError",): 2, ("IndexError",): 1})
+
+
+@override_settings(DATABASE_REPLICAS={
+    "ALIASES": ["replica"],
+    "MODELS": ["orders.order", "products.product"],
+    "PIN_SECONDS": 60,
+})
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        patcher = mock.patch.object(connections["default"], "in_atomic_block", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_listed_models_read_from_replica(self):
+        self.assertEqual(self.router.db_for_read(Order), "replica")
+        self.assertEqual(self.router.db_for_read(Cart), "default")
+        self.assertEqual(self.router.db_for_write(Order), "default")
+
+    def test_reads_inside_primary_transaction_stay_on_primary(self):
+        connections["default"].in_atomic_block = True
+        self.assertEqual(self.router.db_for_read(Order), "default")
+
+    def test_use_primary(self):
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Product), "default")
+        self.assertEqual(self.router.db_for_read(Product), "replica")
+
+    def test_read_your_writes_window(self):
+        with read_your_writes("customer:7"):
+            self.assertEqual(self.router.db_for_read(Order), "replica")
+
+        pin_to_primary("customer:7")
+
+        with read_your_writes("customer:7"):
+            self.assertEqual(self.router.db_for_read(Order), "default")
+        with read_your_writes("customer:8"):
+            self.assertEqual(self.router.db_for_read(Order), "replica")
+
+    @override_settings(DATABASE_REPLICAS={"ALIASES": []})
+    def test_no_replicas_no_routing(self):
+        self.assertEqual(self.router.db_for_read(Order), "default")
@@ -1,3 +1,37 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
 
-# Create your views here.
+from core.metrics import registry
+from core.middleware import profiling_settings
+from core.profiling import query_profiles
+
+LOCAL_ADDRESSES = {"127.0.0.1", "::1"}
+
+
+def _is_local(request, extra=()):
+    allowed = LOCAL_ADDRESSES | set(getattr(settings, "INTERNAL_IPS", [])) | set(extra)
+    return request.META.get("REMOTE_ADDR") in allowed
+
+
+def query_profile_view(request):
+    """
+    Per-view query profile totals of this process, for local debugging
+    only: answers 404 unless profiling is on and the request comes from
+    loopback or INTERNAL_IPS.
+    """
+    if not profiling_settings()["ENABLED"] or not _is_local(request):
+        raise Http404
+    return JsonResponse({"views": query_profiles.snapshot()})
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint for this process's metrics (loopback,
+    INTERNAL_IPS and METRICS_ALLOWED_IPS only).
+    """
+    if not _is_local(request, getattr(settings, "METRICS_ALLOWED_IPS", [])):
+        raise Http404
+    return HttpResponse(
+        registry.expose(),
+        content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
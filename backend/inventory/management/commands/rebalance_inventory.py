@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.models import Inventory
+from inventory.services import InventoryService
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Even out stock across the buckets of striped products. With "
+        "--stripes, first switch the given SKUs to that many buckets "
+        "(0 turns striping off)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sku",
+            action="append",
+            dest="skus",
+            help="Product SKU to process (repeatable). Default: all striped products.",
+        )
+        parser.add_argument(
+            "--stripes",
+            type=int,
+            help="Number of buckets to split each SKU into.",
+        )
+
+    def handle(self, *args, **options):
+        skus = options["skus"]
+        stripes = options["stripes"]
+
+        if stripes is not None:
+            if not skus:
+                raise CommandError("--stripes requires at least one --sku")
+            if stripes < 0:
+                raise CommandError("--stripes must be 0 or more")
+
+        if skus:
+            products = list(Product.objects.filter(sku__in=skus))
+            unknown = set(skus) - {product.sku for product in products}
+            if unknown:
+                raise CommandError(f"Unknown SKU(s): {', '.join(sorted(unknown))}")
+        else:
+            products = list(
+                Product.objects.filter(
+                    id__in=Inventory.objects.filter(stripes__gt=0).values("product_id")
+                )
+            )
+
+        for product in products:
+            if stripes is not None:
+                InventoryService.set_stripes(product, stripes)
+            split = InventoryService.rebalance(product)
+            if split:
+                self.stdout.write(f"{product.sku}: {split}")
+            else:
+                self.stdout.write(f"{product.sku}: not striped")
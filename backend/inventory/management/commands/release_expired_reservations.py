@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from inventory.services import ReservationService
+
+
+class Command(BaseCommand):
+    help = "Return the stock held by expired cart reservations."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Reservations released per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        released = ReservationService.release_expired(
+            batch_size=options["batch_size"]
+        )
+        self.stdout.write(f"Released {released} expired reservation(s)")
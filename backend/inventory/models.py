@@ -1,9 +1,41 @@
 from django.db import models
+from core.models import TimeStampedModel
+from cart.models import Cart
 from products.models import Product
 
 class Inventory(models.Model):
     product = models.OneToOneField(Product, on_delete=models.CASCADE)
     quantity_available = models.PositiveIntegerField()
+    # 0 = stock lives in quantity_available; K > 0 = stock is split across
+    # K InventoryBucket rows and quantity_available stays at 0
+    stripes = models.PositiveSmallIntegerField(default=0)
 
     def __str__(self):
-        f"{self.product.name} - {self.quantity_available}"
\ No newline at end of file
+        f"{self.product.name} - {self.quantity_available}"
+
+class InventoryBucket(models.Model):
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="inventory_buckets"
+    )
+    index = models.PositiveSmallIntegerField()
+    quantity_available = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("product", "index")
+
+
+class StockReservation(TimeStampedModel):
+    """
+    Stock held for a cart line. The units are already taken out of
+    Inventory; checkout converts the reservation, the sweeper releases
+    it once `expires_at` has passed.
+    """
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="reservations")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ("cart", "product")
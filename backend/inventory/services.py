@@ -1,22 +1,484 @@
-from inventory.models import Inventory
-from core.exceptions import InsufficientStockError
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Sum, Value, When
+from django.utils import timezone
+
+from inventory.models import Inventory, InventoryBucket, StockReservation
+from core.exceptions import InsufficientStockError, ProductNotFoundError
 from products.models import Product
 
+
+def _quantity_case(quantities):
+    """
+    CASE expression that yields the requested qty for each product id.
+    """
+    return Case(
+        *[
+            When(product_id=product_id, then=Value(qty))
+            for product_id, qty in quantities.items()
+        ],
+        output_field=PositiveIntegerField(),
+    )
+
+
+def _split(total, stripes):
+    """
+    Spread `total` units as evenly as possible over `stripes` buckets.
+    """
+    share, remainder = divmod(total, stripes)
+    return [share + (1 if index < remainder else 0) for index in range(stripes)]
+
+
 class InventoryService:
+    # "locking": select_for_update the rows, validate, then write back.
+    # "conditional": one guarded UPDATE, no row locks held across round trips.
+    LOCKING = "locking"
+    CONDITIONAL = "conditional"
+
+    def mode():
+        return getattr(
+            settings, "INVENTORY_RESERVATION_MODE", InventoryService.LOCKING
+        )
+
+    def available(product):
+        """
+        Total units available, summing the buckets of a striped product.
+        """
+        inventory = Inventory.objects.get(product=product)
+        if not inventory.stripes:
+            return inventory.quantity_available
+        return InventoryBucket.objects.filter(product=product).aggregate(
+            total=Sum("quantity_available")
+        )["total"] or 0
+
     def check_availability(product, qty):
         inventory = Inventory.objects.select_for_update().get(product=product)
-        if inventory.quantity_available < qty:
+        if inventory.stripes:
+            available = InventoryService.available(product)
+        else:
+            available = inventory.quantity_available
+        if available < qty:
             raise InsufficientStockError(product.name)
-        
+
+    def check_availability_many(quantities):
+        """
+        Lock and validate stock for many products at once.
+
+        `quantities` maps Product (or ProductSnapshot) -> requested qty.
+        Rows are locked in a single query ordered by product id, so
+        concurrent checkouts always acquire locks in the same order.
+        Returns the inventory rows keyed by product id, ready to be passed
+        to `reduce_locked`.
+
+        Striped products are not locked here; their buckets are validated
+        when `reduce_locked` decrements them.
+        """
+        products = sorted(quantities, key=lambda product: product.id)
+        inventories = {
+            inventory.product_id: inventory
+            for inventory in (
+                Inventory.objects.select_for_update()
+                .filter(product_id__in=[p.id for p in products], stripes=0)
+                .order_by("product_id")
+            )
+        }
+
+        missing = [p for p in products if p.id not in inventories]
+        if missing:
+            inventories.update({
+                inventory.product_id: inventory
+                for inventory in Inventory.objects.filter(
+                    product_id__in=[p.id for p in missing], stripes__gt=0
+                )
+            })
+
+        for product in products:
+            inventory = inventories.get(product.id)
+            if inventory is None:
+                raise InsufficientStockError(product.name)
+            if not inventory.stripes and inventory.quantity_available < quantities[product]:
+                raise InsufficientStockError(product.name)
+
+        return inventories
+
     def reduce(product, qty):
-        inventory = Inventory.objects.select_for_update().get(product=product)
-        if inventory.quantity_available < qty:
+        updated = Inventory.objects.filter(
+            product=product,
+            stripes=0,
+            quantity_available__gte=qty
+        ).update(quantity_available=F("quantity_available") - qty)
+
+        if updated:
+            return
+
+        inventory = Inventory.objects.filter(product=product, stripes__gt=0).first()
+        if inventory is None:
             raise InsufficientStockError(product.name)
-        inventory.quantity_available -= qty
-        inventory.save()
-    
+        InventoryService._reduce_striped(
+            product.id, inventory.stripes, qty, product.name
+        )
+
+    def reduce_locked(inventories, quantities):
+        """
+        Apply decrements to rows returned by `check_availability_many`:
+        one bulk update for plain rows, bucket decrements for striped ones.
+        """
+        plain = []
+        for product, qty in quantities.items():
+            inventory = inventories[product.id]
+            if inventory.stripes:
+                InventoryService._reduce_striped(
+                    product.id, inventory.stripes, qty, product.name
+                )
+            else:
+                inventory.quantity_available -= qty
+                plain.append(inventory)
+
+        if plain:
+            Inventory.objects.bulk_update(plain, ["quantity_available"])
+
+    def reduce_many(quantities):
+        """
+        Reserve stock for many products with one guarded UPDATE.
+
+        `quantities` maps product id -> qty. Every row is decremented only
+        if it still has enough stock; when any row falls short the whole
+        statement is rolled back and InsufficientStockError is raised
+        (ProductNotFoundError for ids with no product). Striped products
+        make the first UPDATE fall short too, so they take a slower path
+        through their buckets.
+        """
+        if not quantities:
+            return
+
+        with transaction.atomic():
+            updated = InventoryService._guarded_reduce(quantities)
+            if updated == len(quantities):
+                return
+            transaction.set_rollback(True)
+
+        plain = {}
+        striped = []
+        rows = list(
+            Product.objects.filter(id__in=quantities)
+            .order_by("id")
+            .values_list(
+                "id", "name",
+                "inventory__quantity_available", "inventory__stripes"
+            )
+        )
+        missing = set(quantities) - {row[0] for row in rows}
+        if missing:
+            raise ProductNotFoundError(missing)
+        for product_id, name, available, stripes in rows:
+            qty = quantities[product_id]
+            if stripes:
+                striped.append((product_id, stripes, qty, name))
+            elif available is None or available < qty:
+                raise InsufficientStockError(name)
+            else:
+                plain[product_id] = qty
+
+        with transaction.atomic():
+            if plain and InventoryService._guarded_reduce(plain) != len(plain):
+                raise InsufficientStockError(
+                    InventoryService._first_short_product(plain)
+                )
+            for product_id, stripes, qty, name in striped:
+                InventoryService._reduce_striped(product_id, stripes, qty, name)
+
+    def _guarded_reduce(quantities):
+        # one CASE instead of an OR per line: sqlite caps expression depth
+        # at 1000, which a chain of ORs hits on large carts
+        return Inventory.objects.filter(
+            product_id__in=quantities,
+            quantity_available__gte=_quantity_case(quantities),
+            stripes=0
+        ).update(
+            quantity_available=F("quantity_available") - _quantity_case(quantities)
+        )
+
+    def _reduce_striped(product_id, stripes, qty, product_name):
+        """
+        Take `qty` from one randomly chosen bucket that can cover it. When
+        no single bucket can, lock all of them and drain across buckets.
+        """
+        start = random.randrange(stripes)
+        for offset in range(stripes):
+            updated = InventoryBucket.objects.filter(
+                product_id=product_id,
+                index=(start + offset) % stripes,
+                quantity_available__gte=qty
+            ).update(quantity_available=F("quantity_available") - qty)
+            if updated:
+                return
+
+        buckets = list(
+            InventoryBucket.objects.select_for_update()
+            .filter(product_id=product_id)
+            .order_by("index")
+        )
+        if sum(bucket.quantity_available for bucket in buckets) < qty:
+            raise InsufficientStockError(product_name)
+
+        remaining = qty
+        for bucket in buckets:
+            taken = min(bucket.quantity_available, remaining)
+            bucket.quantity_available -= taken
+            remaining -= taken
+        InventoryBucket.objects.bulk_update(buckets, ["quantity_available"])
+
+    def _first_short_product(quantities):
+        rows = (
+            Product.objects.filter(id__in=quantities)
+            .order_by("id")
+            .values_list("id", "name", "inventory__quantity_available")
+        )
+        for product_id, name, available in rows:
+            if available is None or available < quantities[product_id]:
+                return name
+        return ""
+
     def restore(product_sku, qty):
         product = Product.objects.get(sku=product_sku)
         inventory = Inventory.objects.select_for_update().get(product=product)
+        if inventory.stripes:
+            InventoryService._restore_striped(product.id, inventory.stripes, qty)
+            return
         inventory.quantity_available += qty
-        inventory.save()
\ No newline at end of file
+        inventory.save()
+
+    def restore_many(quantities):
+        """
+        Return stock for many products with a single UPDATE.
+
+        `quantities` maps product id -> qty. Striped products get their
+        units back in a random bucket. Returns the number of products
+        whose stock was restored.
+        """
+        if not quantities:
+            return 0
+
+        updated = Inventory.objects.filter(
+            product_id__in=quantities, stripes=0
+        ).update(
+            quantity_available=F("quantity_available") + _quantity_case(quantities)
+        )
+
+        if updated < len(quantities):
+            striped = Inventory.objects.filter(
+                product_id__in=quantities, stripes__gt=0
+            ).values_list("product_id", "stripes")
+            for product_id, stripes in striped:
+                InventoryService._restore_striped(
+                    product_id, stripes, quantities[product_id]
+                )
+                updated += 1
+
+        return updated
+
+    def restore_by_sku(quantities):
+        """
+        Return stock for order lines, which only keep the product SKU.
+
+        `quantities` maps SKU -> qty. SKUs are resolved to inventory rows
+        with one joined query and restored with restore_many. Returns the
+        set of SKUs that no longer match a product with inventory, so the
+        caller can report them instead of failing the whole restore.
+        """
+        if not quantities:
+            return set()
+
+        rows = Inventory.objects.filter(
+            product__sku__in=quantities
+        ).values_list("product__sku", "product_id")
+
+        by_product = {}
+        for sku, product_id in rows:
+            by_product[product_id] = quantities[sku]
+        InventoryService.restore_many(by_product)
+
+        return set(quantities) - {sku for sku, _ in rows}
+
+    def _restore_striped(product_id, stripes, qty):
+        InventoryBucket.objects.filter(
+            product_id=product_id,
+            index=random.randrange(stripes)
+        ).update(quantity_available=F("quantity_available") + qty)
+
+    def set_stripes(product, stripes):
+        """
+        Switch a product between a single inventory row (`stripes=0`) and
+        `stripes` bucket rows, carrying the current total across.
+        """
+        with transaction.atomic():
+            inventory = Inventory.objects.select_for_update().get(product=product)
+            buckets = InventoryBucket.objects.select_for_update().filter(product=product)
+            total = inventory.quantity_available + sum(
+                bucket.quantity_available for bucket in buckets
+            )
+
+            InventoryBucket.objects.filter(product=product).delete()
+            if stripes:
+                InventoryBucket.objects.bulk_create([
+                    InventoryBucket(product=product, index=index, quantity_available=qty)
+                    for index, qty in enumerate(_split(total, stripes))
+                ])
+                inventory.quantity_available = 0
+            else:
+                inventory.quantity_available = total
+
+            inventory.stripes = stripes
+            inventory.save(update_fields=["quantity_available", "stripes"])
+
+    def rebalance(product):
+        """
+        Even out the buckets of a striped product. Returns the new split.
+        """
+        with transaction.atomic():
+            buckets = list(
+                InventoryBucket.objects.select_for_update()
+                .filter(product=product)
+                .order_by("index")
+            )
+            if not buckets:
+                return []
+
+            total = sum(bucket.quantity_available for bucket in buckets)
+            for bucket, qty in zip(buckets, _split(total, len(buckets))):
+                bucket.quantity_available = qty
+            InventoryBucket.objects.bulk_update(buckets, ["quantity_available"])
+            return [bucket.quantity_available for bucket in buckets]
+
+
+class ReservationService:
+    def ttl():
+        return getattr(settings, "CART_RESERVATION_TTL", None)
+
+    def reserve_many(cart, changes):
+        """
+        Hold exactly the new qty of each product for `cart`: `changes`
+        maps product id -> qty. Only the difference from what is already
+        held is taken or returned, with one statement each, the
+        reservations are upserted/deleted in bulk and their expiry is
+        pushed forward.
+        """
+        if not changes:
+            return
+
+        with transaction.atomic():
+            held = dict(
+                StockReservation.objects.select_for_update()
+                .filter(cart=cart, product_id__in=changes)
+                .order_by("product_id")
+                .values_list("product_id", "quantity")
+            )
+
+            take = {}
+            give_back = {}
+            for product_id, qty in changes.items():
+                delta = qty - held.get(product_id, 0)
+                if delta > 0:
+                    take[product_id] = delta
+                elif delta < 0:
+                    give_back[product_id] = -delta
+
+            InventoryService.reduce_many(take)
+            InventoryService.restore_many(give_back)
+
+            expires_at = timezone.now() + timedelta(seconds=ReservationService.ttl())
+            StockReservation.objects.bulk_create(
+                [
+                    StockReservation(
+                        cart=cart,
+                        product_id=product_id,
+                        quantity=qty,
+                        expires_at=expires_at
+                    )
+                    for product_id, qty in changes.items() if qty
+                ],
+                update_conflicts=True,
+                unique_fields=["cart", "product"],
+                update_fields=["quantity", "expires_at"],
+            )
+
+            removed = [product_id for product_id, qty in changes.items() if not qty]
+            if removed:
+                StockReservation.objects.filter(
+                    cart=cart, product_id__in=removed
+                ).delete()
+
+    def consume(cart, quantities):
+        """
+        Convert a cart's reservations at checkout.
+
+        `quantities` maps Product -> qty. Returns True and deletes the
+        reservations when they hold exactly the stock the cart needs (the
+        units were taken at reservation time, even if the sweeper has not
+        caught up with an expired one yet). Otherwise the reservations are
+        released and False is returned so checkout takes stock itself.
+        """
+        reservations = {
+            reservation.product_id: reservation
+            for reservation in StockReservation.objects.select_for_update()
+            .filter(cart=cart)
+            .order_by("product_id")
+        }
+        if not reservations:
+            return False
+
+        covered = len(reservations) == len(quantities) and all(
+            product.id in reservations
+            and reservations[product.id].quantity == qty
+            for product, qty in quantities.items()
+        )
+
+        if not covered:
+            InventoryService.restore_many({
+                product_id: reservation.quantity
+                for product_id, reservation in reservations.items()
+            })
+
+        StockReservation.objects.filter(
+            id__in=[reservation.id for reservation in reservations.values()]
+        ).delete()
+        return covered
+
+    def release_expired(batch_size=500, now=None):
+        """
+        Give back the stock of expired reservations, `batch_size` rows per
+        transaction, walking the `expires_at` index. Returns the number of
+        reservations released.
+        """
+        now = now or timezone.now()
+        released = 0
+
+        while True:
+            ids = list(
+                StockReservation.objects.filter(expires_at__lte=now)
+                .order_by("expires_at")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                return released
+
+            with transaction.atomic():
+                # re-check under lock: a cart may have refreshed its expiry
+                rows = list(
+                    StockReservation.objects.select_for_update()
+                    .filter(id__in=ids, expires_at__lte=now)
+                    .values_list("id", "product_id", "quantity")
+                )
+                quantities = {}
+                for _, product_id, qty in rows:
+                    quantities[product_id] = quantities.get(product_id, 0) + qty
+
+                InventoryService.restore_many(quantities)
+                StockReservation.objects.filter(
+                    id__in=[row[0] for row in rows]
+                ).delete()
+
+            released += len(rows)
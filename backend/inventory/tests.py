@@ -1,3 +1,208 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from decimal import Decimal
 
-# Create your tests here.
+from customers.models import Customer
+from products.models import Category, Product
+from cart.models import Cart, CartItem
+from inventory.models import Inventory, InventoryBucket
+from inventory.services import InventoryService
+from orders.models import Order
+from orders.services import OrderService
+from core.exceptions import InsufficientStockError, ProductNotFoundError
+
+
+class InventoryServiceTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(
+            name="Sepatu",
+            slug="sepatu"
+        )
+
+        self.product = Product.objects.create(
+            name="Sepatu Lari X",
+            sku="SKU-001",
+            price=Decimal("500000"),
+            category=self.category
+        )
+        self.other = Product.objects.create(
+            name="Kaos Kaki",
+            sku="SKU-002",
+            price=Decimal("20000"),
+            category=self.category
+        )
+
+        Inventory.objects.create(product=self.product, quantity_available=10)
+        Inventory.objects.create(product=self.other, quantity_available=1)
+
+    def available(self, product):
+        return Inventory.objects.get(product=product).quantity_available
+
+    def test_reduce_is_guarded(self):
+        InventoryService.reduce(self.product, 4)
+        self.assertEqual(self.available(self.product), 6)
+
+        with self.assertRaises(InsufficientStockError):
+            InventoryService.reduce(self.product, 7)
+        self.assertEqual(self.available(self.product), 6)
+
+    def test_reduce_many_success(self):
+        with CaptureQueriesContext(connection) as ctx:
+            InventoryService.reduce_many({self.product.id: 3, self.other.id: 1})
+
+        statements = [
+            query["sql"] for query in ctx.captured_queries
+            if "SAVEPOINT" not in query["sql"]
+        ]
+        self.assertEqual(len(statements), 1)
+
+        self.assertEqual(self.available(self.product), 7)
+        self.assertEqual(self.available(self.other), 0)
+
+    def test_reduce_many_shortfall_changes_nothing(self):
+        with self.assertRaises(InsufficientStockError) as ctx:
+            InventoryService.reduce_many({self.product.id: 3, self.other.id: 2})
+
+        self.assertEqual(ctx.exception.product_name, "Kaos Kaki")
+        self.assertEqual(self.available(self.product), 10)
+        self.assertEqual(self.available(self.other), 1)
+
+    def test_reduce_many_handles_large_carts(self):
+        Product.objects.bulk_create([
+            Product(
+                name=f"Produk {i}",
+                sku=f"BULK-{i}",
+                price=Decimal("1000"),
+                category=self.category
+            )
+            for i in range(1200)
+        ])
+        products = Product.objects.filter(sku__startswith="BULK-")
+        Inventory.objects.bulk_create([
+            Inventory(product=product, quantity_available=2) for product in products
+        ])
+
+        InventoryService.reduce_many({product.id: 1 for product in products})
+
+        self.assertEqual(
+            set(
+                Inventory.objects.filter(product__in=products)
+                .values_list("quantity_available", flat=True)
+            ),
+            {1}
+        )
+
+    def test_reduce_many_unknown_product_changes_nothing(self):
+        missing = self.other.id + 100
+
+        with self.assertRaises(ProductNotFoundError) as ctx:
+            InventoryService.reduce_many({self.product.id: 3, missing: 1})
+
+        self.assertEqual(ctx.exception.product_ids, [missing])
+        self.assertEqual(self.available(self.product), 10)
+
+    def test_restore_many(self):
+        touched = InventoryService.restore_many(
+            {self.product.id: 2, self.other.id: 5}
+        )
+
+        self.assertEqual(touched, 2)
+        self.assertEqual(self.available(self.product), 12)
+        self.assertEqual(self.available(self.other), 6)
+
+    @override_settings(INVENTORY_RESERVATION_MODE=InventoryService.CONDITIONAL)
+    def test_checkout_in_conditional_mode(self):
+        customer = Customer.objects.create(email="hen@test.com", name="Hen")
+        cart = Cart.objects.create(customer=customer)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+        CartItem.objects.create(cart=cart, product=self.other, quantity=2)
+
+        with self.assertRaises(InsufficientStockError):
+            OrderService.checkout(cart)
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertEqual(self.available(self.product), 10)
+
+        CartItem.objects.filter(cart=cart, product=self.other).update(quantity=1)
+        OrderService.checkout(cart)
+
+        self.assertEqual(self.available(self.product), 8)
+        self.assertEqual(self.available(self.other), 0)
+
+
+class StripedInventoryTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Sepatu", slug="sepatu")
+        self.product = Product.objects.create(
+            name="Sepatu Lari X",
+            sku="SKU-001",
+            price=Decimal("500000"),
+            category=self.category
+        )
+        Inventory.objects.create(product=self.product, quantity_available=10)
+        InventoryService.set_stripes(self.product, 4)
+
+    def buckets(self):
+        return list(
+            InventoryBucket.objects.filter(product=self.product)
+            .order_by("index")
+            .values_list("quantity_available", flat=True)
+        )
+
+    def test_set_stripes_splits_and_merges_stock(self):
+        self.assertEqual(self.buckets(), [3, 3, 2, 2])
+        self.assertEqual(
+            Inventory.objects.get(product=self.product).quantity_available, 0
+        )
+        self.assertEqual(InventoryService.available(self.product), 10)
+
+        InventoryService.set_stripes(self.product, 0)
+
+        self.assertEqual(self.buckets(), [])
+        self.assertEqual(InventoryService.available(self.product), 10)
+
+    def test_reduce_takes_from_buckets(self):
+        InventoryService.reduce(self.product, 2)
+        InventoryService.reduce_many({self.product.id: 3})
+
+        self.assertEqual(InventoryService.available(self.product), 5)
+
+    def test_reduce_drains_across_buckets_when_no_single_bucket_covers(self):
+        InventoryService.reduce_many({self.product.id: 9})
+        self.assertEqual(InventoryService.available(self.product), 1)
+
+        with self.assertRaises(InsufficientStockError):
+            InventoryService.reduce_many({self.product.id: 2})
+        self.assertEqual(InventoryService.available(self.product), 1)
+
+    def test_restore_many_returns_units_to_a_bucket(self):
+        InventoryService.restore_many({self.product.id: 6})
+        self.assertEqual(InventoryService.available(self.product), 16)
+
+    def test_rebalance_evens_out_buckets(self):
+        InventoryBucket.objects.filter(product=self.product, index=0).update(
+            quantity_available=9
+        )
+
+        split = InventoryService.rebalance(self.product)
+
+        self.assertEqual(split, [4, 4, 4, 4])
+        self.assertEqual(self.buckets(), [4, 4, 4, 4])
+
+    def test_checkout_reduces_striped_and_plain_products(self):
+        plain = Product.objects.create(
+            name="Kaos Kaki",
+            sku="SKU-002",
+            price=Decimal("20000"),
+            category=self.category
+        )
+        Inventory.objects.create(product=plain, quantity_available=5)
+        customer = Customer.objects.create(email="hen@test.com", name="Hen")
+        cart = Cart.objects.create(customer=customer)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=4)
+        CartItem.objects.create(cart=cart, product=plain, quantity=1)
+
+        OrderService.checkout(cart)
+
+        self.assertEqual(InventoryService.available(self.product), 6)
+        self.assertEqual(InventoryService.available(plain), 4)
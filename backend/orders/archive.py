@@ -0,0 +1,128 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from orders.snapshots import build_items_snapshot
+
+
+class OrderArchiver:
+    """
+    Moves finished orders out of the hot Order/OrderItem tables.
+
+    Each `archive_batch` copies up to `batch_size` COMPLETED/CANCELLED
+    orders created before the cutoff, with their items, into
+    ArchivedOrder/ArchivedOrderItem and deletes the originals in the
+    same transaction. A batch either moves entirely or not at all, so an
+    interrupted run just resumes with the next one.
+    """
+    STATUSES = (Order.COMPLETED, Order.CANCELLED)
+
+    def __init__(self, after_days=180, batch_size=500):
+        self.after = timedelta(days=after_days)
+        self.batch_size = batch_size
+
+    def cutoff(self, now=None):
+        return (now or timezone.now()) - self.after
+
+    def candidates(self, cutoff, after_id=0):
+        return (
+            Order.objects.filter(
+                status__in=self.STATUSES,
+                created_at__lt=cutoff,
+                id__gt=after_id
+            )
+            .order_by("id")
+        )
+
+    def archive_batch(self, cutoff, after_id=0, batch_size=None):
+        """
+        Archive the next batch of orders with an id above `after_id`.
+        Return (archived_count, last_id); last_id is None when nothing
+        was left to archive.
+        """
+        batch_size = batch_size or self.batch_size
+
+        with transaction.atomic():
+            orders = list(
+                self.candidates(cutoff, after_id)
+                .select_for_update()
+                .prefetch_related("items")[:batch_size]
+            )
+            if not orders:
+                return 0, None
+
+            archived_orders = []
+            archived_items = []
+            for order in orders:
+                items = sorted(order.items.all(), key=lambda item: item.id)
+                if order.items_snapshot is None:
+                    order.item_count = sum(item.quantity for item in items)
+                    order.items_snapshot = build_items_snapshot(items)
+                archived_orders.append(ArchivedOrder(
+                    id=order.id,
+                    customer_id=order.customer_id,
+                    status=order.status,
+                    total_amount=order.total_amount,
+                    item_count=order.item_count,
+                    items_snapshot=order.items_snapshot,
+                    created_at=order.created_at
+                ))
+                archived_items.extend(
+                    ArchivedOrderItem(
+                        id=item.id,
+                        order_id=order.id,
+                        product_name=item.product_name,
+                        product_price=item.product_price,
+                        quantity=item.quantity,
+                        product_sku=item.product_sku
+                    )
+                    for item in items
+                )
+
+            ArchivedOrder.objects.bulk_create(archived_orders)
+            ArchivedOrderItem.objects.bulk_create(archived_items)
+
+            ids = [order.id for order in orders]
+            OrderItem.objects.filter(order_id__in=ids).delete()
+            Order.objects.filter(id__in=ids).delete()
+
+        return len(orders), ids[-1]
+
+    def archive(self, now=None, max_batches=None, on_batch=None):
+        """
+        Archive batch after batch until no eligible order is left (or
+        `max_batches` ran). `on_batch(count, last_id)` is called after
+        each committed batch. Return the number of orders archived.
+        """
+        cutoff = self.cutoff(now)
+        archived = 0
+        last_id = 0
+        batches = 0
+
+        while max_batches is None or batches < max_batches:
+            count, last_id = self.archive_batch(cutoff, last_id)
+            if not count:
+                break
+            archived += count
+            batches += 1
+            if on_batch is not None:
+                on_batch(count, last_id)
+        return archived
+
+    def stats(self, now=None):
+        return {
+            "hot_orders": Order.objects.count(),
+            "archived_orders": ArchivedOrder.objects.count(),
+            "eligible_orders": self.candidates(self.cutoff(now)).count(),
+        }
+
+
+_config = getattr(settings, "ORDER_ARCHIVE", {})
+
+order_archiver = OrderArchiver(
+    after_days=_config.get("AFTER_DAYS", 180),
+    batch_size=_config.get("BATCH_SIZE", 500),
+)
@@ -0,0 +1,236 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from orders.services import OrderService
+from orders.checkout_queue import checkout_queue
+from orders.idempotency import checkout_idempotency
+from orders.serializers import SNAPSHOT_FIELDS, OrderSnapshotSerializer
+from orders.models import ArchivedOrder, Order
+from orders.pagination import InvalidCursor, akeyset_union_page
+from cart.models import Cart
+from core.db_routers import read_your_writes
+from core.exception_handlers import custom_exeption_handler
+from core.exceptions import DomainError
+
+# Bounded pool for the transactional, synchronous parts of checkout: at
+# most this many checkouts (and database connections) per worker process.
+checkout_pool = ThreadPoolExecutor(
+    max_workers=getattr(settings, "ASYNC_CHECKOUT_THREADS", 8),
+    thread_name_prefix="async-checkout"
+)
+
+
+def _in_pool(fn, *args):
+    try:
+        return fn(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_in_checkout_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(checkout_pool, _in_pool, fn, *args)
+
+
+def _authenticate(request):
+    """
+    Customer of the user REST_FRAMEWORK's authentication classes resolve,
+    or None.
+    """
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    )
+    user = drf_request.user
+    if not user.is_authenticated:
+        return None
+    return user.customer
+
+
+def error_response(message, status):
+    return JsonResponse({"error": message}, status=status)
+
+
+async def serialize_orders(orders, many=False):
+    rows = orders if many else [orders]
+    if any(order.items_snapshot is None for order in rows):
+        # orders from before the snapshot read their items (sync ORM)
+        return await sync_to_async(
+            lambda: OrderSnapshotSerializer(orders, many=many).data
+        )()
+    return OrderSnapshotSerializer(orders, many=many).data
+
+
+class AsyncAPIView(View):
+    """
+    Base of the async twins. Like APIView, the view is csrf_exempt and
+    requests are authenticated with REST_FRAMEWORK's
+    DEFAULT_AUTHENTICATION_CLASSES, so Basic auth works and only
+    session-authenticated requests are CSRF-checked (by
+    SessionAuthentication). The customer is set on `request.customer`.
+
+    Unlike APIView there is no content negotiation: responses are plain
+    JsonResponse, anonymous requests get 401 and authentication errors
+    are answered {"detail": ...} with the status APIView would use.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            customer = await sync_to_async(_authenticate)(request)
+        except exceptions.APIException as exc:
+            return self.auth_error_response(exc, request)
+        if customer is None:
+            return error_response("Authentication required", 401)
+
+        request.customer = customer
+        return await super().dispatch(request, *args, **kwargs)
+
+    @staticmethod
+    def auth_error_response(exc, request):
+        response = JsonResponse({"detail": exc.detail}, status=exc.status_code)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            # same rule as APIView.handle_exception: 401 only when the
+            # first authenticator can name a scheme, 403 otherwise
+            authenticators = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+            header = (
+                authenticators[0]().authenticate_header(request)
+                if authenticators else None
+            )
+            if header:
+                response["WWW-Authenticate"] = header
+            else:
+                response.status_code = 403
+        return response
+
+
+class AsyncCheckoutView(AsyncAPIView):
+    async def post(self, request):
+        """
+        checkout active cart for current customer (async twin of
+        CheckoutAPIView, same Idempotency-Key handling)
+        """
+        customer = request.customer
+
+        key = request.headers.get("Idempotency-Key")
+        if key is None:
+            return await self.checkout(customer)
+
+        if not 0 < len(key) <= 255:
+            return error_response(
+                "Idempotency-Key must be 1 to 255 characters", 400
+            )
+
+        # begin() may poll for a concurrent request: keep it off the loop
+        record, stored = await run_in_checkout_pool(
+            checkout_idempotency.begin, customer, key
+        )
+        if stored is not None:
+            response = JsonResponse(stored.data, status=stored.status_code)
+            response["Idempotent-Replayed"] = "true"
+            return response
+
+        try:
+            response = await self.checkout(customer)
+        except BaseException:
+            await run_in_checkout_pool(checkout_idempotency.abort, record)
+            raise
+
+        if response.status_code == 201:
+            await run_in_checkout_pool(
+                checkout_idempotency.complete, record, 201, response.data
+            )
+        else:
+            await run_in_checkout_pool(checkout_idempotency.abort, record)
+        return response
+
+    async def checkout(self, customer):
+        cart = await Cart.objects.filter(
+            customer=customer,
+            status=Cart.ACTIVE
+        ).afirst()
+
+        if not cart:
+            return error_response("Active cart not found", 404)
+
+        try:
+            if settings.CHECKOUT_GROUP_COMMIT:
+                order = await checkout_queue.acheckout(cart)
+            else:
+                order = await run_in_checkout_pool(OrderService.checkout, cart)
+        except DomainError as exc:
+            handled = custom_exeption_handler(exc, {})
+            if handled is None:
+                raise
+            return JsonResponse(handled.data, status=handled.status_code)
+
+        data = await serialize_orders(order)
+        response = JsonResponse(data, status=201)
+        # kept for the idempotency record
+        response.data = data
+        return response
+
+
+class AsyncOrderHistoryView(AsyncAPIView):
+    MAX_PAGE_SIZE = 100
+
+    async def get(self, request):
+        """
+        list current customer's orders, newest first, by cursor
+        """
+        customer = request.customer
+
+        try:
+            page_size = int(request.GET.get("page_size", 20))
+        except ValueError:
+            page_size = 20
+        page_size = min(max(page_size, 1), self.MAX_PAGE_SIZE)
+
+        orders = (
+            Order.objects.filter(customer=customer),
+            ArchivedOrder.objects.filter(customer=customer),
+        )
+        try:
+            with read_your_writes(f"customer:{customer.id}"):
+                page, next_cursor = await akeyset_union_page(
+                    orders, SNAPSHOT_FIELDS, request.GET.get("cursor"), page_size
+                )
+                results = await serialize_orders(
+                    [Order(**row) for row in page], many=True
+                )
+        except InvalidCursor:
+            return error_response("Invalid cursor", 400)
+
+        return JsonResponse({"results": results, "next_cursor": next_cursor})
+
+
+class AsyncOrderDetailView(AsyncAPIView):
+    async def get(self, request, pk):
+        """
+        retrieve one of current customer's orders
+        """
+        customer = request.customer
+
+        with read_your_writes(f"customer:{customer.id}"):
+            order = (
+                await Order.objects.filter(customer=customer, pk=pk).afirst()
+                or await ArchivedOrder.objects.filter(
+                    customer=customer, pk=pk
+                ).afirst()
+            )
+            if not order:
+                return error_response("Order not found", 404)
+            return JsonResponse(await serialize_orders(order))
@@ -0,0 +1,104 @@
+import statistics
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from customers.models import Customer
+from products.models import Category, Product
+from products.snapshots import product_snapshots
+from cart.models import Cart, CartItem
+from inventory.models import Inventory
+
+
+def seed_checkout_cart(lines, tag, stock=1000, quantity=1):
+    """
+    Create a customer with an active cart of `lines` distinct products,
+    each backed by its own inventory row. `tag` keeps emails/SKUs unique
+    between calls.
+    """
+    category, _ = Category.objects.get_or_create(
+        slug="bench",
+        defaults={"name": "Bench"}
+    )
+    customer = Customer.objects.create(
+        email=f"bench-{tag}@test.com",
+        name=f"Bench {tag}"
+    )
+
+    products = Product.objects.bulk_create([
+        Product(
+            name=f"Bench Product {tag}-{i}",
+            sku=f"BENCH-{tag}-{i}",
+            price=Decimal("1000.00"),
+            category=category
+        )
+        for i in range(lines)
+    ])
+    # sqlite/postgres return pks from bulk_create, others may not
+    products = list(Product.objects.filter(sku__startswith=f"BENCH-{tag}-"))
+    # bulk_create sends no post_save, and sqlite may hand out ids of rows
+    # rolled back earlier
+    for product in products:
+        product_snapshots.bump(product.id)
+
+    Inventory.objects.bulk_create([
+        Inventory(product=product, quantity_available=stock)
+        for product in products
+    ])
+
+    # bulk-created lines bypass CartService: store their totals directly
+    cart = Cart.objects.create(
+        customer=customer,
+        subtotal=sum(product.price * quantity for product in products),
+        item_count=len(products) * quantity
+    )
+    CartItem.objects.bulk_create([
+        CartItem(cart=cart, product=product, quantity=quantity)
+        for product in products
+    ])
+    return cart
+
+
+def measure(fn, *args, trace_allocations=False, **kwargs):
+    """
+    Run `fn` once and return (result, stats) where stats holds the
+    query count and wall time. tracemalloc slows the call down, so the
+    peak allocation is only recorded when `trace_allocations` is set.
+    """
+    if trace_allocations:
+        tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            result = fn(*args, **kwargs)
+            elapsed = time.perf_counter() - started
+        stats = {
+            "queries": len(ctx.captured_queries),
+            "wall_ms": elapsed * 1000,
+        }
+        if trace_allocations:
+            stats["peak_alloc_kib"] = tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        if trace_allocations:
+            tracemalloc.stop()
+
+    return result, stats
+
+
+def summarize(samples):
+    """
+    Collapse repeated measurements of one (method, lines) pair. Wall
+    time only counts runs made without allocation tracing.
+    """
+    timed = [s["wall_ms"] for s in samples if "peak_alloc_kib" not in s]
+    traced = [s["peak_alloc_kib"] for s in samples if "peak_alloc_kib" in s]
+    return {
+        "queries": max(sample["queries"] for sample in samples),
+        "wall_ms_median": statistics.median(timed) if timed else None,
+        "wall_ms_max": max(timed) if timed else None,
+        "peak_alloc_kib": max(traced) if traced else None,
+        "runs": len(timed),
+    }
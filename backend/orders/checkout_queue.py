@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from cart.models import Cart, CartItem
+from core.exceptions import CheckoutUnavailableError
+from inventory.models import Inventory, InventoryBucket
+from orders.services import OrderService
+
+logger = logging.getLogger(__name__)
+
+
+class CheckoutQueue:
+    """
+    Group-commit front for OrderService.checkout.
+
+    Callers submit a cart and wait on the returned Future. A single worker
+    thread drains the queue in small batches and checks every cart of a
+    batch out inside one transaction. Each checkout runs in its own
+    savepoint (OrderService.checkout's atomic block nests), so a failing
+    cart only rolls back itself. Results are handed out after the shared
+    commit succeeds.
+
+    The batch's carts, inventory rows and buckets are locked up front,
+    each sorted by id, so the row locks of two batches (or of a batch and
+    a single checkout) are always taken in the same order.
+
+    A request still queued after `timeout` seconds is cancelled and
+    raises CheckoutUnavailableError; one whose batch already started is
+    waited for, as that batch decides whether its order exists. A worker
+    that died is replaced by the next submit.
+    """
+
+    def __init__(self, batch_size=16, max_wait=0.005, timeout=10, autostart=True):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.autostart = autostart
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def submit(self, cart):
+        future = Future()
+        self._queue.put((cart, future))
+        if self.autostart:
+            self._ensure_worker()
+        return future
+
+    def checkout(self, cart):
+        """
+        Submit `cart` and wait up to `timeout` seconds for its order.
+        """
+        future = self.submit(cart)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            if future.cancel():
+                raise CheckoutUnavailableError("Checkout is busy, try again") from None
+        return future.result()
+
+    async def acheckout(self, cart):
+        """
+        Async twin of `checkout`.
+        """
+        future = self.submit(cart)
+        waiter = asyncio.wrap_future(future)
+        # asyncio.wait, unlike wait_for, leaves the future alone on timeout
+        done, _ = await asyncio.wait({waiter}, timeout=self.timeout)
+        if not done and future.cancel():
+            raise CheckoutUnavailableError("Checkout is busy, try again")
+        return await waiter
+
+    def next_batch(self, block=True):
+        """
+        Wait for one request, then keep collecting until the batch is full
+        or `max_wait` seconds have passed.
+        """
+        try:
+            batch = [self._queue.get(block=block)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def process(self, batch):
+        # requests whose caller gave up are dropped before they check out
+        batch = [
+            (cart, future) for cart, future in batch
+            if future.set_running_or_notify_cancel()
+        ]
+        if not batch:
+            return
+
+        results = []
+        try:
+            with transaction.atomic():
+                self.lock(batch)
+                for cart, future in batch:
+                    try:
+                        results.append((future, OrderService.checkout(cart), None))
+                    except Exception as exc:
+                        results.append((future, None, exc))
+        except Exception as exc:
+            # the shared commit failed: nobody's order exists
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+
+        for future, order, exc in results:
+            if exc is None:
+                future.set_result(order)
+            else:
+                future.set_exception(exc)
+
+    @staticmethod
+    def lock(batch):
+        """
+        Lock every row the batch's checkouts will write, in id order.
+        """
+        cart_ids = sorted(cart.id for cart, _ in batch)
+        list(Cart.objects.select_for_update().filter(id__in=cart_ids).order_by("id"))
+
+        product_ids = (
+            CartItem.objects.filter(cart_id__in=cart_ids)
+            .values_list("product_id", flat=True)
+        )
+        list(
+            Inventory.objects.select_for_update()
+            .filter(product_id__in=product_ids)
+            .order_by("product_id")
+        )
+        list(
+            InventoryBucket.objects.select_for_update()
+            .filter(product_id__in=product_ids)
+            .order_by("product_id", "index")
+        )
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name="checkout-group-commit",
+                    daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = self.next_batch()
+            try:
+                close_old_connections()
+                self.process(batch)
+            except Exception as exc:
+                # keep the worker alive; nobody in this batch is left waiting
+                logger.exception("checkout batch failed")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+
+
+checkout_queue = CheckoutQueue(
+    batch_size=getattr(settings, "CHECKOUT_GROUP_COMMIT_BATCH_SIZE", 16),
+    max_wait=getattr(settings, "CHECKOUT_GROUP_COMMIT_MAX_WAIT", 0.005),
+    timeout=getattr(settings, "CHECKOUT_GROUP_COMMIT_TIMEOUT", 10),
+)
@@ -0,0 +1,104 @@
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from orders.models import CheckoutIdempotencyKey
+from core.exceptions import IdempotencyKeyInUseError
+
+StoredResponse = namedtuple("StoredResponse", ["status_code", "data"])
+
+
+class CheckoutIdempotency:
+    """
+    Idempotency-Key bookkeeping for checkout, shared by every process
+    through the CheckoutIdempotencyKey table.
+
+    `begin` either claims the key (returns the record to `complete` or
+    `abort`) or returns the StoredResponse of an earlier request. A key
+    still being worked on is polled until it completes; its in-flight
+    lease lets a crashed request's key be claimed again.
+    """
+
+    def __init__(self, ttl=24 * 60 * 60, in_flight_timeout=60, wait=10,
+                 poll_interval=0.05):
+        self.ttl = timedelta(seconds=ttl)
+        self.in_flight_timeout = timedelta(seconds=in_flight_timeout)
+        self.wait = wait
+        self.poll_interval = poll_interval
+
+    def begin(self, customer, key):
+        deadline = time.monotonic() + self.wait
+        while True:
+            now = timezone.now()
+            try:
+                with transaction.atomic():
+                    record = CheckoutIdempotencyKey.objects.create(
+                        customer=customer,
+                        key=key,
+                        expires_at=now + self.in_flight_timeout
+                    )
+                return record, None
+            except IntegrityError:
+                pass
+
+            existing = CheckoutIdempotencyKey.objects.filter(
+                customer=customer, key=key
+            ).first()
+            if existing is None:
+                continue
+            if existing.expires_at <= now:
+                # stale: finished past its TTL, or its request died
+                CheckoutIdempotencyKey.objects.filter(
+                    id=existing.id, expires_at__lte=now
+                ).delete()
+                continue
+            if existing.status_code is not None:
+                return None, StoredResponse(existing.status_code, existing.response)
+
+            if time.monotonic() >= deadline:
+                raise IdempotencyKeyInUseError(
+                    "A request with this Idempotency-Key is still in progress"
+                )
+            time.sleep(self.poll_interval)
+
+    def complete(self, record, status_code, data):
+        CheckoutIdempotencyKey.objects.filter(id=record.id).update(
+            status_code=status_code,
+            response=data,
+            expires_at=timezone.now() + self.ttl
+        )
+
+    def abort(self, record):
+        """
+        Forget a claimed key whose request failed, so a retry runs again.
+        """
+        CheckoutIdempotencyKey.objects.filter(id=record.id).delete()
+
+    def purge_expired(self, batch_size=1000, now=None):
+        now = now or timezone.now()
+        purged = 0
+        while True:
+            ids = list(
+                CheckoutIdempotencyKey.objects.filter(expires_at__lte=now)
+                .order_by("expires_at")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                return purged
+            purged += CheckoutIdempotencyKey.objects.filter(
+                id__in=ids, expires_at__lte=now
+            ).delete()[0]
+
+
+_config = getattr(settings, "CHECKOUT_IDEMPOTENCY", {})
+
+checkout_idempotency = CheckoutIdempotency(
+    ttl=_config.get("TTL", 24 * 60 * 60),
+    in_flight_timeout=_config.get("IN_FLIGHT_TIMEOUT", 60),
+    wait=_config.get("WAIT", 10),
+    poll_interval=_config.get("POLL_INTERVAL", 0.05),
+)
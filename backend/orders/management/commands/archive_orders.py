@@ -0,0 +1,71 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.archive import OrderArchiver, order_archiver
+
+
+class Command(BaseCommand):
+    help = (
+        "Move COMPLETED/CANCELLED orders older than ORDER_ARCHIVE['AFTER_DAYS'] "
+        "into the archive tables in batches of one transaction each. Safe "
+        "to interrupt and re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            help="Override ORDER_ARCHIVE['AFTER_DAYS'].",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Override ORDER_ARCHIVE['BATCH_SIZE'].",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            help="Stop after this many batches (e.g. to bound one cron run).",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between batches to spread the write load.",
+        )
+        parser.add_argument(
+            "--stats",
+            action="store_true",
+            help="Print hot/archived/eligible order counts as JSON and exit.",
+        )
+
+    def handle(self, *args, **options):
+        archiver = order_archiver
+        if options["older_than_days"] is not None or options["batch_size"]:
+            archiver = OrderArchiver(
+                after_days=(
+                    options["older_than_days"]
+                    if options["older_than_days"] is not None
+                    else order_archiver.after.days
+                ),
+                batch_size=options["batch_size"] or order_archiver.batch_size,
+            )
+
+        if options["stats"]:
+            self.stdout.write(json.dumps(archiver.stats(), indent=2))
+            return
+
+        def on_batch(count, last_id):
+            self.stdout.write(f"Archived {count} order(s) up to id {last_id}")
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        started = time.perf_counter()
+        archived = archiver.archive(
+            max_batches=options["max_batches"], on_batch=on_batch
+        )
+        self.stdout.write(
+            f"Archived {archived} order(s) in {time.perf_counter() - started:.2f}s"
+        )
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from orders.models import Order
+from orders.snapshots import build_items_snapshot
+
+
+class Command(BaseCommand):
+    help = "Fill item_count/items_snapshot on orders created before snapshots existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Orders updated per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        updated = 0
+        last_id = 0
+
+        while True:
+            with transaction.atomic():
+                orders = list(
+                    Order.objects.filter(items_snapshot__isnull=True, id__gt=last_id)
+                    .order_by("id")
+                    .prefetch_related("items")[:batch_size]
+                )
+                if not orders:
+                    break
+
+                for order in orders:
+                    items = sorted(order.items.all(), key=lambda item: item.id)
+                    order.item_count = sum(item.quantity for item in items)
+                    order.items_snapshot = build_items_snapshot(items)
+                Order.objects.bulk_update(orders, ["item_count", "items_snapshot"])
+
+            updated += len(orders)
+            last_id = orders[-1].id
+
+        self.stdout.write(f"Backfilled {updated} order(s)")
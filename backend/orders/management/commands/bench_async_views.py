@@ -0,0 +1,213 @@
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncRequestFactory
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from orders.async_views import AsyncOrderHistoryView
+from orders.benchmarking import seed_checkout_cart
+from orders.services import OrderService
+from orders.views import OrderHistoryAPIView
+
+PATH = "/api/orders/history/"
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def _summary(latencies, errors, elapsed):
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_per_s": len(latencies) / elapsed,
+        "latency_ms": {
+            "p50": _percentile(latencies, 50) * 1000 if latencies else None,
+            "p99": _percentile(latencies, 99) * 1000 if latencies else None,
+            "mean": statistics.mean(latencies) * 1000 if latencies else None,
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare how many concurrent order-history requests one worker "
+        "serves with the sync view on a WSGI-style thread pool versus the "
+        "async view on one ASGI event loop, against a file-backed "
+        "throwaway database with simulated network latency per query."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=32,
+            help="Clients sending requests back to back.",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=20,
+            help="Requests per client.",
+        )
+        parser.add_argument(
+            "--wsgi-threads",
+            type=int,
+            default=4,
+            help="Request threads of the simulated WSGI worker.",
+        )
+        parser.add_argument(
+            "--db-latency-ms",
+            type=float,
+            default=5.0,
+            help="Delay added to every SQL statement, as a remote database would.",
+        )
+        parser.add_argument("--output", help="Write JSON to this file.")
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(
+                tempfile.mkdtemp(), "async-bench.sqlite3"
+            )
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+
+        delay = options["db_latency_ms"] / 1000
+
+        def add_latency(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def on_connect(sender, connection, **kwargs):
+            if add_latency not in connection.execute_wrappers:
+                connection.execute_wrappers.append(add_latency)
+
+        try:
+            customers = self.seed(options["concurrency"])
+            connections.close_all()
+            connection_created.connect(on_connect)
+            try:
+                report = {
+                    "concurrency": options["concurrency"],
+                    "db_latency_ms": options["db_latency_ms"],
+                    "wsgi_threads": options["wsgi_threads"],
+                    "wsgi": self.run_wsgi(customers, options),
+                    "asgi": asyncio.run(self.run_asgi(customers, options)),
+                }
+            finally:
+                connection_created.disconnect(on_connect)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        payload = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(payload + "\n")
+        else:
+            self.stdout.write(payload)
+
+    def seed(self, count):
+        customers = []
+        for i in range(count):
+            cart = seed_checkout_cart(3, tag=f"async-bench-{i}")
+            OrderService.checkout(cart)
+            customers.append(cart.customer)
+        return customers
+
+    def run_wsgi(self, customers, options):
+        """
+        Clients queue on a pool of `wsgi_threads` request threads, like a
+        threaded WSGI worker: each thread is blocked for the whole request.
+        """
+        factory = APIRequestFactory()
+        view = OrderHistoryAPIView.as_view()
+        latencies = []
+        errors = [0]
+        lock = threading.Lock()
+
+        def handle(customer):
+            try:
+                request = factory.get(PATH)
+                force_authenticate(
+                    request,
+                    user=SimpleNamespace(customer=customer, is_authenticated=True)
+                )
+                response = view(request)
+                # DRF Response, or a plain HttpResponse (fast serialization)
+                if hasattr(response, "render"):
+                    response.render()
+                return response.status_code
+            finally:
+                close_old_connections()
+
+        def client(worker, customer):
+            for _ in range(options["requests"]):
+                started = time.perf_counter()
+                status_code = worker.submit(handle, customer).result()
+                elapsed = time.perf_counter() - started
+                with lock:
+                    if status_code == 200:
+                        latencies.append(elapsed)
+                    else:
+                        errors[0] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["wsgi_threads"]) as worker:
+            clients = [
+                threading.Thread(target=client, args=(worker, customer))
+                for customer in customers
+            ]
+            for thread in clients:
+                thread.start()
+            for thread in clients:
+                thread.join()
+        return _summary(latencies, errors[0], time.perf_counter() - started)
+
+    async def run_asgi(self, customers, options):
+        """
+        All clients share one event loop; each request gets its own
+        thread-sensitive context, as under Django's ASGIHandler.
+        """
+        factory = AsyncRequestFactory()
+        view = AsyncOrderHistoryView.as_view()
+        latencies = []
+        errors = 0
+
+        async def client(customer):
+            nonlocal errors
+            for _ in range(options["requests"]):
+                started = time.perf_counter()
+                async with ThreadSensitiveContext():
+                    request = factory.get(PATH)
+                    force_authenticate(
+                        request,
+                        user=SimpleNamespace(customer=customer, is_authenticated=True)
+                    )
+                    response = await view(request)
+                    await sync_to_async(close_old_connections)()
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(customer) for customer in customers))
+        return _summary(latencies, errors, time.perf_counter() - started)
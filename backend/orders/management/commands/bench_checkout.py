@@ -0,0 +1,99 @@
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from orders.benchmarking import measure, seed_checkout_cart, summarize
+from orders.services import OrderService
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark OrderService.checkout, mark_as_paid, complete and cancel "
+        "on a throwaway test database and print the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[1, 10, 50, 100, 500],
+            help="Cart sizes (number of lines) to benchmark.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Timed runs per method and cart size.",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write JSON to this file instead of stdout.",
+        )
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            results = self.run_benchmarks(options["sizes"], options["repeat"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "results": results,
+        }
+        payload = json.dumps(report, indent=2, sort_keys=True)
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(payload + "\n")
+        else:
+            self.stdout.write(payload)
+
+    def run_benchmarks(self, sizes, repeat):
+        results = []
+        for lines in sizes:
+            samples = {"checkout": [], "mark_as_paid": [], "complete": [], "cancel": []}
+
+            # the extra last run is traced for allocations only
+            for run in range(repeat + 1):
+                trace = run == repeat
+
+                # paid -> completed on one order, cancel on a second one
+                cart = seed_checkout_cart(lines, tag=f"{lines}-{run}-a")
+                order, stats = measure(
+                    OrderService.checkout, cart, trace_allocations=trace
+                )
+                samples["checkout"].append(stats)
+
+                _, stats = measure(
+                    OrderService.mark_as_paid, order.id, trace_allocations=trace
+                )
+                samples["mark_as_paid"].append(stats)
+
+                _, stats = measure(
+                    OrderService.complete, order.id, trace_allocations=trace
+                )
+                samples["complete"].append(stats)
+
+                cart = seed_checkout_cart(lines, tag=f"{lines}-{run}-b")
+                order = OrderService.checkout(cart)
+                _, stats = measure(
+                    OrderService.cancel, order.id, trace_allocations=trace
+                )
+                samples["cancel"].append(stats)
+
+            for method, method_samples in samples.items():
+                results.append({
+                    "method": method,
+                    "lines": lines,
+                    **summarize(method_samples),
+                })
+        return results
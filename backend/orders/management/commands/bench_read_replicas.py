@@ -0,0 +1,164 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from products.models import Category, Product
+from orders.benchmarking import seed_checkout_cart
+from orders.models import Order
+from orders.pagination import keyset_page
+from orders.services import OrderService
+from core.db_routers import read_your_writes, use_primary
+
+REPLICA = "bench_replica"
+
+
+class StatementCounter:
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip()[:6].upper() == "SELECT":
+            self.reads += 1
+        else:
+            self.writes += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a mixed catalog / order-history / checkout workload against a "
+        "primary and a replica SQLite file, once without and once with the "
+        "replica router, and report how many statements each database ran."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=50)
+        parser.add_argument("--products", type=int, default=200)
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=2000,
+            help="Read requests (catalog pages and order history) per run.",
+        )
+        parser.add_argument(
+            "--checkout-every",
+            type=int,
+            default=10,
+            help="One checkout per this many read requests.",
+        )
+        parser.add_argument("--output", help="Write JSON to this file.")
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        primary_path = os.path.join(directory, "primary.sqlite3")
+        replica_path = os.path.join(directory, "replica.sqlite3")
+
+        connection.settings_dict["TEST"]["NAME"] = primary_path
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        original = settings.DATABASE_REPLICAS
+        try:
+            customers = self.seed(options)
+
+            # the replica starts as a copy of the primary; later writes are
+            # never shipped to it, as if replication lagged without bound
+            connection.close()
+            shutil.copyfile(primary_path, replica_path)
+            connections.settings[REPLICA] = dict(
+                connection.settings_dict, NAME=replica_path
+            )
+
+            report = {}
+            for label, aliases in (("primary_only", []), ("with_replica", [REPLICA])):
+                settings.DATABASE_REPLICAS = dict(original, ALIASES=aliases)
+                report[label] = self.run_workload(customers, options)
+        finally:
+            settings.DATABASE_REPLICAS = original
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(directory, ignore_errors=True)
+
+        before = report["primary_only"]["primary"]["reads"]
+        after = report["with_replica"]["primary"]["reads"]
+        report["primary_read_drop_pct"] = (
+            100 * (before - after) / before if before else 0.0
+        )
+
+        payload = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(payload + "\n")
+        else:
+            self.stdout.write(payload)
+
+    def seed(self, options):
+        category = Category.objects.create(name="Replica", slug="replica")
+        Product.objects.bulk_create([
+            Product(
+                name=f"Replica Product {i}",
+                sku=f"REPLICA-{i}",
+                price=1000,
+                category=category
+            )
+            for i in range(options["products"])
+        ])
+
+        customers = []
+        for i in range(options["customers"]):
+            cart = seed_checkout_cart(2, tag=f"replica-{i}")
+            OrderService.checkout(cart)
+            customers.append(cart.customer)
+        return customers
+
+    def run_workload(self, customers, options):
+        counters = {"default": StatementCounter(), REPLICA: StatementCounter()}
+        customers = list(customers)
+        rng = random.Random(0)
+        checkouts = 0
+        history_hits = 0
+
+        started = time.perf_counter()
+        with connections["default"].execute_wrapper(counters["default"]), \
+                connections[REPLICA].execute_wrapper(counters[REPLICA]):
+            for i in range(options["requests"]):
+                customer = rng.choice(customers)
+                if i % 2:
+                    list(
+                        Product.objects.filter(
+                            is_active=True, category__is_active=True
+                        ).select_related("category").order_by("id")[:50]
+                    )
+                else:
+                    with read_your_writes(f"customer:{customer.id}"):
+                        page, _ = keyset_page(
+                            Order.objects.filter(customer=customer), None, 20
+                        )
+                    history_hits += len(page)
+
+                if i % options["checkout_every"] == 0:
+                    # the seeding helper reads back rows it just wrote
+                    with use_primary():
+                        cart = seed_checkout_cart(
+                            1, tag=f"{time.perf_counter_ns()}-{i}"
+                        )
+                    OrderService.checkout(cart)
+                    customers.append(cart.customer)
+                    checkouts += 1
+        elapsed = time.perf_counter() - started
+
+        return {
+            "elapsed_s": elapsed,
+            "checkouts": checkouts,
+            "history_rows_read": history_hits,
+            "primary": vars(counters["default"]),
+            "replica": vars(counters[REPLICA]),
+        }
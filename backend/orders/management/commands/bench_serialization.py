@@ -0,0 +1,163 @@
+import json
+import platform
+from decimal import Decimal
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+
+from customers.models import Customer
+from orders.benchmarking import measure, summarize
+from orders.models import Order, OrderItem
+from orders.serializers import ORDER_FIELDS, OrderSerializer, fast_order_data
+from products.models import Category, Product
+from products.serializers import ProductSerializer, fast_product_data
+from core.serialization import orjson, render_json
+
+ITEMS_PER_ORDER = 3
+
+
+def _serializer_orders(orders):
+    return JSONRenderer().render(
+        OrderSerializer(orders.prefetch_related("items"), many=True).data
+    )
+
+
+def _fast_orders(orders):
+    return render_json(fast_order_data(orders.values(*ORDER_FIELDS)))
+
+
+def _serializer_products(products):
+    return JSONRenderer().render(
+        ProductSerializer(products.select_related("category"), many=True).data
+    )
+
+
+def _fast_products(products):
+    return render_json(fast_product_data(products))
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark rendering order and product lists with the DRF "
+        "serializers + JSONRenderer against the fast .values() path, on a "
+        "throwaway test database, and print the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[1, 100, 10000],
+            help="Rows per response to benchmark.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Timed runs per path and size.",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write JSON to this file instead of stdout.",
+        )
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            results = self.run_benchmarks(options["sizes"], options["repeat"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "json_encoder": "orjson" if orjson is not None else "json",
+            "results": results,
+        }
+        payload = json.dumps(report, indent=2, sort_keys=True)
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(payload + "\n")
+        else:
+            self.stdout.write(payload)
+
+    def seed(self, rows, tag):
+        customer = Customer.objects.create(
+            email=f"serialization-{tag}@bench.local",
+            name=f"Serialization {tag}"
+        )
+        orders = Order.objects.bulk_create([
+            Order(customer=customer, total_amount=Decimal("3000.50"))
+            for _ in range(rows)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product_name=f"Produk {order.id}-{i}",
+                product_sku=f"SER-{order.id}-{i}",
+                product_price=Decimal("1000.1667"),
+                quantity=i + 1
+            )
+            for order in orders
+            for i in range(ITEMS_PER_ORDER)
+        ])
+
+        category = Category.objects.create(
+            name=f"Serialization {tag}", slug=f"serialization-{tag}"
+        )
+        Product.objects.bulk_create([
+            Product(
+                name=f"Produk {tag}-{i}",
+                sku=f"SER-{tag}-{i}",
+                price=Decimal("1499.99"),
+                category=category
+            )
+            for i in range(rows)
+        ])
+        return (
+            Order.objects.filter(customer=customer).order_by("id"),
+            Product.objects.filter(category=category).order_by("id"),
+        )
+
+    def run_benchmarks(self, sizes, repeat):
+        results = []
+        for rows in sizes:
+            orders, products = self.seed(rows, tag=str(rows))
+            cases = (
+                ("orders", "serializer", _serializer_orders, orders),
+                ("orders", "fast", _fast_orders, orders),
+                ("products", "serializer", _serializer_products, products),
+                ("products", "fast", _fast_products, products),
+            )
+
+            bodies = {}
+            for resource, path, render, queryset in cases:
+                samples = []
+                # the extra last run is traced for allocations only
+                for run in range(repeat + 1):
+                    body, stats = measure(
+                        render, queryset, trace_allocations=run == repeat
+                    )
+                    samples.append(stats)
+                bodies[resource, path] = body
+                results.append({
+                    "resource": resource,
+                    "path": path,
+                    "rows": rows,
+                    "bytes": len(body),
+                    **summarize(samples),
+                })
+
+            for resource in ("orders", "products"):
+                if bodies[resource, "fast"] != bodies[resource, "serializer"]:
+                    raise AssertionError(
+                        f"fast {resource} output differs at {rows} rows"
+                    )
+        return results
@@ -0,0 +1,217 @@
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+
+from customers.models import Customer
+from products.models import Category, Product
+from cart.models import Cart, CartItem
+from inventory.models import Inventory
+from inventory.services import InventoryService
+from orders.models import OrderItem
+from orders.services import OrderService
+from core.exceptions import InsufficientStockError
+
+HOT_SKU = "CONTENTION-HOT"
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def _init_worker():
+    # forked children must not share the parent's sqlite handle
+    connections.close_all()
+
+
+def _run_checkout(cart_id):
+    """
+    Check out one cart inside a worker process and classify the outcome.
+    """
+    timings = {"sql": 0.0, "inventory_sql": 0.0}
+
+    def time_sql(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            spent = time.perf_counter() - started
+            timings["sql"] += spent
+            if "inventory_inventory" in sql:
+                timings["inventory_sql"] += spent
+
+    cart = Cart.objects.get(id=cart_id)
+    started = time.perf_counter()
+    try:
+        with connection.execute_wrapper(time_sql):
+            OrderService.checkout(cart)
+        outcome = "ok"
+    except InsufficientStockError:
+        outcome = "insufficient_stock"
+    except OperationalError as exc:
+        outcome = "database_locked" if "locked" in str(exc) else "operational_error"
+    elapsed = time.perf_counter() - started
+
+    return outcome, elapsed * 1000, timings["sql"] * 1000, timings["inventory_sql"] * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Run many concurrent checkouts that all compete for one scarce "
+        "inventory row on a file-backed throwaway database, then report "
+        "throughput, latency, time spent in SQL and whether stock oversold."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument(
+            "--checkouts",
+            type=int,
+            default=200,
+            help="Number of carts (one checkout each) competing for the SKU.",
+        )
+        parser.add_argument(
+            "--stock",
+            type=int,
+            default=50,
+            help="Units available on the hot SKU.",
+        )
+        parser.add_argument("--quantity", type=int, default=1)
+        parser.add_argument(
+            "--mode",
+            choices=[InventoryService.LOCKING, InventoryService.CONDITIONAL],
+            help="Override INVENTORY_RESERVATION_MODE for this run.",
+        )
+        parser.add_argument(
+            "--db-path",
+            help="Database file to use (default: a temporary file).",
+        )
+        parser.add_argument("--output", help="Write JSON to this file.")
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            db_path = options["db_path"] or os.path.join(
+                tempfile.mkdtemp(), "contention.sqlite3"
+            )
+            connection.settings_dict["TEST"]["NAME"] = db_path
+        if options["mode"]:
+            settings.INVENTORY_RESERVATION_MODE = options["mode"]
+
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            report = self.run_contention(options)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        payload = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(payload + "\n")
+        else:
+            self.stdout.write(payload)
+
+        if report["oversold"]:
+            raise CommandError("Stock oversold under contention")
+
+    def seed(self, checkouts, stock, quantity):
+        category = Category.objects.create(name="Contention", slug="contention")
+        product = Product.objects.create(
+            name="Hot Item",
+            sku=HOT_SKU,
+            price=Decimal("1000.00"),
+            category=category
+        )
+        Inventory.objects.create(product=product, quantity_available=stock)
+
+        Customer.objects.bulk_create([
+            Customer(email=f"contention-{i}@test.com", name=f"Buyer {i}")
+            for i in range(checkouts)
+        ])
+        customers = Customer.objects.filter(email__startswith="contention-")
+        Cart.objects.bulk_create([
+            Cart(
+                customer=c,
+                subtotal=product.price * quantity,
+                item_count=quantity
+            )
+            for c in customers
+        ])
+        carts = list(Cart.objects.filter(customer__in=customers))
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=product, quantity=quantity)
+            for cart in carts
+        ])
+        return product, [cart.id for cart in carts]
+
+    def run_contention(self, options):
+        stock = options["stock"]
+        quantity = options["quantity"]
+        product, cart_ids = self.seed(options["checkouts"], stock, quantity)
+
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        started = time.perf_counter()
+        with context.Pool(options["workers"], initializer=_init_worker) as pool:
+            results = pool.map(_run_checkout, cart_ids, chunksize=1)
+        elapsed = time.perf_counter() - started
+
+        outcomes = {}
+        for outcome, *_ in results:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        latencies = [latency for outcome, latency, *_ in results if outcome == "ok"]
+        sql = [spent for _, _, spent, _ in results]
+        inventory_sql = [spent for *_, spent in results]
+
+        remaining = Inventory.objects.get(product=product).quantity_available
+        sold = sum(
+            OrderItem.objects.filter(product_sku=HOT_SKU)
+            .values_list("quantity", flat=True)
+        )
+
+        return {
+            "database": connection.vendor,
+            "mode": InventoryService.mode(),
+            "workers": options["workers"],
+            "checkouts": len(cart_ids),
+            "initial_stock": stock,
+            "outcomes": outcomes,
+            "elapsed_s": elapsed,
+            "throughput_per_s": outcomes.get("ok", 0) / elapsed,
+            "latency_ms": {
+                "p50": _percentile(latencies, 50),
+                "p99": _percentile(latencies, 99),
+                "mean": statistics.mean(latencies) if latencies else None,
+            },
+            # time spent executing the checkout's statements, lock and busy
+            # waits included. sqlite makes a writer wait on its first write
+            # (the order INSERT), not on the inventory UPDATE, so only
+            # sql_ms covers that; COMMIT is not a statement and is in
+            # neither figure
+            "sql_ms": {
+                "p50": _percentile(sql, 50),
+                "p99": _percentile(sql, 99),
+            },
+            # the part of sql_ms spent on statements touching the
+            # inventory table, where row locks are taken on other databases
+            "inventory_sql_ms": {
+                "p50": _percentile(inventory_sql, 50),
+                "p99": _percentile(inventory_sql, 99),
+            },
+            "remaining_stock": remaining,
+            "units_sold": sold,
+            "oversold": remaining < 0 or sold > stock or sold + remaining != stock,
+        }
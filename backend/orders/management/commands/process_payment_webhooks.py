@@ -0,0 +1,135 @@
+import json
+import logging
+import multiprocessing
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from orders.webhooks import payment_webhook_inbox
+
+logger = logging.getLogger(__name__)
+
+# longest sleep after repeated failures, in seconds
+MAX_BACKOFF = 30.0
+
+
+def _work(batch_size, poll_interval, drain, stop=None):
+    """
+    Worker loop: claim and process batches until the inbox is empty
+    (`drain`) or forever, sleeping `poll_interval` when idle. A failing
+    batch (e.g. "database is locked") is logged and retried after a
+    growing pause; its claimed events are picked up again once their
+    lease expires.
+    """
+    handled = 0
+    failures = 0
+    while stop is None or not stop.is_set():
+        try:
+            count = payment_webhook_inbox.run_once(batch_size)
+        except Exception:
+            logger.exception("payment webhook batch failed")
+            failures += 1
+            time.sleep(min(poll_interval * 2 ** (failures - 1), MAX_BACKOFF))
+            continue
+        finally:
+            close_old_connections()
+        failures = 0
+        handled += count
+        if not count:
+            if drain:
+                break
+            time.sleep(poll_interval)
+    return handled
+
+
+def _process_worker(batch_size, poll_interval, drain):
+    # forked children must not share the parent's database handle
+    connections.close_all()
+    return _work(batch_size, poll_interval, drain)
+
+
+class Command(BaseCommand):
+    help = (
+        "Work off the payment webhook inbox with a pool of thread or "
+        "process workers that claim events in batches and mark the "
+        "matching orders as paid."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument(
+            "--pool",
+            choices=["thread", "process"],
+            default="thread",
+            help="Run workers as threads (default) or forked processes.",
+        )
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds an idle worker waits before polling again.",
+        )
+        parser.add_argument(
+            "--drain",
+            action="store_true",
+            help="Exit once the inbox is empty instead of polling forever.",
+        )
+        parser.add_argument(
+            "--stats",
+            action="store_true",
+            help="Print queue depth and processing lag as JSON and exit.",
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            self.stdout.write(json.dumps(payment_webhook_inbox.stats(), indent=2))
+            return
+
+        args = (options["batch_size"], options["poll_interval"], options["drain"])
+        started = time.perf_counter()
+        if options["pool"] == "process":
+            handled = self.run_processes(options["workers"], args)
+        else:
+            handled = self.run_threads(options["workers"], args)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"Handled {handled} webhook events in {elapsed:.2f}s "
+            f"with {options['workers']} {options['pool']} workers"
+        )
+        self.stdout.write(json.dumps(payment_webhook_inbox.stats(), indent=2))
+
+    def run_threads(self, workers, args):
+        stop = threading.Event()
+        handled = [0] * workers
+
+        def run(index):
+            handled[index] = _work(*args, stop=stop)
+
+        threads = [
+            threading.Thread(target=run, args=(i,), name=f"webhook-worker-{i}")
+            for i in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        return sum(handled)
+
+    def run_processes(self, workers, args):
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        with context.Pool(workers) as pool:
+            results = [
+                pool.apply_async(_process_worker, args) for _ in range(workers)
+            ]
+            return sum(result.get() for result in results)
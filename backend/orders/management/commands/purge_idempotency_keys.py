@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from orders.idempotency import checkout_idempotency
+
+
+class Command(BaseCommand):
+    help = "Delete checkout Idempotency-Key records past their expiry."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Records deleted per statement.",
+        )
+
+    def handle(self, *args, **options):
+        purged = checkout_idempotency.purge_expired(
+            batch_size=options["batch_size"]
+        )
+        self.stdout.write(f"Purged {purged} expired idempotency key(s)")
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_order_customer_history_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='items_snapshot',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
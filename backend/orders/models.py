@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from core.models import TimeStampedModel
 from customers.models import Customer
@@ -22,6 +23,23 @@ class Order(TimeStampedModel):
         default=PENDING
     )
     total_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    # denormalized copy of the items written at checkout, so an order can
+    # be served from its own row; null until backfilled for older orders
+    item_count = models.PositiveIntegerField(default=0)
+    items_snapshot = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # keyset pagination of a customer's order history
+            models.Index(
+                fields=["customer", "-created_at", "-id"],
+                name="order_customer_history_idx"
+            ),
+            models.Index(
+                fields=["customer", "status"],
+                name="order_customer_status_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Order {self.id}"
@@ -31,4 +49,109 @@ class OrderItem(models.Model):
     product_name = models.CharField(max_length=200)
     product_price = models.DecimalField(max_digits=12, decimal_places=2)
     quantity = models.PositiveIntegerField()
-    product_sku = models.CharField(max_length=50)
\ No newline at end of file
+    product_sku = models.CharField(max_length=50)
+
+class PaymentWebhookEvent(TimeStampedModel):
+    """
+    Inbox row for one payment provider delivery. The webhook view only
+    inserts (duplicates hit the unique event id and are dropped); workers
+    claim rows in batches and move them to a final status.
+    """
+    RECEIVED = "RECEIVED"
+    PROCESSING = "PROCESSING"
+    PROCESSED = "PROCESSED"
+    IGNORED = "IGNORED"
+    FAILED = "FAILED"
+
+    STATUS_CHOICES = [
+        (RECEIVED, "Received"),
+        (PROCESSING, "Processing"),
+        (PROCESSED, "Processed"),
+        (IGNORED, "Ignored"),
+        (FAILED, "Failed"),
+    ]
+
+    provider_event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    # not a foreign key: the acknowledgment must not depend on the order
+    order_id = models.PositiveBigIntegerField(null=True, blank=True)
+    payload = models.JSONField()
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=RECEIVED
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # workers claim the oldest open events
+            models.Index(
+                fields=["status", "id"],
+                name="webhook_event_claim_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"PaymentWebhookEvent {self.provider_event_id}"
+
+
+class CheckoutIdempotencyKey(TimeStampedModel):
+    """
+    One Idempotency-Key sent to the checkout endpoint. While the first
+    request runs, `response` is null and `expires_at` is a short in-flight
+    lease; afterwards it holds the response to replay until the TTL ends.
+    """
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ("customer", "key")
+
+    def __str__(self):
+        return f"CheckoutIdempotencyKey {self.key}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    Cold copy of a COMPLETED/CANCELLED order moved out of Order by
+    orders.archive.OrderArchiver. The id is the original order id, so
+    history cursors and links stay valid; items_snapshot is always set.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(Customer, on_delete=models.PROTECT)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    item_count = models.PositiveIntegerField(default=0)
+    items_snapshot = models.JSONField()
+    # copied from the order, not set on insert
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["customer", "-created_at", "-id"],
+                name="archived_order_history_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"ArchivedOrder {self.id}"
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(
+        ArchivedOrder, on_delete=models.CASCADE, related_name="items"
+    )
+    product_name = models.CharField(max_length=200)
+    product_price = models.DecimalField(max_digits=12, decimal_places=2)
+    quantity = models.PositiveIntegerField()
+    product_sku = models.CharField(max_length=50)
@@ -0,0 +1,87 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, pk):
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def _after_cursor(queryset, cursor):
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+    return queryset
+
+
+def _page_queryset(queryset, cursor, page_size):
+    queryset = _after_cursor(queryset, cursor).order_by("-created_at", "-id")
+    return queryset[:page_size + 1]
+
+
+def _union_page_queryset(querysets, fields, cursor, page_size):
+    parts = [
+        _after_cursor(queryset, cursor).order_by().values(*fields)
+        for queryset in querysets
+    ]
+    union = parts[0].union(*parts[1:], all=True)
+    return union.order_by("-created_at", "-id")[:page_size + 1]
+
+
+def _split_page(rows, page_size):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        if isinstance(last, dict):
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        else:
+            next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
+
+
+def keyset_page(queryset, cursor=None, page_size=20):
+    """
+    Return (rows, next_cursor) for `queryset` ordered newest first on
+    (created_at, id). The cursor is the last row of the previous page,
+    so each page is an index range scan no matter how deep it is.
+    """
+    rows = list(_page_queryset(queryset, cursor, page_size))
+    return _split_page(rows, page_size)
+
+
+def keyset_union_page(querysets, fields, cursor=None, page_size=20):
+    """
+    keyset_page over the UNION ALL of `querysets` (tables sharing one id
+    space, e.g. hot and archived orders) in a single query, returning
+    `.values(*fields)` dicts; `fields` must include "id" and "created_at".
+    """
+    rows = list(_union_page_queryset(querysets, fields, cursor, page_size))
+    return _split_page(rows, page_size)
+
+
+async def akeyset_union_page(querysets, fields, cursor=None, page_size=20):
+    """
+    keyset_union_page for async views, fetched with the async ORM.
+    """
+    rows = [
+        row async for row in
+        _union_page_queryset(querysets, fields, cursor, page_size)
+    ]
+    return _split_page(rows, page_size)
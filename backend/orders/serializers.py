@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from orders.models import Order, OrderItem
+from core.serialization import datetime_converter, decimal_converter
 
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
@@ -11,4 +12,87 @@ class OrderSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = ("id", "status", "total_amount", "created_at", "items")
\ No newline at end of file
+        fields = ("id", "status", "total_amount", "created_at", "items")
+
+class OrderSnapshotSerializer(serializers.ModelSerializer):
+    """
+    Same output as OrderSerializer, read from the order row alone.
+    Orders that predate the snapshot fall back to their items.
+    """
+    items = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Order
+        fields = ("id", "status", "total_amount", "created_at", "items")
+
+    def get_items(self, order):
+        if order.items_snapshot is not None:
+            return order.items_snapshot
+        return OrderItemSerializer(order.items.all(), many=True).data
+
+
+# Fast path: the same output as the serializers above, built from
+# .values() rows with converters prepared once per call instead of
+# field objects walking model instances.
+
+ORDER_FIELDS = ("id", "status", "total_amount", "created_at")
+
+
+def _items_by_order(order_ids):
+    to_price = decimal_converter(OrderItem._meta.get_field("product_price"))
+    items = {order_id: [] for order_id in order_ids}
+    rows = (
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .order_by("id")
+        .values_list("order_id", "product_name", "product_price", "quantity")
+    )
+    for order_id, name, price, quantity in rows:
+        items[order_id].append({
+            "product_name": name,
+            "product_price": to_price(price),
+            "quantity": quantity,
+        })
+    return items
+
+
+def _order_dicts(rows, items):
+    to_amount = decimal_converter(Order._meta.get_field("total_amount"))
+    to_datetime = datetime_converter()
+    return [
+        {
+            "id": row["id"],
+            "status": row["status"],
+            "total_amount": to_amount(row["total_amount"]),
+            "created_at": to_datetime(row["created_at"]),
+            "items": items[row["id"]],
+        }
+        for row in rows
+    ]
+
+
+SNAPSHOT_FIELDS = ORDER_FIELDS + ("items_snapshot",)
+
+
+def fast_order_data(rows):
+    """
+    OrderSerializer(orders, many=True).data as plain dicts, from
+    `orders.values(*ORDER_FIELDS)` rows plus one query for the items.
+    """
+    rows = list(rows)
+    return _order_dicts(rows, _items_by_order([row["id"] for row in rows]))
+
+
+def fast_order_snapshot_data(rows):
+    """
+    OrderSnapshotSerializer(orders, many=True).data as plain dicts, from
+    `orders.values(*SNAPSHOT_FIELDS)` rows; orders that predate the items
+    snapshot cost one extra query.
+    """
+    rows = list(rows)
+    items = _items_by_order([
+        row["id"] for row in rows if row["items_snapshot"] is None
+    ])
+    for row in rows:
+        if row["items_snapshot"] is not None:
+            items[row["id"]] = row["items_snapshot"]
+    return _order_dicts(rows, items)
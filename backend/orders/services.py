@@ -1,75 +1,149 @@
+import logging
+from collections import namedtuple
+
 from django.db import transaction
+from django.db.models import Sum
 from orders.models import Order, OrderItem
+from orders.snapshots import build_items_snapshot
 from orders.state_machine import OrderStateMachine
-from inventory.services import InventoryService
+from cart.models import Cart
+from inventory.services import InventoryService, ReservationService
+from products.snapshots import product_snapshots
+from core.metrics import PhaseTimer, count_errors, registry
+from core.db_routers import pin_to_primary
 from core.exceptions import (
     DomainError,
     CartNotActiveError,
     EmptyCartError,
 )
-import re
+
+logger = logging.getLogger(__name__)
+
+# Outcome of one order in a batch transition. `changed` is False both for
+# orders already in the target state (error is None) and for orders that
+# could not move (error holds the DomainError).
+TransitionResult = namedtuple(
+    "TransitionResult",
+    ["order_id", "previous_status", "status", "changed", "error"]
+)
+
+
+checkout_phase_seconds = registry.histogram(
+    "checkout_phase_seconds",
+    "Time spent in each numbered phase of OrderService.checkout.",
+    ["phase"]
+)
+checkout_domain_errors = registry.counter(
+    "checkout_domain_errors_total",
+    "DomainErrors raised by OrderService.checkout, by class.",
+    ["error"]
+)
+
 
 class OrderService:
 
+    TRANSITION_TARGETS = {
+        "pay": Order.PAID,
+        "complete": Order.COMPLETED,
+        "cancel": Order.CANCELLED,
+    }
+
     @staticmethod
+    @count_errors(checkout_domain_errors, DomainError)
     def checkout(cart):
+        timer = PhaseTimer(checkout_phase_seconds)
         with transaction.atomic():
-            # 1. validate cart
-            if cart.status != cart.ACTIVE:
+            # 1. validate cart (row lock: one checkout per cart at a time,
+            # and fresh running totals)
+            locked_cart = Cart.objects.select_for_update().get(id=cart.id)
+            if locked_cart.status != cart.ACTIVE:
                 raise CartNotActiveError("Cart is not active")
             
-            cart_items = cart.items.select_related("product")
+            lines = list(cart.items.values_list("product_id", "quantity"))
 
-            if not cart_items.exists():
+            if not lines:
                 raise EmptyCartError("Cart is empty")
 
-            # 2. validate stock
-            for item in cart_items:
-                InventoryService.check_availability(
-                    product=item.product,
-                    qty=item.quantity
-                )
+            products = product_snapshots.get_many(
+                [product_id for product_id, _ in lines]
+            )
+            timer.mark("validate_cart")
 
-            # 3. count total
+            # 2. validate stock: a fully reserved cart already holds its
+            # stock; otherwise lock every row in one ordered query
+            # (conditional mode validates inside the guarded UPDATE in step 6)
+            quantities = {products[product_id]: qty for product_id, qty in lines}
+            reserved = ReservationService.consume(cart, quantities)
+            inventories = None
+            if not reserved and InventoryService.mode() == InventoryService.LOCKING:
+                inventories = InventoryService.check_availability_many(quantities)
+            timer.mark("validate_stock")
+
+            # 3. count total from the same prices the items are written
+            # with, so the order always adds up to its items
             total_amount = 0
-            for item in cart_items:
-                total_amount += item.product.price * item.quantity
+            order_items = []
+            for product, qty in quantities.items():
+                total_amount += product.price * qty
+
+                order_items.append(
+                    OrderItem(
+                        product_name=product.name,
+                        product_sku=product.sku,
+                        product_price=product.price,
+                        quantity=qty
+                    )
+                )
+            if (
+                not locked_cart.totals_stale
+                and locked_cart.subtotal != total_amount
+            ):
+                # a write that bypassed the cart signals (queryset.update,
+                # bulk_create) changed prices under the running subtotal
+                logger.warning(
+                    "cart %s subtotal %s drifted from its prices (%s)",
+                    locked_cart.id, locked_cart.subtotal, total_amount
+                )
+            timer.mark("compute_total")
 
-            # 4. create order
+            # 4. create order (with a denormalized copy of its items)
             order = Order.objects.create(
                 customer=cart.customer,
                 status=Order.PENDING,
-                total_amount=total_amount
+                total_amount=total_amount,
+                item_count=sum(item.quantity for item in order_items),
+                items_snapshot=build_items_snapshot(order_items)
             )
+            timer.mark("create_order")
 
             # 5. create order items (snapshot)
-            order_items = []
-            for item in cart_items:
-                clean_name = re.sub(r"\s+", " ", item.product.name).strip()
-
-                order_items.append(
-                    OrderItem(
-                        order=order,
-                        product_name=clean_name,
-                        product_sku=item.product.sku,
-                        product_price=item.product.price,
-                        quantity=item.quantity
-                    )
-                )
+            for order_item in order_items:
+                order_item.order = order
             OrderItem.objects.bulk_create(order_items)
+            timer.mark("create_items")
 
-            # 6. reduce stock
-            for item in cart_items:
-                InventoryService.reduce(
-                    product=item.product,
-                    qty=item.quantity
-                )
+            # 6. reduce stock (a reserved cart took it when items were added)
+            if not reserved and inventories is None:
+                InventoryService.reduce_many({
+                    product.id: qty for product, qty in quantities.items()
+                })
+            elif not reserved:
+                InventoryService.reduce_locked(inventories, quantities)
+            timer.mark("reduce_stock")
 
             # 7. update cart status
             cart.status = cart.CHECKED_OUT
-            cart.save()
-            
-            return order
+            cart.save(update_fields=["status"])
+            timer.mark("update_cart")
+
+            # read-your-writes: the new order may not be on replicas yet
+            customer_id = cart.customer_id
+            transaction.on_commit(
+                lambda: pin_to_primary(f"customer:{customer_id}")
+            )
+        
+        timer.mark("commit")
+        return order
     
     @staticmethod
     def mark_as_paid(order_id):
@@ -115,7 +189,7 @@ class OrderService:
                 Order.objects.select_for_update().get(id=order_id)
             )
             
-            if order.status == Order.CANCELED:
+            if order.status == Order.CANCELLED:
                 return order
 
             new_status = OrderStateMachine.next_state(
@@ -124,4 +198,103 @@ class OrderService:
             
             order.status = new_status
             order.save()
-            return order
\ No newline at end of file
+
+            OrderService.restore_stock([order.id])
+            return order
+
+    @staticmethod
+    def transition_many(order_ids, action):
+        """
+        Apply `action` to many orders at once: lock them in one query
+        ordered by id (so concurrent batches cannot deadlock), validate
+        every transition in memory and write the new statuses with one
+        UPDATE per resulting status. Returns {order id: TransitionResult}
+        in input order; invalid or missing orders do not stop the batch.
+        """
+        target = OrderService.TRANSITION_TARGETS[action]
+        order_ids = list(dict.fromkeys(order_ids))
+
+        with transaction.atomic():
+            statuses = dict(
+                Order.objects.select_for_update()
+                .filter(id__in=order_ids)
+                .order_by("id")
+                .values_list("id", "status")
+            )
+
+            results = {}
+            moves = {}
+            for order_id in order_ids:
+                status = statuses.get(order_id)
+                if status is None:
+                    error = DomainError(f"Order {order_id} does not exist")
+                    results[order_id] = TransitionResult(
+                        order_id, None, None, False, error
+                    )
+                    continue
+
+                if status == target:
+                    results[order_id] = TransitionResult(
+                        order_id, status, status, False, None
+                    )
+                    continue
+
+                try:
+                    new_status = OrderStateMachine.next_state(status, action)
+                except DomainError as exc:
+                    results[order_id] = TransitionResult(
+                        order_id, status, status, False, exc
+                    )
+                    continue
+
+                moves.setdefault(new_status, []).append(order_id)
+                results[order_id] = TransitionResult(
+                    order_id, status, new_status, True, None
+                )
+
+            for new_status, ids in moves.items():
+                Order.objects.filter(id__in=ids).update(status=new_status)
+
+            return results
+
+    @staticmethod
+    def mark_many_as_paid(order_ids):
+        return OrderService.transition_many(order_ids, "pay")
+
+    @staticmethod
+    def complete_many(order_ids):
+        return OrderService.transition_many(order_ids, "complete")
+
+    @staticmethod
+    def cancel_many(order_ids):
+        with transaction.atomic():
+            results = OrderService.transition_many(order_ids, "cancel")
+            OrderService.restore_stock([
+                result.order_id for result in results.values() if result.changed
+            ])
+            return results
+
+    @staticmethod
+    def restore_stock(order_ids):
+        """
+        Put the items of the given orders back in stock: one aggregate
+        over their OrderItem SKU snapshots, one joined SKU lookup and one
+        UPDATE. SKUs whose product is gone are logged and returned rather
+        than raised, so one deleted product cannot block a cancellation.
+        """
+        if not order_ids:
+            return set()
+
+        quantities = dict(
+            OrderItem.objects.filter(order_id__in=order_ids)
+            .values("product_sku")
+            .annotate(quantity=Sum("quantity"))
+            .values_list("product_sku", "quantity")
+        )
+        unknown = InventoryService.restore_by_sku(quantities)
+        if unknown:
+            logger.warning(
+                "Stock not restored for unknown SKUs %s (orders %s)",
+                sorted(unknown), list(order_ids)
+            )
+        return unknown
@@ -0,0 +1,24 @@
+from decimal import Decimal
+
+CENT = Decimal("0.01")
+
+
+def format_price(value):
+    """
+    Render a price the way OrderItemSerializer does ("500000.00").
+    """
+    return "{:f}".format(Decimal(value).quantize(CENT))
+
+
+def build_items_snapshot(order_items):
+    """
+    JSON-ready copy of `order_items`, matching OrderItemSerializer output.
+    """
+    return [
+        {
+            "product_name": item.product_name,
+            "product_price": format_price(item.product_price),
+            "quantity": item.quantity,
+        }
+        for item in order_items
+    ]
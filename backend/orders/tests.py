@@ -1,17 +1,75 @@
-from django.test import TestCase
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import AsyncRequestFactory, Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import OperationalError, connection
+from django.utils import timezone
+from django.core.management import call_command
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+from datetime import timedelta
+import base64
+import hashlib
+import hmac
+import json
 from decimal import Decimal
+from io import StringIO
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
 
 from customers.models import Customer
 from products.models import Category, Product
 from cart.models import Cart, CartItem
 from inventory.models import Inventory
-from orders.services import OrderService
-from orders.models import Order
+from orders.services import (
+    OrderService,
+    checkout_domain_errors,
+    checkout_phase_seconds,
+)
+from orders.models import (
+    ArchivedOrder,
+    ArchivedOrderItem,
+    CheckoutIdempotencyKey,
+    Order,
+    OrderItem,
+    PaymentWebhookEvent,
+)
+from orders.views import (
+    CheckoutAPIView,
+    OrderDetailAPIView,
+    OrderHistoryAPIView,
+    PaymentWebhookInboxAPIView,
+)
+from orders.idempotency import CheckoutIdempotency
+from orders.archive import OrderArchiver
+from orders.async_views import (
+    AsyncCheckoutView,
+    AsyncOrderDetailView,
+    AsyncOrderHistoryView,
+)
+from core.db_routers import ReplicaRouter, read_your_writes
+from core.serialization import render_json
+from orders.webhooks import PaymentWebhookInbox, payment_webhook_inbox
+from orders.management.commands.process_payment_webhooks import _work
+from orders.serializers import (
+    ORDER_FIELDS,
+    SNAPSHOT_FIELDS,
+    OrderSerializer,
+    OrderSnapshotSerializer,
+    fast_order_data,
+    fast_order_snapshot_data,
+)
+from orders.benchmarking import measure, seed_checkout_cart
+from orders.checkout_queue import CheckoutQueue
 from payments.models.refund import Refund
 from payments.services.refund_service import RefundService
 from core.exceptions import(
+    CheckoutUnavailableError,
     DomainError,
     EmptyCartError,
+    IdempotencyKeyInUseError,
     InsufficientStockError
 )
 import pytest
@@ -59,6 +117,12 @@ class OrderServiceCheckoutTest(TestCase):
         self.assertEqual(order.status, Order.PENDING)
 
         #order item snapshot
+        self.assertEqual(order.item_count, 2)
+        self.assertEqual(order.items_snapshot, [{
+            "product_name": "Sepatu Lari X",
+            "product_price": "500000.00",
+            "quantity": 2,
+        }])
         self.assertEqual(order.items.count(), 1)
         item = order.items.first()
         self.assertEqual(item.product_name.strip(), "Sepatu Lari X")
@@ -76,7 +140,10 @@ class OrderServiceCheckoutTest(TestCase):
 
     
     def test_checkout_empty_cart_raises_error(self):
-        empty_cart = Cart.objects.create(customer=self.customer)
+        # one active cart per customer: the empty one belongs to someone else
+        empty_cart = Cart.objects.create(
+            customer=Customer.objects.create(email="empty@test.com", name="Empty")
+        )
 
         with self.assertRaises(EmptyCartError):
             OrderService.checkout(empty_cart)
@@ -95,6 +162,49 @@ class OrderServiceCheckoutTest(TestCase):
         self.cart.refresh_from_db()
         self.assertEqual(self.cart.status, Cart.ACTIVE)
     
+    def test_checkout_query_count_does_not_grow_with_cart_size(self):
+        def checkout_queries(line_count):
+            customer = Customer.objects.create(
+                email=f"lines-{line_count}@test.com",
+                name="Lines"
+            )
+            cart = Cart.objects.create(customer=customer)
+            for i in range(line_count):
+                product = Product.objects.create(
+                    name=f"Produk {line_count}-{i}",
+                    sku=f"SKU-{line_count}-{i}",
+                    price=Decimal("1000"),
+                    category=self.category
+                )
+                Inventory.objects.create(product=product, quantity_available=5)
+                CartItem.objects.create(cart=cart, product=product, quantity=1)
+
+            with CaptureQueriesContext(connection) as ctx:
+                OrderService.checkout(cart)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(checkout_queries(1), checkout_queries(5))
+
+    def test_checkout_insufficient_stock_on_one_line_keeps_all_stock(self):
+        other = Product.objects.create(
+            name="Kaos Kaki",
+            sku="SKU-002",
+            price=Decimal("20000"),
+            category=self.category
+        )
+        Inventory.objects.create(product=other, quantity_available=1)
+        CartItem.objects.create(cart=self.cart, product=other, quantity=3)
+
+        with self.assertRaises(InsufficientStockError):
+            OrderService.checkout(self.cart)
+
+        self.assertEqual(
+            Inventory.objects.get(product=self.product).quantity_available, 10
+        )
+        self.assertEqual(
+            Inventory.objects.get(product=other).quantity_available, 1
+        )
+
     def test_mark_as_paid_is_idempotent(self):
         order = OrderService.checkout(self.cart)
         
@@ -211,4 +321,930 @@ class OrderServiceCheckoutTest(TestCase):
         )
 
         assert r1.id == r2.id
-        assert r2.amount == 200
\ No newline at end of file
+        assert r2.amount == 200
+
+class CheckoutQueryBudgetTest(TestCase):
+    """
+    Regression guard for N+1 patterns: query counts must not grow with
+    cart size. `manage.py bench_checkout` reports the same numbers.
+    """
+    SIZES = (1, 10, 100)
+
+    def query_counts(self, method):
+        counts = {}
+        for lines in self.SIZES:
+            cart = seed_checkout_cart(lines, tag=f"{method}-{lines}")
+            if method == "checkout":
+                _, stats = measure(OrderService.checkout, cart)
+            else:
+                order = OrderService.checkout(cart)
+                _, stats = measure(getattr(OrderService, method), order.id)
+            counts[lines] = stats["queries"]
+        return counts
+
+    def assertFlat(self, counts):
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def test_checkout_queries_are_flat(self):
+        self.assertFlat(self.query_counts("checkout"))
+
+    def test_mark_as_paid_queries_are_flat(self):
+        self.assertFlat(self.query_counts("mark_as_paid"))
+
+    def test_cancel_queries_are_flat(self):
+        self.assertFlat(self.query_counts("cancel"))
+
+
+class OrderBatchTransitionTest(TestCase):
+    def checkout_orders(self, count, tag):
+        return [
+            OrderService.checkout(seed_checkout_cart(1, tag=f"{tag}-{i}"))
+            for i in range(count)
+        ]
+
+    def test_mixed_batch_reports_per_order_results(self):
+        pending, paid, cancelled = self.checkout_orders(3, "mixed")
+        OrderService.mark_as_paid(paid.id)
+        OrderService.cancel(cancelled.id)
+        missing_id = cancelled.id + 1000
+
+        results = OrderService.mark_many_as_paid(
+            [pending.id, paid.id, cancelled.id, missing_id, pending.id]
+        )
+
+        self.assertEqual(
+            list(results), [pending.id, paid.id, cancelled.id, missing_id]
+        )
+        self.assertTrue(results[pending.id].changed)
+        self.assertEqual(results[pending.id].previous_status, Order.PENDING)
+        self.assertEqual(results[pending.id].status, Order.PAID)
+
+        # already in the target state: not an error, nothing written
+        self.assertFalse(results[paid.id].changed)
+        self.assertIsNone(results[paid.id].error)
+
+        self.assertIsInstance(results[cancelled.id].error, DomainError)
+        self.assertEqual(results[cancelled.id].status, Order.CANCELLED)
+        self.assertIsInstance(results[missing_id].error, DomainError)
+
+        self.assertEqual(Order.objects.get(id=pending.id).status, Order.PAID)
+        self.assertEqual(
+            Order.objects.get(id=cancelled.id).status, Order.CANCELLED
+        )
+
+    def test_batch_is_idempotent(self):
+        orders = self.checkout_orders(2, "idempotent")
+        ids = [order.id for order in orders]
+
+        OrderService.mark_many_as_paid(ids)
+        results = OrderService.mark_many_as_paid(ids)
+
+        self.assertFalse(any(result.changed for result in results.values()))
+        self.assertTrue(all(result.error is None for result in results.values()))
+
+    def test_cancel_many_restores_stock_once_per_cancelled_order(self):
+        orders = self.checkout_orders(3, "cancel")
+        OrderService.mark_as_paid(orders[2].id)
+        skus = [order.items.get().product_sku for order in orders]
+        before = {
+            sku: Inventory.objects.get(product__sku=sku).quantity_available
+            for sku in skus
+        }
+
+        OrderService.cancel_many([order.id for order in orders])
+        OrderService.cancel_many([order.id for order in orders])
+
+        after = {
+            sku: Inventory.objects.get(product__sku=sku).quantity_available
+            for sku in skus
+        }
+        self.assertEqual(after[skus[0]], before[skus[0]] + 1)
+        self.assertEqual(after[skus[1]], before[skus[1]] + 1)
+        # paid orders cannot be cancelled, so their stock stays sold
+        self.assertEqual(after[skus[2]], before[skus[2]])
+
+    def test_restore_stock_reports_unknown_skus(self):
+        order = self.checkout_orders(1, "unknown")[0]
+        OrderItem.objects.create(
+            order=order,
+            product_name="Gone",
+            product_sku="SKU-DELETED",
+            product_price=Decimal("1.00"),
+            quantity=1
+        )
+
+        with self.assertLogs("orders.services", level="WARNING"):
+            unknown = OrderService.restore_stock([order.id])
+
+        self.assertEqual(unknown, {"SKU-DELETED"})
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        counts = []
+        for size in (1, 20):
+            ids = [order.id for order in self.checkout_orders(size, f"q{size}")]
+            with CaptureQueriesContext(connection) as ctx:
+                OrderService.mark_many_as_paid(ids)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+
+class CheckoutMetricsTest(TestCase):
+    PHASES = (
+        "validate_cart", "validate_stock", "compute_total", "create_order",
+        "create_items", "reduce_stock", "update_cart", "commit",
+    )
+
+    def counts(self):
+        return {
+            key[0]: count
+            for key, (_, _, count) in checkout_phase_seconds.collect().items()
+        }
+
+    def test_every_phase_is_timed(self):
+        before = self.counts()
+
+        OrderService.checkout(seed_checkout_cart(2, tag="metrics"))
+
+        after = self.counts()
+        for phase in self.PHASES:
+            self.assertEqual(after[phase] - before.get(phase, 0), 1, phase)
+
+    def test_domain_errors_are_counted_by_class(self):
+        key = ("InsufficientStockError",)
+        before = checkout_domain_errors.collect().get(key, 0)
+
+        with self.assertRaises(InsufficientStockError):
+            OrderService.checkout(seed_checkout_cart(1, tag="metrics-err", stock=0))
+
+        self.assertEqual(checkout_domain_errors.collect()[key], before + 1)
+
+    def test_metrics_endpoint(self):
+        OrderService.checkout(seed_checkout_cart(1, tag="metrics-endpoint"))
+
+        response = self.client.get("/metrics/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'checkout_phase_seconds_count{phase="reduce_stock"}',
+            response.content.decode()
+        )
+
+
+class CheckoutReadYourWritesTest(TestCase):
+    @override_settings(DATABASE_REPLICAS={
+        "ALIASES": ["replica"], "MODELS": ["orders.order"], "PIN_SECONDS": 60,
+    })
+    def test_checkout_pins_customer_reads_to_primary(self):
+        cart = seed_checkout_cart(1, tag="pin")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderService.checkout(cart)
+
+        with read_your_writes(f"customer:{cart.customer_id}"), \
+                mock.patch.object(connection, "in_atomic_block", False):
+            self.assertEqual(ReplicaRouter().db_for_read(Order), "default")
+
+
+class CheckoutQueueTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Sepatu", slug="sepatu")
+        self.product = Product.objects.create(
+            name="Sepatu Lari X",
+            sku="SKU-001",
+            price=Decimal("500000"),
+            category=self.category
+        )
+        Inventory.objects.create(product=self.product, quantity_available=3)
+        self.queue = CheckoutQueue(batch_size=3, max_wait=0.01, autostart=False)
+
+    def cart_with(self, email, quantity):
+        customer = Customer.objects.create(email=email, name=email)
+        cart = Cart.objects.create(customer=customer)
+        if quantity:
+            CartItem.objects.create(cart=cart, product=self.product, quantity=quantity)
+        return cart
+
+    def test_batch_isolates_failing_carts(self):
+        ok = self.queue.submit(self.cart_with("a@test.com", 2))
+        empty = self.queue.submit(self.cart_with("b@test.com", 0))
+        short = self.queue.submit(self.cart_with("c@test.com", 2))
+
+        batch = self.queue.next_batch(block=False)
+        self.assertEqual(len(batch), 3)
+        self.queue.process(batch)
+
+        self.assertIsInstance(ok.result(), Order)
+        self.assertIsInstance(empty.exception(), EmptyCartError)
+        self.assertIsInstance(short.exception(), InsufficientStockError)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(
+            Inventory.objects.get(product=self.product).quantity_available, 1
+        )
+
+    def test_batch_is_committed_once(self):
+        self.queue.submit(self.cart_with("a@test.com", 1))
+        self.queue.submit(self.cart_with("b@test.com", 1))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.queue.process(self.queue.next_batch(block=False))
+
+        savepoints = [
+            query for query in ctx.captured_queries
+            if query["sql"].startswith("SAVEPOINT")
+        ]
+        # one savepoint for the batch (TestCase already holds the
+        # transaction) plus one per cart
+        self.assertEqual(len(savepoints), 3)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_timed_out_request_is_dropped(self):
+        self.queue.timeout = 0.01
+        cart = self.cart_with("a@test.com", 1)
+
+        with self.assertRaises(CheckoutUnavailableError):
+            self.queue.checkout(cart)
+        self.queue.process(self.queue.next_batch(block=False))
+
+        self.assertEqual(Order.objects.count(), 0)
+        cart.refresh_from_db()
+        self.assertEqual(cart.status, Cart.ACTIVE)
+
+    def start_batch_late(self, result):
+        """
+        Stand-in worker: picks the request up within the caller's timeout
+        and finishes its batch only after that timeout has passed.
+        """
+        def work():
+            _, future = self.queue.next_batch()[0]
+            future.set_running_or_notify_cancel()
+            time.sleep(0.4)
+            future.set_result(result)
+
+        worker = threading.Thread(target=work)
+        worker.start()
+        self.addCleanup(worker.join)
+
+    def test_request_in_a_started_batch_waits_for_it(self):
+        self.queue.timeout = 0.2
+        order = Order(id=1)
+        self.start_batch_late(order)
+
+        self.assertIs(self.queue.checkout(self.cart_with("a@test.com", 1)), order)
+
+    async def test_async_request_in_a_started_batch_waits_for_it(self):
+        self.queue.timeout = 0.2
+        order = Order(id=1)
+        self.start_batch_late(order)
+        cart = await sync_to_async(self.cart_with)("a@test.com", 1)
+
+        self.assertIs(await self.queue.acheckout(cart), order)
+
+    def test_dead_worker_is_replaced(self):
+        self.queue._worker = mock.Mock(is_alive=mock.Mock(return_value=False))
+
+        with mock.patch("orders.checkout_queue.threading.Thread") as thread:
+            self.queue._ensure_worker()
+
+        thread.return_value.start.assert_called_once_with()
+        self.assertIs(self.queue._worker, thread.return_value)
+
+
+class OrderHistoryAPITest(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            email="hen@test.com",
+            name="Hen"
+        )
+        other = Customer.objects.create(email="other@test.com", name="Other")
+        Order.objects.create(customer=other, total_amount=Decimal("1"))
+
+        created_at = timezone.now()
+        self.orders = []
+        for i in range(5):
+            order = Order.objects.create(
+                customer=self.customer,
+                total_amount=Decimal("1000")
+            )
+            OrderItem.objects.create(
+                order=order,
+                product_name=f"Produk {i}",
+                product_sku=f"SKU-{i}",
+                product_price=Decimal("500"),
+                quantity=2
+            )
+            # two orders share a timestamp so the id tie-break is exercised
+            Order.objects.filter(id=order.id).update(
+                created_at=created_at - timedelta(minutes=i // 2)
+            )
+            self.orders.append(order)
+
+        call_command("backfill_order_snapshots", stdout=StringIO())
+
+    def get(self, **params):
+        request = APIRequestFactory().get("/api/orders/history/", params)
+        force_authenticate(
+            request, user=SimpleNamespace(customer=self.customer, is_authenticated=True)
+        )
+        response = OrderHistoryAPIView.as_view()(request)
+        if hasattr(response, "render"):
+            response.render()
+        return response
+
+    def test_pages_walk_history_newest_first(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {"page_size": 2}
+            if cursor:
+                params["cursor"] = cursor
+            with self.assertNumQueries(1):
+                response = self.get(**params)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(order["id"] for order in json.loads(response.content)["results"])
+            cursor = json.loads(response.content)["next_cursor"]
+            if not cursor:
+                break
+
+        expected = [
+            order.id for order in
+            Order.objects.filter(customer=self.customer).order_by("-created_at", "-id")
+        ]
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 5)
+
+    def test_items_are_included(self):
+        response = self.get(page_size=1)
+
+        items = json.loads(response.content)["results"][0]["items"]
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0]["quantity"], 2)
+
+    def test_snapshot_matches_order_serializer(self):
+        response = self.get(page_size=5)
+
+        for data in json.loads(response.content)["results"]:
+            order = Order.objects.get(id=data["id"])
+            self.assertEqual(dict(data), dict(OrderSerializer(order).data))
+            self.assertEqual(order.item_count, 2)
+
+    def test_order_without_snapshot_falls_back_to_items(self):
+        Order.objects.filter(customer=self.customer).update(items_snapshot=None)
+
+        response = self.get(page_size=1)
+
+        self.assertEqual(json.loads(response.content)["results"][0]["items"][0]["quantity"], 2)
+
+    def test_invalid_cursor_returns_400(self):
+        response = self.get(cursor="not-a-cursor")
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_fast_and_serializer_paths_render_the_same_bytes(self):
+        order = self.orders[0]
+        order.items.update(product_name="Kopi \u2028 «Gayo» \u00e9\U0001f600")
+        Order.objects.update(items_snapshot=None)
+        call_command("backfill_order_snapshots", stdout=StringIO())
+        Order.objects.filter(id=self.orders[1].id).update(items_snapshot=None)
+
+        with self.settings(FAST_SERIALIZATION=True):
+            fast = self.get(page_size=3)
+            fast_next = self.get(page_size=3, cursor=json.loads(fast.content)["next_cursor"])
+        with self.settings(FAST_SERIALIZATION=False):
+            slow = self.get(page_size=3)
+            slow_next = self.get(page_size=3, cursor=json.loads(slow.content)["next_cursor"])
+
+        self.assertEqual(fast["Content-Type"], slow["Content-Type"])
+        self.assertEqual(fast.content, slow.content)
+        self.assertEqual(fast_next.content, slow_next.content)
+        self.assertIn(b"\\u2028", fast.content)
+
+
+class FastOrderSerializationTest(TestCase):
+    def setUp(self):
+        customer = Customer.objects.create(email="ina@test.com", name="Ina")
+        for amount in (Decimal("1000"), Decimal("0.005"), Decimal("12345678.99")):
+            order = Order.objects.create(customer=customer, total_amount=amount)
+            for i in range(2):
+                OrderItem.objects.create(
+                    order=order,
+                    product_name=f"Barang \"{i}\" \\ \u00fc\u2029\t",
+                    product_sku=f"SKU-{order.id}-{i}",
+                    product_price=Decimal("19.999"),
+                    quantity=i + 1
+                )
+        Order.objects.create(customer=customer, total_amount=Decimal("5"))
+        self.orders = Order.objects.order_by("id")
+
+    def test_matches_order_serializer_bytes(self):
+        expected = JSONRenderer().render(OrderSerializer(self.orders, many=True).data)
+
+        with self.assertNumQueries(2):
+            data = fast_order_data(self.orders.values(*ORDER_FIELDS))
+
+        self.assertEqual(render_json(data), expected)
+
+    def test_snapshot_path_matches_with_and_without_snapshots(self):
+        call_command("backfill_order_snapshots", stdout=StringIO())
+        Order.objects.filter(id=self.orders[0].id).update(items_snapshot=None)
+        expected = JSONRenderer().render(
+            OrderSnapshotSerializer(self.orders, many=True).data
+        )
+
+        data = fast_order_snapshot_data(self.orders.values(*SNAPSHOT_FIELDS))
+
+        self.assertEqual(render_json(data), expected)
+
+    def test_stdlib_fallback_renders_the_same_bytes(self):
+        expected = JSONRenderer().render(OrderSerializer(self.orders, many=True).data)
+        data = fast_order_data(self.orders.values(*ORDER_FIELDS))
+
+        with mock.patch("core.serialization.orjson", None):
+            self.assertEqual(render_json(data), expected)
+
+
+@override_settings(PAYMENT_WEBHOOK_INBOX={"SECRET": "s3cret"})
+class PaymentWebhookInboxTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = PaymentWebhookInboxAPIView.as_view()
+        self.inbox = PaymentWebhookInbox()
+        self.order = OrderService.checkout(seed_checkout_cart(1, tag="webhook"))
+
+    def deliver(self, event_id, order_id, event_type="payment.succeeded",
+                secret=b"s3cret", **headers):
+        body = json.dumps(
+            {"id": event_id, "type": event_type, "order_id": order_id}
+        )
+        if secret is not None:
+            headers.setdefault(
+                "HTTP_X_WEBHOOK_SIGNATURE",
+                hmac.new(secret, body.encode(), hashlib.sha256).hexdigest()
+            )
+        request = self.factory.post(
+            "/webhooks/payment/inbox/",
+            body,
+            content_type="application/json",
+            **headers
+        )
+        return self.view(request)
+
+    def test_duplicate_deliveries_are_stored_once(self):
+        for _ in range(3):
+            response = self.deliver("evt_1", self.order.id)
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(PaymentWebhookEvent.objects.count(), 1)
+        # acknowledged only: the order is untouched until a worker runs
+        self.assertEqual(Order.objects.get(id=self.order.id).status, Order.PENDING)
+
+    def test_worker_marks_orders_paid_and_records_outcomes(self):
+        other = OrderService.checkout(seed_checkout_cart(1, tag="webhook-2"))
+        OrderService.cancel(other.id)
+        self.deliver("evt_1", self.order.id)
+        self.deliver("evt_2", self.order.id)
+        self.deliver("evt_3", other.id)
+        self.deliver("evt_4", self.order.id, event_type="payment.pending")
+
+        self.assertEqual(self.inbox.stats()["queue_depth"], 4)
+        self.assertEqual(self.inbox.run_once(batch_size=10), 4)
+        self.assertEqual(self.inbox.run_once(batch_size=10), 0)
+
+        self.assertEqual(Order.objects.get(id=self.order.id).status, Order.PAID)
+        statuses = dict(
+            PaymentWebhookEvent.objects.values_list("provider_event_id", "status")
+        )
+        self.assertEqual(statuses, {
+            "evt_1": PaymentWebhookEvent.PROCESSED,
+            "evt_2": PaymentWebhookEvent.PROCESSED,
+            "evt_3": PaymentWebhookEvent.FAILED,
+            "evt_4": PaymentWebhookEvent.IGNORED,
+        })
+
+        stats = self.inbox.stats()
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertEqual(stats["failed"], 1)
+        self.assertIsNotNone(stats["processing_lag_s"]["max"])
+
+    def test_expired_claims_are_picked_up_again(self):
+        self.deliver("evt_1", self.order.id)
+        self.assertEqual(len(self.inbox.claim()), 1)
+        self.assertEqual(self.inbox.claim(), [])
+
+        later = timezone.now() + timedelta(minutes=5)
+        reclaimed = self.inbox.claim(now=later)
+
+        self.assertEqual(len(reclaimed), 1)
+        self.assertEqual(reclaimed[0].attempts, 2)
+
+    def test_unsigned_or_badly_signed_requests_are_rejected(self):
+        responses = [
+            self.deliver("evt_1", self.order.id, secret=None),
+            self.deliver("evt_2", self.order.id, secret=b"wrong"),
+            self.deliver(
+                "evt_3", self.order.id, HTTP_X_WEBHOOK_SIGNATURE="not-hex"
+            ),
+        ]
+
+        self.assertEqual([r.status_code for r in responses], [403, 403, 403])
+        self.assertEqual(PaymentWebhookEvent.objects.count(), 0)
+        self.assertEqual(self.inbox.run_once(batch_size=10), 0)
+        self.assertEqual(Order.objects.get(id=self.order.id).status, Order.PENDING)
+
+    @mock.patch("orders.management.commands.process_payment_webhooks.close_old_connections")
+    @mock.patch("orders.management.commands.process_payment_webhooks.time.sleep")
+    def test_worker_survives_a_failing_batch(self, sleep, _):
+        run_once = mock.Mock(
+            side_effect=[OperationalError("database is locked"), 3, 0]
+        )
+
+        with mock.patch.object(payment_webhook_inbox, "run_once", run_once), \
+                self.assertLogs(
+                    "orders.management.commands.process_payment_webhooks", "ERROR"
+                ):
+            handled = _work(batch_size=10, poll_interval=0.5, drain=True)
+
+        self.assertEqual(handled, 3)
+        self.assertEqual(run_once.call_count, 3)
+        sleep.assert_called_once_with(0.5)
+
+    @override_settings(PAYMENT_WEBHOOK_INBOX={"SECRET": None})
+    def test_endpoint_is_closed_without_a_secret(self):
+        response = self.deliver("evt_1", self.order.id, secret=None)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(PaymentWebhookEvent.objects.count(), 0)
+        self.assertEqual(Order.objects.get(id=self.order.id).status, Order.PENDING)
+
+
+class CheckoutIdempotencyTest(TestCase):
+    def setUp(self):
+        self.cart = seed_checkout_cart(2, tag="idempotency")
+        self.customer = self.cart.customer
+
+    def post(self, key=None):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key is not None else {}
+        request = APIRequestFactory().post("/api/orders/checkout/", **headers)
+        force_authenticate(
+            request, user=SimpleNamespace(customer=self.customer, is_authenticated=True)
+        )
+        return CheckoutAPIView.as_view()(request)
+
+    def test_retry_replays_stored_response(self):
+        first = self.post("key-1")
+        stock = list(Inventory.objects.order_by("id").values_list(
+            "quantity_available", flat=True
+        ))
+
+        with CaptureQueriesContext(connection) as ctx:
+            retry = self.post("key-1")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.data["id"], first.data["id"])
+        self.assertEqual(Order.objects.filter(customer=self.customer).count(), 1)
+        self.assertFalse(any(
+            "inventory" in query["sql"] for query in ctx.captured_queries
+        ))
+        self.assertEqual(stock, list(Inventory.objects.order_by("id").values_list(
+            "quantity_available", flat=True
+        )))
+
+    def test_without_key_a_retry_fails_on_the_checked_out_cart(self):
+        self.assertEqual(self.post().status_code, 201)
+        self.assertEqual(self.post().status_code, 404)
+
+    def test_failed_request_releases_the_key(self):
+        self.cart.status = Cart.CHECKED_OUT
+        self.cart.save()
+
+        self.assertEqual(self.post("key-1").status_code, 404)
+        self.assertFalse(CheckoutIdempotencyKey.objects.exists())
+
+    def test_concurrent_request_waits_for_the_first_result(self):
+        store = CheckoutIdempotency(wait=5, poll_interval=0)
+        record, stored = store.begin(self.customer, "key-1")
+        self.assertIsNone(stored)
+
+        def first_request_finishes(_):
+            store.complete(record, 201, {"id": 42})
+
+        with mock.patch("orders.idempotency.time.sleep", first_request_finishes):
+            _, stored = store.begin(self.customer, "key-1")
+
+        self.assertEqual(stored.status_code, 201)
+        self.assertEqual(stored.data, {"id": 42})
+
+    def test_request_in_flight_too_long_is_rejected(self):
+        store = CheckoutIdempotency(wait=0)
+        store.begin(self.customer, "key-1")
+
+        with self.assertRaises(IdempotencyKeyInUseError):
+            store.begin(self.customer, "key-1")
+
+    def test_expired_keys_are_claimed_again(self):
+        store = CheckoutIdempotency(ttl=0, in_flight_timeout=0)
+        record, _ = store.begin(self.customer, "key-1")
+        store.complete(record, 201, {"id": 1})
+
+        record, stored = store.begin(self.customer, "key-1")
+
+        self.assertIsNone(stored)
+        self.assertIsNotNone(record)
+        self.assertEqual(store.purge_expired(), 1)
+
+
+async def _run_inline(fn, *args):
+    # the test database is only visible to the test's own connection
+    return await sync_to_async(fn)(*args)
+
+
+@mock.patch("orders.async_views.run_in_checkout_pool", _run_inline)
+class AsyncOrderViewsTest(TestCase):
+    def setUp(self):
+        self.cart = seed_checkout_cart(2, tag="async")
+        self.customer = self.cart.customer
+        self.factory = AsyncRequestFactory()
+
+    def request(self, method, path, customer=None, **extra):
+        request = getattr(self.factory, method)(path, **extra)
+        force_authenticate(
+            request,
+            user=SimpleNamespace(customer=customer or self.customer, is_authenticated=True)
+        )
+        return request
+
+    def sync_history(self):
+        request = APIRequestFactory().get("/api/orders/history/")
+        force_authenticate(
+            request, user=SimpleNamespace(customer=self.customer, is_authenticated=True)
+        )
+        response = OrderHistoryAPIView.as_view()(request)
+        if hasattr(response, "render"):
+            response.render()
+        return json.loads(response.content)
+
+    async def test_checkout_and_replay(self):
+        view = AsyncCheckoutView.as_view()
+        first = await view(self.request(
+            "post", "/api/orders/async/checkout/", headers={"Idempotency-Key": "k1"}
+        ))
+        retry = await view(self.request(
+            "post", "/api/orders/async/checkout/", headers={"Idempotency-Key": "k1"}
+        ))
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(json.loads(retry.content), json.loads(first.content))
+        self.assertEqual(
+            await Order.objects.filter(customer=self.customer).acount(), 1
+        )
+
+        again = await view(self.request("post", "/api/orders/async/checkout/"))
+        self.assertEqual(again.status_code, 404)
+
+    async def test_domain_errors_map_to_status_codes(self):
+        await Inventory.objects.filter(
+            product__sku__startswith="BENCH-async-"
+        ).aupdate(quantity_available=0)
+
+        response = await AsyncCheckoutView.as_view()(
+            self.request("post", "/api/orders/async/checkout/")
+        )
+
+        self.assertEqual(response.status_code, 409)
+
+    async def test_history_matches_sync_view(self):
+        for i in range(3):
+            await sync_to_async(OrderService.checkout)(
+                await sync_to_async(seed_checkout_cart)(1, tag=f"async-h{i}")
+            )
+        await sync_to_async(OrderService.checkout)(self.cart)
+
+        response = await AsyncOrderHistoryView.as_view()(
+            self.request("get", "/api/orders/async/history/")
+        )
+
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.content)
+        expected = await sync_to_async(self.sync_history)()
+        self.assertEqual(body, expected)
+        self.assertEqual(len(body["results"]), 1)
+
+    async def test_detail_is_scoped_to_customer(self):
+        order = await sync_to_async(OrderService.checkout)(self.cart)
+        other = await Customer.objects.acreate(email="x@test.com", name="X")
+        view = AsyncOrderDetailView.as_view()
+
+        own = await view(self.request("get", "/"), pk=order.id)
+        foreign = await view(self.request("get", "/", customer=other), pk=order.id)
+
+        self.assertEqual(own.status_code, 200)
+        self.assertEqual(json.loads(own.content)["id"], order.id)
+        self.assertEqual(foreign.status_code, 404)
+
+    async def test_anonymous_request_is_rejected(self):
+        request = self.factory.get("/api/orders/async/history/")
+
+        response = await AsyncOrderHistoryView.as_view()(request)
+
+        self.assertEqual(response.status_code, 401)
+
+
+class AsyncViewAuthTest(TestCase):
+    """
+    The async twins authenticate and CSRF-check like the sync views.
+    """
+
+    def setUp(self):
+        self.customer = Customer.objects.create(email="auth@test.com", name="Auth")
+        self.user = User.objects.create_user("auth", password="pw")
+        # users carry no customer relation in this tree; give them one
+        patcher = mock.patch.object(
+            User, "customer", property(lambda user: self.customer), create=True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def basic(self, password):
+        token = base64.b64encode(f"auth:{password}".encode()).decode()
+        return {"HTTP_AUTHORIZATION": f"Basic {token}"}
+
+    def test_basic_auth_matches_sync_views(self):
+        client = Client(enforce_csrf_checks=True)
+        for password, expected in (("pw", 200), ("wrong", 403)):
+            sync = client.get("/api/orders/history/", **self.basic(password))
+            async_ = client.get("/api/orders/async/history/", **self.basic(password))
+            self.assertEqual(sync.status_code, expected)
+            self.assertEqual(async_.status_code, expected)
+            self.assertEqual(async_.json(), sync.json())
+
+    def test_basic_auth_post_needs_no_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+
+        sync = client.post("/api/orders/checkout/", **self.basic("pw"))
+        async_ = client.post("/api/orders/async/checkout/", **self.basic("pw"))
+
+        # no active cart: the request got past authentication and CSRF
+        self.assertEqual(sync.status_code, 404)
+        self.assertEqual(async_.status_code, 404)
+
+    def test_session_post_without_csrf_token_is_rejected(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+
+        sync = client.post("/api/orders/checkout/")
+        async_ = client.post("/api/orders/async/checkout/")
+
+        self.assertEqual(sync.status_code, 403)
+        self.assertEqual(async_.status_code, 403)
+        self.assertEqual(async_.json(), sync.json())
+
+
+class OrderArchiveTest(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(email="jo@test.com", name="Jo")
+        self.archiver = OrderArchiver(after_days=30, batch_size=2)
+
+        now = timezone.now()
+        self.old = []
+        statuses = [Order.COMPLETED, Order.CANCELLED, Order.PAID, Order.COMPLETED]
+        for i, order_status in enumerate(statuses):
+            self.old.append(self.create_order(
+                order_status, now - timedelta(days=60, minutes=i)
+            ))
+        self.recent = self.create_order(Order.COMPLETED, now)
+        call_command("backfill_order_snapshots", stdout=StringIO())
+        # one finished order predates the snapshot
+        Order.objects.filter(id=self.old[1].id).update(items_snapshot=None)
+        self.old_created_at = [
+            Order.objects.get(id=order.id).created_at for order in self.old
+        ]
+
+    def create_order(self, order_status, created_at):
+        order = Order.objects.create(
+            customer=self.customer,
+            status=order_status,
+            total_amount=Decimal("1000")
+        )
+        for i in range(2):
+            OrderItem.objects.create(
+                order=order,
+                product_name=f"Produk {order.id}-{i}",
+                product_sku=f"SKU-{order.id}-{i}",
+                product_price=Decimal("250"),
+                quantity=2
+            )
+        Order.objects.filter(id=order.id).update(created_at=created_at)
+        return order
+
+    def history(self, view=OrderHistoryAPIView, kwargs=None, **params):
+        request = APIRequestFactory().get("/api/orders/history/", params)
+        force_authenticate(
+            request, user=SimpleNamespace(customer=self.customer, is_authenticated=True)
+        )
+        response = view.as_view()(request, **(kwargs or {}))
+        if hasattr(response, "render"):
+            response.render()
+        return response
+
+    def walk_history(self, queries=None):
+        ids = []
+        bodies = []
+        cursor = None
+        while True:
+            params = {"page_size": 2}
+            if cursor:
+                params["cursor"] = cursor
+            if queries is None:
+                response = self.history(**params)
+            else:
+                with self.assertNumQueries(queries):
+                    response = self.history(**params)
+            bodies.append(response.content)
+            body = json.loads(response.content)
+            ids.extend(order["id"] for order in body["results"])
+            cursor = body["next_cursor"]
+            if not cursor:
+                return ids, bodies
+
+    def test_moves_only_old_finished_orders(self):
+        archived = self.archiver.archive()
+
+        self.assertEqual(archived, 3)
+        moved = [self.old[0].id, self.old[1].id, self.old[3].id]
+        self.assertEqual(
+            sorted(ArchivedOrder.objects.values_list("id", flat=True)), moved
+        )
+        self.assertFalse(Order.objects.filter(id__in=moved).exists())
+        self.assertFalse(OrderItem.objects.filter(order_id__in=moved).exists())
+        self.assertEqual(
+            ArchivedOrderItem.objects.filter(order_id__in=moved).count(), 6
+        )
+        self.assertEqual(
+            set(Order.objects.values_list("id", flat=True)),
+            {self.old[2].id, self.recent.id}
+        )
+
+        snapshotless = ArchivedOrder.objects.get(id=self.old[1].id)
+        self.assertEqual(snapshotless.item_count, 4)
+        self.assertEqual(len(snapshotless.items_snapshot), 2)
+        self.assertEqual(snapshotless.created_at, self.old_created_at[1])
+
+    def test_batches_resume_where_the_last_run_stopped(self):
+        self.assertEqual(self.archiver.archive(max_batches=1), 2)
+        self.assertEqual(self.archiver.stats()["eligible_orders"], 1)
+
+        self.assertEqual(self.archiver.archive(), 1)
+        self.assertEqual(self.archiver.archive(), 0)
+        self.assertEqual(self.archiver.stats(), {
+            "hot_orders": 2, "archived_orders": 3, "eligible_orders": 0,
+        })
+
+    def test_history_merges_hot_and_archived_orders(self):
+        before_ids, before_bodies = self.walk_history()
+
+        self.archiver.archive()
+        # archived orders always carry their snapshot: one query per page
+        after_ids, after_bodies = self.walk_history(queries=1)
+
+        self.assertEqual(len(after_ids), 5)
+        self.assertEqual(after_ids, before_ids)
+        self.assertEqual(after_bodies, before_bodies)
+
+        with self.settings(FAST_SERIALIZATION=False):
+            _, slow_bodies = self.walk_history()
+        self.assertEqual(slow_bodies, after_bodies)
+
+    def test_detail_reads_archived_order(self):
+        before = self.history(
+            view=OrderDetailAPIView, kwargs={"pk": self.old[1].id}
+        ).content
+
+        self.archiver.archive()
+        after = self.history(view=OrderDetailAPIView, kwargs={"pk": self.old[1].id})
+
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(after.content, before)
+
+    def test_command_overrides_age(self):
+        out = StringIO()
+
+        call_command("archive_orders", "--older-than-days", "90", stdout=out)
+        self.assertIn("Archived 0 order(s)", out.getvalue())
+
+        call_command("archive_orders", "--older-than-days", "30", stdout=out)
+        self.assertEqual(ArchivedOrder.objects.count(), 3)
+
+    async def test_async_history_merges_archived_orders(self):
+        expected = json.loads((await sync_to_async(self.history)()).content)
+
+        await sync_to_async(self.archiver.archive)()
+        request = AsyncRequestFactory().get("/api/orders/async/history/")
+        force_authenticate(
+            request, user=SimpleNamespace(customer=self.customer, is_authenticated=True)
+        )
+        response = await AsyncOrderHistoryView.as_view()(request)
+
+        self.assertEqual(json.loads(response.content), expected)
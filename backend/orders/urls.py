@@ -1,6 +1,21 @@
 from django.urls import path
-from orders.views import CheckoutAPIView
+from orders.async_views import (
+    AsyncCheckoutView,
+    AsyncOrderDetailView,
+    AsyncOrderHistoryView,
+)
+from orders.views import (
+    CheckoutAPIView,
+    OrderDetailAPIView,
+    OrderHistoryAPIView,
+)
 
 urlpatterns = [
     path("checkout/", CheckoutAPIView.as_view(), name="checkout"),
+    path("history/", OrderHistoryAPIView.as_view(), name="order-history"),
+    path("<int:pk>/", OrderDetailAPIView.as_view(), name="order-detail"),
+    # async twins for ASGI deployments
+    path("async/checkout/", AsyncCheckoutView.as_view(), name="async-checkout"),
+    path("async/history/", AsyncOrderHistoryView.as_view(), name="async-order-history"),
+    path("async/<int:pk>/", AsyncOrderDetailView.as_view(), name="async-order-detail"),
 ]
\ No newline at end of file
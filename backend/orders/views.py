@@ -1,10 +1,25 @@
+import json
+
+from django.conf import settings
+from django.http import HttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
 from orders.services import OrderService
-from orders.serializers import OrderSerializer
+from orders.checkout_queue import checkout_queue
+from orders.idempotency import checkout_idempotency
+from orders.serializers import (
+    SNAPSHOT_FIELDS,
+    OrderSnapshotSerializer,
+    fast_order_snapshot_data,
+)
+from orders.models import ArchivedOrder, Order
+from orders.pagination import InvalidCursor, keyset_union_page
+from orders.webhooks import payment_webhook_inbox
 from cart.models import Cart
+from core.db_routers import read_your_writes
+from core.serialization import render_json
 
 
 class CheckoutAPIView(APIView):
@@ -13,6 +28,39 @@ class CheckoutAPIView(APIView):
         checkout active cart for current customer
         """
         customer = request.user.customer
+        key = request.headers.get("Idempotency-Key")
+        if key is None:
+            return self.checkout(customer)
+
+        if not 0 < len(key) <= 255:
+            return Response(
+                {"error": "Idempotency-Key must be 1 to 255 characters"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # a replay is answered from the stored response without touching
+        # the cart or inventory
+        record, stored = checkout_idempotency.begin(customer, key)
+        if stored is not None:
+            return Response(
+                stored.data,
+                status=stored.status_code,
+                headers={"Idempotent-Replayed": "true"}
+            )
+
+        try:
+            response = self.checkout(customer)
+        except BaseException:
+            checkout_idempotency.abort(record)
+            raise
+
+        if response.status_code == status.HTTP_201_CREATED:
+            checkout_idempotency.complete(record, response.status_code, response.data)
+        else:
+            checkout_idempotency.abort(record)
+        return response
+
+    def checkout(self, customer):
         cart = Cart.objects.filter(
             customer=customer,
             status=Cart.ACTIVE
@@ -24,7 +72,118 @@ class CheckoutAPIView(APIView):
                 status = status.HTTP_404_NOT_FOUND
             )
         
-        order = OrderService.checkout(cart)
+        if settings.CHECKOUT_GROUP_COMMIT:
+            order = checkout_queue.checkout(cart)
+        else:
+            order = OrderService.checkout(cart)
         
-        serializer = OrderSerializer(order)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        serializer = OrderSnapshotSerializer(order)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class OrderHistoryAPIView(APIView):
+    MAX_PAGE_SIZE = 100
+
+    def get(self, request):
+        """
+        list current customer's orders, newest first, by cursor
+        """
+        customer = request.user.customer
+        try:
+            page_size = int(request.query_params.get("page_size", 20))
+        except ValueError:
+            page_size = 20
+        page_size = min(max(page_size, 1), self.MAX_PAGE_SIZE)
+
+        # hot and archived orders, merged in one query
+        orders = (
+            Order.objects.filter(customer=customer),
+            ArchivedOrder.objects.filter(customer=customer),
+        )
+        cursor = request.query_params.get("cursor")
+        try:
+            with read_your_writes(f"customer:{customer.id}"):
+                page, next_cursor = keyset_union_page(
+                    orders, SNAPSHOT_FIELDS, cursor, page_size
+                )
+                if settings.FAST_SERIALIZATION:
+                    results = fast_order_snapshot_data(page)
+                else:
+                    results = OrderSnapshotSerializer(
+                        [Order(**row) for row in page], many=True
+                    ).data
+        except InvalidCursor:
+            return Response(
+                {"error": "Invalid cursor"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        payload = {"results": results, "next_cursor": next_cursor}
+        if settings.FAST_SERIALIZATION:
+            return HttpResponse(render_json(payload), content_type="application/json")
+        return Response(payload)
+
+
+
+class OrderDetailAPIView(APIView):
+    def get(self, request, pk):
+        """
+        retrieve one of current customer's orders
+        """
+        customer = request.user.customer
+        with read_your_writes(f"customer:{customer.id}"):
+            order = (
+                Order.objects.filter(customer=customer, pk=pk).first()
+                or ArchivedOrder.objects.filter(customer=customer, pk=pk).first()
+            )
+
+            if not order:
+                return Response(
+                    {"error": "Order not found"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            return Response(OrderSnapshotSerializer(order).data)
+
+
+class PaymentWebhookInboxAPIView(APIView):
+    # providers authenticate with a body signature, not a session
+    authentication_classes = []
+    permission_classes = []
+
+    def post(self, request):
+        """
+        store a payment provider event and acknowledge it right away;
+        workers (manage.py process_payment_webhooks) act on it later
+        """
+        # fail closed: without a secret nobody can prove they are the
+        # provider, and a recorded event marks its order as paid
+        secret = getattr(settings, "PAYMENT_WEBHOOK_INBOX", {}).get("SECRET")
+        if not secret:
+            return Response(
+                {"error": "Webhook secret not configured"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        if not payment_webhook_inbox.verify_signature(
+            request.body, request.headers.get("X-Webhook-Signature"), secret
+        ):
+            return Response(
+                {"error": "Invalid signature"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            payload = json.loads(request.body)
+            event_id = str(payload["id"])
+            event_type = str(payload["type"])
+            order_id = payload.get("order_id")
+            if order_id is not None:
+                order_id = int(order_id)
+        except (ValueError, TypeError, KeyError):
+            return Response(
+                {"error": "Malformed event"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        payment_webhook_inbox.record(event_id, event_type, order_id, payload)
+        return Response({"received": True})
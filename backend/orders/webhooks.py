@@ -0,0 +1,172 @@
+import hashlib
+import hmac
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from orders.models import PaymentWebhookEvent
+from orders.services import OrderService
+
+
+class PaymentWebhookInbox:
+    """
+    Append-only inbox between the payment provider and OrderService.
+
+    `record` is all the webhook request does: one INSERT that silently
+    drops redeliveries of a known provider event id. Workers `claim`
+    batches of open events (re-claiming ones whose lease ran out, e.g.
+    after a crash) and `process` them with one batch transition.
+    """
+
+    def __init__(self, paid_events=("payment.succeeded",), lease_seconds=60):
+        self.paid_events = set(paid_events)
+        self.lease = timedelta(seconds=lease_seconds)
+
+    @staticmethod
+    def verify_signature(body, signature, secret):
+        expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        # bytes: compare_digest rejects non-ASCII str input with TypeError
+        return hmac.compare_digest(expected.encode(), (signature or "").encode())
+
+    def record(self, provider_event_id, event_type, order_id, payload):
+        PaymentWebhookEvent.objects.bulk_create(
+            [
+                PaymentWebhookEvent(
+                    provider_event_id=provider_event_id,
+                    event_type=event_type,
+                    order_id=order_id,
+                    payload=payload
+                )
+            ],
+            ignore_conflicts=True
+        )
+
+    def claim(self, batch_size=100, now=None):
+        """
+        Move up to `batch_size` of the oldest open events to PROCESSING
+        and return them. Rows locked by another worker are skipped where
+        the database supports it.
+        """
+        now = now or timezone.now()
+        claimable = Q(status=PaymentWebhookEvent.RECEIVED) | Q(
+            status=PaymentWebhookEvent.PROCESSING,
+            claimed_at__lt=now - self.lease
+        )
+
+        with transaction.atomic():
+            ids = list(
+                PaymentWebhookEvent.objects.select_for_update(skip_locked=True)
+                .filter(claimable)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                return []
+
+            # re-check the condition: without row locks (sqlite) another
+            # worker may have claimed some of these in the meantime
+            claimed = PaymentWebhookEvent.objects.filter(claimable, id__in=ids)
+            claimed.update(
+                status=PaymentWebhookEvent.PROCESSING,
+                claimed_at=now,
+                attempts=F("attempts") + 1
+            )
+            return list(
+                PaymentWebhookEvent.objects.filter(
+                    id__in=ids,
+                    status=PaymentWebhookEvent.PROCESSING,
+                    claimed_at=now
+                ).order_by("id")
+            )
+
+    def process(self, events):
+        """
+        Mark the orders of all payment events as paid in one batch and
+        record each event's outcome. Orders already paid count as success,
+        so redeliveries with a new event id stay harmless.
+        """
+        paid = {
+            event.id: event.order_id for event in events
+            if event.event_type in self.paid_events and event.order_id
+        }
+        results = OrderService.mark_many_as_paid(paid.values())
+
+        now = timezone.now()
+        for event in events:
+            event.processed_at = now
+            if event.id not in paid:
+                event.status = PaymentWebhookEvent.IGNORED
+                continue
+
+            error = results[event.order_id].error
+            if error is None:
+                event.status = PaymentWebhookEvent.PROCESSED
+            else:
+                event.status = PaymentWebhookEvent.FAILED
+                event.error = str(error)
+
+        PaymentWebhookEvent.objects.bulk_update(
+            events, ["status", "processed_at", "error"]
+        )
+        return len(events)
+
+    def run_once(self, batch_size=100):
+        """
+        Claim and process one batch; returns the number of events handled.
+        """
+        events = self.claim(batch_size)
+        if not events:
+            return 0
+        return self.process(events)
+
+    def stats(self, now=None, recent=100):
+        """
+        Queue depth and lag: how many events wait or are being worked on,
+        how old the oldest of them is, and how long the last `recent`
+        processed events took from receipt to completion.
+        """
+        now = now or timezone.now()
+        open_events = PaymentWebhookEvent.objects.filter(
+            status__in=[PaymentWebhookEvent.RECEIVED, PaymentWebhookEvent.PROCESSING]
+        )
+        depth = dict(
+            open_events.values("status")
+            .annotate(count=Count("id"))
+            .values_list("status", "count")
+        )
+        oldest = open_events.aggregate(oldest=Min("created_at"))["oldest"]
+
+        lags = sorted(
+            (processed_at - created_at).total_seconds()
+            for created_at, processed_at in PaymentWebhookEvent.objects.filter(
+                processed_at__isnull=False
+            ).order_by("-processed_at").values_list(
+                "created_at", "processed_at"
+            )[:recent]
+        )
+
+        return {
+            "queue_depth": depth.get(PaymentWebhookEvent.RECEIVED, 0),
+            "in_progress": depth.get(PaymentWebhookEvent.PROCESSING, 0),
+            "failed": PaymentWebhookEvent.objects.filter(
+                status=PaymentWebhookEvent.FAILED
+            ).count(),
+            "oldest_open_age_s": (
+                (now - oldest).total_seconds() if oldest else 0.0
+            ),
+            "processing_lag_s": {
+                "p50": lags[len(lags) // 2] if lags else None,
+                "max": lags[-1] if lags else None,
+            },
+        }
+
+
+_config = getattr(settings, "PAYMENT_WEBHOOK_INBOX", {})
+
+payment_webhook_inbox = PaymentWebhookInbox(
+    paid_events=_config.get("PAID_EVENTS", ("payment.succeeded",)),
+    lease_seconds=_config.get("LEASE_SECONDS", 60),
+)
@@ -0,0 +1,109 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from rest_framework.renderers import JSONRenderer
+
+from core.cache import LRUCache, is_shared_cache
+from core.serialization import render_json
+
+
+class CatalogResponseCache:
+    """
+    Two-tier cache of rendered catalog responses.
+
+    Entries are (etag, body) pairs under keys that embed a catalog-wide
+    version number. Saving or deleting a Product/Category bumps the
+    version, which orphans every entry at once. The version lives in the
+    shared tier (a Django cache alias) so all processes see the bump; the
+    bodies are also kept in a size-bounded in-process LRU tier.
+
+    A per-process alias (LocMemCache) would keep each worker's version,
+    and so its cached pages, to itself. With `require_shared` (the
+    default) such an alias disables both tiers: every request is built,
+    and only the ETag/304 handling remains.
+    """
+    VERSION_KEY = "catalog:version"
+
+    def __init__(self, alias="default", local_max_entries=1024, timeout=300,
+                 require_shared=True):
+        self.alias = alias
+        self.timeout = timeout
+        self.local = LRUCache(maxsize=local_max_entries)
+        self.require_shared = require_shared
+
+    @property
+    def enabled(self):
+        return not self.require_shared or is_shared_cache(self.alias)
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def version(self):
+        version = self.shared.get(self.VERSION_KEY)
+        if version is None:
+            self.shared.add(self.VERSION_KEY, 1, timeout=None)
+            version = self.shared.get(self.VERSION_KEY, 1)
+        return version
+
+    def invalidate(self):
+        try:
+            self.shared.incr(self.VERSION_KEY)
+        except ValueError:
+            self.shared.set(self.VERSION_KEY, 2, timeout=None)
+
+    def get_or_build(self, key, build):
+        """
+        Return (etag, body) for `key`, calling `build()` for the response
+        data and rendering it only on a miss in both tiers.
+        """
+        if not self.enabled:
+            return self.render(build())
+
+        versioned_key = f"catalog:v{self.version()}:{key}"
+
+        entry = self.local.get(versioned_key)
+        if entry is None:
+            entry = self.shared.get(versioned_key)
+            if entry is None:
+                entry = self.render(build())
+                self.shared.set(versioned_key, entry, timeout=self.timeout)
+            self.local.set(versioned_key, entry)
+        return entry
+
+    @staticmethod
+    def render(data):
+        if settings.FAST_SERIALIZATION:
+            body = render_json(data)
+        else:
+            body = JSONRenderer().render(data)
+        return '"%s"' % hashlib.sha1(body).hexdigest(), body
+
+    def respond(self, request, key, build):
+        """
+        Serve `key` from the cache, answering 304 when the client's
+        If-None-Match already matches.
+        """
+        etag, body = self.get_or_build(key, build)
+
+        if_none_match = request.headers.get("If-None-Match", "")
+        if if_none_match.strip() == "*" or etag in [
+            tag.strip() for tag in if_none_match.split(",")
+        ]:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        return response
+
+
+_config = getattr(settings, "CATALOG_CACHE", {})
+
+catalog_cache = CatalogResponseCache(
+    alias=_config.get("ALIAS", "default"),
+    local_max_entries=_config.get("LOCAL_MAX_ENTRIES", 1024),
+    timeout=_config.get("TIMEOUT", 300),
+    require_shared=_config.get("REQUIRE_SHARED", True),
+)
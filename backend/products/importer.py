@@ -0,0 +1,286 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.validators import validate_slug
+from django.core.exceptions import ValidationError
+from django.db import DataError, IntegrityError, transaction
+
+from cart.models import Cart
+from inventory.models import Inventory
+from products.cache import catalog_cache
+from products.models import Category, Product
+from products.snapshots import product_snapshots
+
+FIELDS = ("sku", "name", "price", "category_slug", "category_name", "quantity", "is_active")
+
+_MAX_SKU = Product._meta.get_field("sku").max_length
+_MAX_NAME = Product._meta.get_field("name").max_length
+_MAX_CATEGORY_NAME = Category._meta.get_field("name").max_length
+_MAX_SLUG = Category._meta.get_field("slug").max_length
+_PRICE = Product._meta.get_field("price")
+_MAX_PRICE = Decimal(10) ** (_PRICE.max_digits - _PRICE.decimal_places)
+_CENT = Decimal(1).scaleb(-_PRICE.decimal_places)
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_csv(stream):
+    """
+    Yield (line number, row dict) from a CSV stream with a header row.
+    """
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_ndjson(stream):
+    """
+    Yield (line number, row dict) from newline-delimited JSON objects;
+    lines that do not decode are yielded as the error they raise.
+    """
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, RowError(f"invalid JSON: {exc}")
+            continue
+        if not isinstance(row, dict):
+            row = RowError("expected a JSON object")
+        yield line_number, row
+
+
+def _text(row, field, max_length, required=True):
+    value = row.get(field)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f"{field} is required")
+    if len(value) > max_length:
+        raise RowError(f"{field} is longer than {max_length} characters")
+    return value
+
+
+def parse_row(row):
+    """
+    Validate one input row and return the normalized
+    (sku, name, price, category slug, category name, quantity, is_active)
+    tuple; quantity is None when the row leaves stock alone. Raise
+    RowError with a readable message otherwise.
+    """
+    sku = _text(row, "sku", _MAX_SKU)
+    name = _text(row, "name", _MAX_NAME)
+
+    try:
+        price = Decimal(str(row.get("price", "")).strip())
+    except InvalidOperation:
+        raise RowError("price is not a number") from None
+    if not price.is_finite() or price < 0 or price >= _MAX_PRICE:
+        raise RowError(f"price must be 0 or more and below {_MAX_PRICE}")
+    price = price.quantize(_CENT)
+
+    category_slug = _text(row, "category_slug", _MAX_SLUG)
+    try:
+        validate_slug(category_slug)
+    except ValidationError:
+        raise RowError("category_slug is not a valid slug") from None
+    category_name = _text(row, "category_name", _MAX_CATEGORY_NAME, required=False)
+
+    quantity = row.get("quantity")
+    if quantity in (None, ""):
+        quantity = None
+    else:
+        try:
+            quantity = int(str(quantity).strip())
+        except ValueError:
+            raise RowError("quantity is not an integer") from None
+        if quantity < 0:
+            raise RowError("quantity must be 0 or more")
+
+    is_active = row.get("is_active")
+    if is_active in (None, ""):
+        is_active = True
+    elif not isinstance(is_active, bool):
+        flag = str(is_active).strip().lower()
+        if flag not in ("1", "0", "true", "false", "yes", "no"):
+            raise RowError("is_active must be true or false")
+        is_active = flag in ("1", "true", "yes")
+
+    return sku, name, price, category_slug, category_name or category_slug, quantity, is_active
+
+
+class CatalogImporter:
+    """
+    Upserts products, keyed by SKU, and their stock from a stream of rows
+    in batches of `batch_size`: per batch, one query to create unknown
+    categories, one upsert of products, one id lookup, one update flagging
+    active carts that hold them and one or two inventory writes, all in
+    one transaction. Memory use depends on the
+    batch size and the number of categories, not on the input size.
+
+    Invalid rows are reported to `on_error(line number, message)` and
+    skipped. If a batch fails in the database it is retried row by row
+    so only the offending rows are lost. Rows for products with striped
+    inventory update the product but are reported, as their stock is
+    left alone.
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.categories = {}
+
+    def run(self, rows, on_error=None):
+        """
+        Import `rows` ((line number, row dict) pairs, e.g. from read_csv)
+        and return {"rows", "imported", "failed"} counts.
+        """
+        stats = {"rows": 0, "imported": 0, "failed": 0}
+
+        def fail(line_number, message):
+            stats["failed"] += 1
+            if on_error is not None:
+                on_error(line_number, message)
+
+        batch = []
+        for line_number, row in rows:
+            stats["rows"] += 1
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                batch.append((line_number, parse_row(row)))
+            except RowError as exc:
+                fail(line_number, str(exc))
+                continue
+
+            if len(batch) >= self.batch_size:
+                stats["imported"] += self.write_batch(batch, fail)
+                batch = []
+        if batch:
+            stats["imported"] += self.write_batch(batch, fail)
+        return stats
+
+    def write_batch(self, batch, fail):
+        """
+        Write one batch; return how many rows were imported without a
+        reported problem.
+        """
+        try:
+            imported, problems = self._write(batch)
+        except (DataError, IntegrityError):
+            # categories created by the rolled back transaction are gone
+            self.categories = {}
+        else:
+            for line_number, message in problems:
+                fail(line_number, message)
+            return imported
+
+        imported = 0
+        for line_number, values in batch:
+            try:
+                count, problems = self._write([(line_number, values)])
+            except (DataError, IntegrityError) as exc:
+                self.categories = {}
+                fail(line_number, f"database error: {exc}")
+                continue
+            imported += count
+            for problem in problems:
+                fail(*problem)
+        return imported
+
+    def _category_ids(self, rows):
+        missing = {
+            slug: name for _, _, _, slug, name, _, _ in rows
+            if slug not in self.categories
+        }
+        if missing:
+            Category.objects.bulk_create(
+                [Category(slug=slug, name=name) for slug, name in missing.items()],
+                ignore_conflicts=True
+            )
+            self.categories.update(
+                Category.objects.filter(slug__in=missing).values_list("slug", "id")
+            )
+        return self.categories
+
+    def _write(self, batch):
+        # a SKU listed twice in one batch: the last row wins
+        rows = {values[0]: (line_number, values) for line_number, values in batch}
+
+        with transaction.atomic():
+            categories = self._category_ids([values for _, values in rows.values()])
+            Product.objects.bulk_create(
+                [
+                    Product(
+                        sku=sku,
+                        name=name,
+                        price=price,
+                        category_id=categories[slug],
+                        is_active=is_active
+                    )
+                    for _, (sku, name, price, slug, _, _, is_active) in rows.values()
+                ],
+                update_conflicts=True,
+                unique_fields=["sku"],
+                update_fields=["name", "price", "category", "is_active"]
+            )
+            product_ids = dict(
+                Product.objects.filter(sku__in=rows).values_list("sku", "id")
+            )
+            # bulk_create sends no post_save, so cart.signals does not flag
+            # carts whose running subtotal may now be off
+            Cart.objects.filter(
+                status=Cart.ACTIVE,
+                items__product_id__in=product_ids.values()
+            ).update(totals_stale=True)
+
+            # striped stock lives in InventoryBucket rows; overwriting
+            # quantity_available would break that, so those rows keep theirs
+            striped = set(
+                Inventory.objects.filter(
+                    product_id__in=product_ids.values(), stripes__gt=0
+                ).values_list("product_id", flat=True)
+            )
+            problems = []
+            stocked = []
+            unstocked = []
+            for sku, (line_number, values) in rows.items():
+                product_id = product_ids[sku]
+                quantity = values[5]
+                if quantity is None:
+                    unstocked.append(Inventory(product_id=product_id, quantity_available=0))
+                elif product_id in striped:
+                    problems.append((
+                        line_number,
+                        "product saved, stock not changed: inventory is "
+                        "striped (use rebalance_inventory)"
+                    ))
+                else:
+                    stocked.append(
+                        Inventory(product_id=product_id, quantity_available=quantity)
+                    )
+
+            if stocked:
+                Inventory.objects.bulk_create(
+                    stocked,
+                    update_conflicts=True,
+                    unique_fields=["product"],
+                    update_fields=["quantity_available"]
+                )
+            if unstocked:
+                Inventory.objects.bulk_create(unstocked, ignore_conflicts=True)
+
+            ids = list(product_ids.values())
+            transaction.on_commit(lambda: self._invalidate(ids))
+        # rows superseded by a later one for the same SKU count as imported;
+        # reported rows count as failed only
+        return len(batch) - len(problems), problems
+
+    @staticmethod
+    def _invalidate(product_ids):
+        # bulk writes send no post_save, so the signal receivers in
+        # products.signals do not run
+        product_snapshots.bump_many(product_ids)
+        catalog_cache.invalidate()
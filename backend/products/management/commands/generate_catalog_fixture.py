@@ -0,0 +1,78 @@
+import csv
+import json
+import random
+
+from django.core.management.base import BaseCommand
+
+from products.importer import FIELDS
+
+# values parse_row rejects, one per broken row
+BROKEN = (
+    ("price", "abc"),
+    ("price", "-1"),
+    ("quantity", "many"),
+    ("sku", ""),
+    ("category_slug", "not a slug"),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a synthetic catalog (CSV or NDJSON) for import_catalog "
+        "benchmarks, generated row by row. Optionally sprinkles in invalid "
+        "rows and repeats SKUs to exercise error reporting and upserts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--rows", type=int, default=100000)
+        parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+        parser.add_argument("--categories", type=int, default=50)
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="Fraction of rows made invalid.",
+        )
+        parser.add_argument(
+            "--update-rate",
+            type=float,
+            default=0.0,
+            help="Fraction of rows that repeat an earlier SKU.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--sku-prefix", default="FIX")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        def rows():
+            for i in range(options["rows"]):
+                number = i
+                if i and rng.random() < options["update_rate"]:
+                    number = rng.randrange(i)
+                category = rng.randrange(options["categories"])
+                row = {
+                    "sku": f"{options['sku_prefix']}-{number:08d}",
+                    "name": f"Fixture Product {number}",
+                    "price": f"{rng.randrange(100, 10_000_000) / 100:.2f}",
+                    "category_slug": f"fixture-{category}",
+                    "category_name": f"Fixture Category {category}",
+                    "quantity": str(rng.randrange(0, 1000)),
+                    "is_active": "true",
+                }
+                if rng.random() < options["error_rate"]:
+                    field, value = rng.choice(BROKEN)
+                    row[field] = value
+                yield row
+
+        with open(options["path"], "w", encoding="utf-8", newline="") as fh:
+            if options["format"] == "csv":
+                writer = csv.DictWriter(fh, fieldnames=FIELDS)
+                writer.writeheader()
+                writer.writerows(rows())
+            else:
+                for row in rows():
+                    fh.write(json.dumps(row) + "\n")
+
+        self.stdout.write(f"Wrote {options['rows']} row(s) to {options['path']}")
@@ -0,0 +1,80 @@
+import io
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importer import CatalogImporter, read_csv, read_ndjson
+
+READERS = {"csv": read_csv, "ndjson": read_ndjson}
+
+
+class Command(BaseCommand):
+    help = (
+        "Upsert products (by SKU), their categories and stock from a CSV "
+        "or NDJSON file of any size, streamed in batches. Columns: sku, "
+        "name, price, category_slug, and optionally category_name, "
+        "quantity (blank leaves stock alone) and is_active. Bad rows are "
+        "reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Input file, or - for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=["auto", *READERS],
+            default="auto",
+            help="Input format; auto picks it from the file extension.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows written per transaction.",
+        )
+        parser.add_argument(
+            "--errors",
+            help="Write row errors to this file instead of stderr.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"]
+        if fmt == "auto":
+            if path.endswith(".csv"):
+                fmt = "csv"
+            elif path.endswith((".ndjson", ".jsonl")):
+                fmt = "ndjson"
+            else:
+                raise CommandError("Cannot tell the format from the name; pass --format")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be 1 or more")
+
+        errors = (
+            open(options["errors"], "w", encoding="utf-8")
+            if options["errors"] else self.stderr
+        )
+        stream = (
+            io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+            if path == "-" else open(path, encoding="utf-8", newline="")
+        )
+
+        def on_error(line_number, message):
+            errors.write(f"line {line_number}: {message}\n")
+
+        started = time.perf_counter()
+        try:
+            stats = CatalogImporter(options["batch_size"]).run(
+                READERS[fmt](stream), on_error=on_error
+            )
+        finally:
+            if path != "-":
+                stream.close()
+            if options["errors"]:
+                errors.close()
+        elapsed = time.perf_counter() - started
+
+        stats["elapsed_s"] = round(elapsed, 3)
+        stats["rows_per_minute"] = round(stats["rows"] / elapsed * 60) if elapsed else None
+        self.stdout.write(json.dumps(stats, indent=2))
@@ -0,0 +1,45 @@
+from rest_framework import serializers
+from products.models import Category, Product
+from core.serialization import decimal_converter
+
+class CategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ("id", "name", "slug")
+
+class ProductSerializer(serializers.ModelSerializer):
+    category = CategorySerializer(read_only=True)
+
+    class Meta:
+        model = Product
+        fields = ("id", "name", "sku", "price", "category")
+
+
+def fast_product_data(products):
+    """
+    ProductSerializer(products, many=True).data as plain dicts, built
+    from one .values() query over `products` (a queryset).
+    """
+    to_price = decimal_converter(Product._meta.get_field("price"))
+    rows = products.values_list(
+        "id", "name", "sku", "price",
+        "category_id", "category__name", "category__slug"
+    )
+    return [
+        {
+            "id": product_id,
+            "name": name,
+            "sku": sku,
+            "price": to_price(price),
+            "category": {
+                "id": category_id,
+                "name": category_name,
+                "slug": category_slug,
+            },
+        }
+        for product_id, name, sku, price, category_id, category_name, category_slug in rows
+    ]
+
+
+def fast_category_data(categories):
+    return list(categories.values("id", "name", "slug"))
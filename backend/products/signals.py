@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from products.cache import catalog_cache
+from products.models import Category, Product
+from products.snapshots import product_snapshots
+
+# Caches are invalidated twice: right away, and again once the write
+# commits, since a concurrent reader may have cached the old row under
+# the new version while the transaction was still open.
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, **kwargs):
+    # queryset.update() skips signals; call catalog_cache.invalidate()
+    # yourself after bulk writes
+    catalog_cache.invalidate()
+    transaction.on_commit(catalog_cache.invalidate)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_product_snapshot(sender, instance, **kwargs):
+    product_id = instance.id
+    product_snapshots.bump(product_id)
+    transaction.on_commit(lambda: product_snapshots.bump(product_id))
@@ -0,0 +1,131 @@
+import re
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.cache import LRUCache, is_shared_cache
+from products.models import Product
+
+ProductSnapshot = namedtuple(
+    "ProductSnapshot", ["id", "name", "sku", "price", "is_active"]
+)
+
+
+def normalize_name(name):
+    return re.sub(r"\s+", " ", name).strip()
+
+
+class ProductSnapshotCache:
+    """
+    In-process LRU of ProductSnapshot entries keyed by (product id,
+    version). Each Product save bumps that product's version counter in
+    the shared cache tier, so stale entries are simply never looked up
+    again and age out of the LRU.
+
+    The counters only reach other worker processes through a shared cache
+    alias. With `require_shared` (the default) and a per-process alias
+    (LocMemCache), the LRU is bypassed and every lookup reads the
+    database, so one worker never serves a price another one changed.
+    """
+
+    def __init__(self, alias="default", maxsize=10000, require_shared=True):
+        self.alias = alias
+        self.local = LRUCache(maxsize=maxsize)
+        self.require_shared = require_shared
+
+    @property
+    def enabled(self):
+        return not self.require_shared or is_shared_cache(self.alias)
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def _version_key(self, product_id):
+        return f"product:version:{product_id}"
+
+    def versions(self, product_ids):
+        keys = {self._version_key(product_id): product_id for product_id in product_ids}
+        found = self.shared.get_many(keys)
+
+        versions = {}
+        for key, product_id in keys.items():
+            if key not in found:
+                # never seen or evicted: seed from the clock so the new
+                # counter cannot collide with a stale local entry
+                self.shared.add(key, time.time_ns(), timeout=None)
+                found[key] = self.shared.get(key)
+            versions[product_id] = found[key]
+        return versions
+
+    def bump(self, product_id):
+        key = self._version_key(product_id)
+        try:
+            self.shared.incr(key)
+        except ValueError:
+            self.shared.add(key, time.time_ns(), timeout=None)
+
+    def bump_many(self, product_ids):
+        """
+        bump() for many products at once. Only counters that exist are
+        incremented: a missing one is seeded from the clock on its next
+        read anyway, which is what bulk imports of new products hit.
+        """
+        keys = [self._version_key(product_id) for product_id in product_ids]
+        for key in self.shared.get_many(keys):
+            try:
+                self.shared.incr(key)
+            except ValueError:
+                self.shared.add(key, time.time_ns(), timeout=None)
+
+    def get_many(self, product_ids):
+        """
+        Return {product id: ProductSnapshot}, loading all misses with one
+        query. Unknown ids are left out.
+        """
+        if not self.enabled:
+            return {
+                product.id: self._snapshot(product)
+                for product in Product.objects.filter(id__in=product_ids)
+            }
+
+        versions = self.versions(product_ids)
+        snapshots = {}
+        missing = []
+        for product_id in product_ids:
+            snapshot = self.local.get((product_id, versions[product_id]))
+            if snapshot is None:
+                missing.append(product_id)
+            else:
+                snapshots[product_id] = snapshot
+
+        if missing:
+            for product in Product.objects.filter(id__in=missing):
+                snapshot = self._snapshot(product)
+                self.local.set((product.id, versions[product.id]), snapshot)
+                snapshots[product.id] = snapshot
+        return snapshots
+
+    @staticmethod
+    def _snapshot(product):
+        return ProductSnapshot(
+            id=product.id,
+            name=normalize_name(product.name),
+            sku=product.sku,
+            price=product.price,
+            is_active=product.is_active,
+        )
+
+    def get(self, product_id):
+        return self.get_many([product_id]).get(product_id)
+
+
+_config = getattr(settings, "PRODUCT_SNAPSHOT_CACHE", {})
+
+product_snapshots = ProductSnapshotCache(
+    alias=_config.get("ALIAS", "default"),
+    maxsize=_config.get("MAX_ENTRIES", 10000),
+    require_shared=_config.get("REQUIRE_SHARED", True),
+)
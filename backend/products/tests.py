@@ -1,3 +1,373 @@
+import io
+import json
+import os
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from cart.models import Cart
+from cart.services import CartService
+from customers.models import Customer
+from inventory.models import Inventory
+from orders.services import OrderService
+from products.cache import catalog_cache
+from products.importer import CatalogImporter, read_csv, read_ndjson
+from products.snapshots import ProductSnapshotCache, product_snapshots
+from products.models import Category, Product
+from products.serializers import ProductSerializer, fast_product_data
+from core.serialization import render_json
+
+
+class CatalogAPITest(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalog_cache.local.clear()
+        # tests run in one process, where LocMemCache is as good as shared
+        patcher = mock.patch.object(catalog_cache, "require_shared", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.category = Category.objects.create(
+            name="Sepatu",
+            slug="sepatu"
+        )
+        self.product = Product.objects.create(
+            name="Sepatu Lari X",
+            sku="SKU-001",
+            price=Decimal("500000"),
+            category=self.category
+        )
+
+    def test_product_list(self):
+        response = self.client.get("/api/products/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response)
+        results = response.json()["results"]
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["sku"], "SKU-001")
+        self.assertEqual(results[0]["price"], "500000.00")
+        self.assertEqual(results[0]["category"]["slug"], "sepatu")
+
+    def test_unchanged_list_returns_304_without_queries(self):
+        etag = self.client.get("/api/products/")["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                "/api/products/", HTTP_IF_NONE_MATCH=etag
+            )
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_product_save_invalidates_cache(self):
+        first = self.client.get(f"/api/products/{self.product.id}/")
+
+        self.product.price = Decimal("450000")
+        self.product.save()
+
+        second = self.client.get(
+            f"/api/products/{self.product.id}/",
+            HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second["ETag"], first["ETag"])
+        self.assertEqual(second.json()["price"], "450000.00")
+
+    def test_inactive_product_detail_is_not_found(self):
+        self.product.is_active = False
+        self.product.save()
+
+        response = self.client.get(f"/api/products/{self.product.id}/")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_category_list(self):
+        response = self.client.get("/api/products/categories/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["slug"], "sepatu")
+
+    def test_category_filter_is_normalized_before_caching(self):
+        first = self.client.get("/api/products/", {"category": " sepatu "})
+        second = self.client.get("/api/products/", {"category": "sepatu"})
+
+        self.assertEqual(first.json()["results"][0]["sku"], "SKU-001")
+        self.assertEqual(first["ETag"], second["ETag"])
+        entries = len(catalog_cache.local)
+
+        for bad in ("no such/slug", "?", "é"):
+            with self.assertNumQueries(0):
+                response = self.client.get("/api/products/", {"category": bad})
+            self.assertEqual(response.json(), {"page": 1, "results": []})
+        self.assertEqual(len(catalog_cache.local), entries)
+
+    def test_per_process_alias_caches_nothing(self):
+        catalog_cache.require_shared = True
+        etag = self.client.get("/api/products/")["ETag"]
+
+        # a write another worker made: no signal reaches this process
+        Product.objects.filter(id=self.product.id).update(price=Decimal("1"))
+
+        response = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["price"], "1.00")
+        self.assertEqual(len(catalog_cache.local), 0)
+
+
+class ProductSnapshotCacheTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Sepatu", slug="sepatu")
+        self.product = Product.objects.create(
+            name="  Sepatu   Lari X ",
+            sku="SKU-001",
+            price=Decimal("500000"),
+            category=self.category
+        )
+        self.other = Product.objects.create(
+            name="Kaos Kaki",
+            sku="SKU-002",
+            price=Decimal("20000"),
+            category=self.category
+        )
+        # LocMemCache in tests: single process, so the LRU may be used
+        self.snapshots = ProductSnapshotCache(maxsize=10, require_shared=False)
+
+    def test_bulk_lookup_hits_cache_after_first_load(self):
+        ids = [self.product.id, self.other.id]
+
+        with self.assertNumQueries(1):
+            first = self.snapshots.get_many(ids)
+        with self.assertNumQueries(0):
+            second = self.snapshots.get_many(ids)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first[self.product.id].name, "Sepatu Lari X")
+        self.assertEqual(first[self.other.id].price, Decimal("20000"))
+
+    def test_save_bumps_version(self):
+        self.snapshots.get(self.product.id)
+
+        self.product.price = Decimal("450000")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+
+        with self.assertNumQueries(1):
+            snapshot = self.snapshots.get(self.product.id)
+        self.assertEqual(snapshot.price, Decimal("450000"))
+
+    def test_lru_is_bounded(self):
+        snapshots = ProductSnapshotCache(maxsize=1, require_shared=False)
+        snapshots.get_many([self.product.id, self.other.id])
+
+        self.assertEqual(len(snapshots.local), 1)
+
+    def test_per_process_alias_reads_the_database(self):
+        snapshots = ProductSnapshotCache(maxsize=10)
+        snapshots.get(self.product.id)
+
+        # a write from another process: no signal, no version bump here
+        Product.objects.filter(id=self.product.id).update(price=Decimal("1"))
+
+        with self.assertNumQueries(1):
+            snapshot = snapshots.get(self.product.id)
+        self.assertEqual(snapshot.price, Decimal("1"))
+        self.assertEqual(len(snapshots.local), 0)
+
+
+class FastCatalogSerializationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalog_cache.local.clear()
+
+        category = Category.objects.create(name="Tas   «Kulit»", slug="tas")
+        for i, price in enumerate(("1", "99999.995", "250000.50")):
+            Product.objects.create(
+                name=f"Tas \"{i}\" é\U0001f45c",
+                sku=f"TAS-{i}",
+                price=Decimal(price),
+                category=category
+            )
+
+    def get_both(self, path):
+        with self.settings(FAST_SERIALIZATION=False):
+            slow = self.client.get(path)
+        cache.clear()
+        catalog_cache.local.clear()
+        with self.settings(FAST_SERIALIZATION=True):
+            fast = self.client.get(path)
+        return slow, fast
+
+    def test_product_list_bytes_match_serializer(self):
+        slow, fast = self.get_both("/api/products/")
+
+        self.assertEqual(fast.content, slow.content)
+        self.assertEqual(fast["ETag"], slow["ETag"])
+
+    def test_category_list_bytes_match_serializer(self):
+        slow, fast = self.get_both("/api/products/categories/")
+
+        self.assertEqual(fast.content, slow.content)
+
+    def test_fast_product_data_matches_serializer(self):
+        products = Product.objects.select_related("category").order_by("id")
+
+        self.assertEqual(
+            render_json(fast_product_data(products)),
+            JSONRenderer().render(ProductSerializer(products, many=True).data)
+        )
+
+
+class CatalogImportTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalog_cache.local.clear()
+
+        self.category = Category.objects.create(name="Sepatu", slug="sepatu")
+        self.existing = Product.objects.create(
+            name="Sepatu Lama",
+            sku="OLD-1",
+            price=Decimal("100"),
+            category=self.category
+        )
+        Inventory.objects.create(product=self.existing, quantity_available=7)
+        self.errors = []
+
+    def run_import(self, text, reader=read_csv, batch_size=2):
+        return CatalogImporter(batch_size).run(
+            reader(io.StringIO(text)),
+            on_error=lambda line, message: self.errors.append((line, message))
+        )
+
+    def test_upserts_products_categories_and_stock(self):
+        stats = self.run_import(
+            "sku,name,price,category_slug,category_name,quantity,is_active\n"
+            "NEW-1,Tas Baru,150000,tas,Tas,5,true\n"
+            "OLD-1,Sepatu Baru,120.555,sepatu,,,\n"
+            "NEW-2,Dompet,abc,tas,Tas,1,\n"
+            "NEW-3,Topi,25,topi,,,no\n"
+            "NEW-1,Tas Baru 2,160000,tas,Tas,9,\n"
+        )
+
+        self.assertEqual(stats, {"rows": 5, "imported": 4, "failed": 1})
+        self.assertEqual(self.errors, [(4, "price is not a number")])
+
+        new = Product.objects.get(sku="NEW-1")
+        self.assertEqual(new.name, "Tas Baru 2")
+        self.assertEqual(new.price, Decimal("160000.00"))
+        self.assertEqual(new.category.name, "Tas")
+        self.assertEqual(new.inventory.quantity_available, 9)
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.name, "Sepatu Baru")
+        self.assertEqual(self.existing.price, Decimal("120.56"))
+        # blank quantity leaves existing stock alone
+        self.assertEqual(self.existing.inventory.quantity_available, 7)
+
+        topi = Product.objects.get(sku="NEW-3")
+        self.assertFalse(topi.is_active)
+        self.assertEqual(topi.category.name, "topi")
+        self.assertEqual(topi.inventory.quantity_available, 0)
+        self.assertFalse(Product.objects.filter(sku="NEW-2").exists())
+
+    def test_queries_per_batch_do_not_grow_with_rows(self):
+        rows = "".join(f"BULK-{i},Produk {i},10,sepatu,1\n" for i in range(50))
+
+        # savepoint, category insert + lookup, product upsert + lookup,
+        # stale carts, striped stock check, inventory upsert, release
+        with self.assertNumQueries(9):
+            self.run_import(
+                "sku,name,price,category_slug,quantity\n" + rows, batch_size=50
+            )
+
+        self.assertEqual(Inventory.objects.filter(product__sku__startswith="BULK-").count(), 50)
+
+    def test_ndjson_reports_bad_lines_and_continues(self):
+        stats = self.run_import(
+            '{"sku": "ND-1", "name": "Satu", "price": 10.5, "category_slug": "sepatu", "quantity": 3}\n'
+            "{not json\n"
+            "\n"
+            '["a list"]\n'
+            '{"sku": "ND-2", "name": "Dua", "price": "1", "category_slug": "sepatu", "quantity": -1}\n',
+            reader=read_ndjson
+        )
+
+        self.assertEqual(stats, {"rows": 4, "imported": 1, "failed": 3})
+        self.assertEqual([line for line, _ in self.errors], [2, 4, 5])
+        self.assertEqual(self.errors[2][1], "quantity must be 0 or more")
+        self.assertEqual(Product.objects.get(sku="ND-1").price, Decimal("10.50"))
+
+    def test_striped_stock_is_reported_and_left_alone(self):
+        Inventory.objects.filter(product=self.existing).update(stripes=4)
+
+        stats = self.run_import(
+            "sku,name,price,category_slug,quantity\n"
+            "OLD-1,Sepatu Lama,200,sepatu,50\n"
+            "NEW-1,Sepatu Baru,300,sepatu,5\n"
+        )
+
+        # the striped row counts as failed, not also as imported
+        self.assertEqual(stats, {"rows": 2, "imported": 1, "failed": 1})
+        self.assertEqual(len(self.errors), 1)
+        self.assertIn("striped", self.errors[0][1])
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.price, Decimal("200"))
+        self.assertEqual(self.existing.inventory.quantity_available, 7)
+
+    def test_import_invalidates_caches(self):
+        etag = self.client.get("/api/products/")["ETag"]
+        self.assertEqual(product_snapshots.get(self.existing.id).price, Decimal("100"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import(
+                "sku,name,price,category_slug\nOLD-1,Sepatu Lama,300,sepatu\n"
+            )
+
+        response = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(product_snapshots.get(self.existing.id).price, Decimal("300"))
+
+    def test_price_change_marks_carts_stale_for_checkout(self):
+        customer = Customer.objects.create(email="imp@test.com", name="Imp")
+        cart = Cart.objects.create(customer=customer)
+        CartService.set_item(cart, self.existing, 2)
+        self.assertFalse(Cart.objects.get(id=cart.id).totals_stale)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import(
+                "sku,name,price,category_slug\nOLD-1,Sepatu Lama,150,sepatu\n"
+            )
+
+        self.assertTrue(Cart.objects.get(id=cart.id).totals_stale)
+        order = OrderService.checkout(cart)
+        self.assertEqual(order.total_amount, Decimal("300.00"))
+
+    def test_generated_fixture_imports(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "catalog.ndjson")
+            call_command(
+                "generate_catalog_fixture", path, "--rows", "40",
+                "--format", "ndjson", "--error-rate", "0.25",
+                "--update-rate", "0.25", stdout=io.StringIO()
+            )
+            out = io.StringIO()
+            err = io.StringIO()
+            call_command(
+                "import_catalog", path, "--batch-size", "7",
+                stdout=out, stderr=err
+            )
 
-# Create your tests here.
+        stats = json.loads(out.getvalue())
+        self.assertEqual(stats["rows"], 40)
+        self.assertGreater(stats["failed"], 0)
+        self.assertEqual(stats["imported"] + stats["failed"], 40)
+        self.assertEqual(err.getvalue().count("\n"), stats["failed"])
+        self.assertEqual(
+            Inventory.objects.filter(product__sku__startswith="FIX-").count(),
+            Product.objects.filter(sku__startswith="FIX-").count()
+        )
@@ -1,3 +1,83 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.core.validators import slug_re
+from django.shortcuts import get_object_or_404
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from products.cache import catalog_cache
+from products.models import Category, Product
+from products.serializers import (
+    CategorySerializer,
+    ProductSerializer,
+    fast_category_data,
+    fast_product_data,
+)
+
+PAGE_SIZE = 50
+
+
+class ProductListAPIView(APIView):
+    def get(self, request):
+        """
+        list active products, optionally filtered by category slug
+        """
+        category = request.query_params.get("category", "").strip()
+        try:
+            page = max(int(request.query_params.get("page", 1)), 1)
+        except ValueError:
+            page = 1
+
+        if category and not slug_re.fullmatch(category):
+            # no category can match; answered without a cache slot per
+            # distinct bad value
+            return Response({"page": page, "results": []})
+
+        def build():
+            products = (
+                Product.objects.filter(is_active=True, category__is_active=True)
+                .select_related("category")
+                .order_by("id")
+            )
+            if category:
+                products = products.filter(category__slug=category)
+            offset = (page - 1) * PAGE_SIZE
+            products = products[offset:offset + PAGE_SIZE]
+            if settings.FAST_SERIALIZATION:
+                results = fast_product_data(products)
+            else:
+                results = ProductSerializer(products, many=True).data
+            return {"page": page, "results": results}
+
+        return catalog_cache.respond(
+            request, f"products:list:{category}:{page}", build
+        )
+
+
+class ProductDetailAPIView(APIView):
+    def get(self, request, pk):
+        """
+        retrieve one active product
+        """
+        def build():
+            product = get_object_or_404(
+                Product.objects.select_related("category"),
+                pk=pk,
+                is_active=True
+            )
+            return ProductSerializer(product).data
+
+        return catalog_cache.respond(request, f"products:detail:{pk}", build)
+
+
+class CategoryListAPIView(APIView):
+    def get(self, request):
+        """
+        list active categories
+        """
+        def build():
+            categories = Category.objects.filter(is_active=True).order_by("name")
+            if settings.FAST_SERIALIZATION:
+                return fast_category_data(categories)
+            return CategorySerializer(categories, many=True).data
+
+        return catalog_cache.respond(request, "categories:list", build)